@@ -1,11 +1,22 @@
 # app.py
 
+import shutil
 import streamlit as st
-from simulation.model import UserModel, Change  # Now imports Change correctly
-from ui.components import render_sidebar, display_simulation_results
-
-import random
-import pandas as pd  # Ensure pandas is imported
+from dataclasses import replace
+from simulation.runner import Scenario, SimulationResult, build_model
+from simulation.cache import ResultCache
+from simulation.ensemble import run_ensemble
+from simulation.export import RunExporter, export_result, new_export_dir, prune_exports
+from simulation.profiling import PhaseTimer
+from ui.components import (
+    render_sidebar,
+    render_sweep_panel,
+    render_run_controls,
+    stream_simulation,
+    display_simulation_results,
+    render_export_panel,
+    render_performance_panel
+)
 
 # Set the page configuration
 st.set_page_config(
@@ -16,42 +27,157 @@ st.set_page_config(
 
 st.title("User Satisfaction and NPS Simulation")
 
+@st.cache_resource
+def get_result_cache():
+    """
+    Returns the result cache shared by every session of this app process.
+    """
+    return ResultCache()
+
 # Render Sidebar and get user inputs
 user_inputs = render_sidebar()
 
 # Unpack user inputs
+engine = user_inputs["engine"]
+comment_history = user_inputs["comment_history"]
+agent_history = user_inputs["agent_history"]
+agent_history_every = user_inputs["agent_history_every"]
+agent_history_sample = user_inputs["agent_history_sample"]
 num_users = user_inputs["num_users"]
 num_steps = user_inputs["num_steps"]
 csat_score = user_inputs["csat_score"]
 initial_satisfaction = user_inputs["initial_satisfaction"]
+population_mix = user_inputs["population_mix"]
 random_seed = user_inputs["random_seed"]
+replicates = user_inputs["replicates"]
+profile_capture = user_inputs["profile_capture"]
+export_format = user_inputs["export_format"]
 run_simulation = user_inputs["run_simulation"]
 
+scenario = Scenario(
+    num_users=num_users,
+    num_steps=num_steps,
+    csat_score=csat_score,
+    initial_satisfaction=initial_satisfaction,
+    seed=random_seed,
+    engine=engine,
+    comment_history=comment_history,
+    agent_history=agent_history,
+    agent_history_every=agent_history_every,
+    agent_history_sample=agent_history_sample,
+    population_mix=population_mix
+)
+
+# Grid runs over CSAT score and persona initial satisfaction
+render_sweep_panel(scenario, cache=get_result_cache())
+
 if run_simulation:
-    with st.spinner("Running simulation..."):
-        # Set random seed for reproducibility
-        random.seed(random_seed)
-
-        # Initialize the Change object with CSAT score
-        change = Change(csat_score=csat_score)
-        
-        # Initialize the model with updated initial satisfaction
-        model = UserModel(num_users, change, initial_satisfaction)
-
-        # Run the simulation
-        for _ in range(num_steps):
-            model.step()
-
-        # Retrieve data
-        model_data = model.datacollector.get_model_vars_dataframe()
-        agent_data = model.datacollector.get_agent_vars_dataframe()
-        comments = model.comments  # Now, comments should exist
-
-        # Convert comments to DataFrame
-        if comments:
-            comments_df = pd.DataFrame(comments)
-        else:
-            comments_df = pd.DataFrame(columns=["agent_id", "group", "persona", "comment", "sentiment"])
-
-    # Display Simulation Results using the UI module
-    display_simulation_results(model, model_data, agent_data, comments_df)
\ No newline at end of file
+    previous = st.session_state.get("run")
+    if previous is not None:
+        # Exports of the replaced run are removed with it
+        if previous["exporter"] is not None:
+            previous["exporter"].discard()
+        for directory in previous["export_dirs"]:
+            shutil.rmtree(directory, ignore_errors=True)
+        # Spilled agent history of the replaced run; the cache keeps its own copy
+        if previous["model"] is not None:
+            previous["model"].datacollector.agent_history.delete_spill()
+            # Frees a sharded model's workers and shared memory; its results stay readable
+            previous["model"].close()
+        if previous["result"] is not None:
+            previous["result"].agent_history.delete_spill()
+    # The run lives in the session so it can be stopped, resumed and extended across reruns
+    st.session_state["run"] = {
+        "scenario": scenario,
+        "replicates": replicates,
+        "target_steps": num_steps,
+        "status": "running",
+        "model": None,
+        "result": None,
+        "ensemble": None,
+        "export_format": export_format,
+        "exporter": None,
+        "export_dirs": [],
+        "export_paths": None,
+        "profiler": PhaseTimer(capture=profile_capture)
+    }
+    # Exports of sessions that ended without replacing their run
+    prune_exports()
+
+run = st.session_state.get("run")
+if run is not None:
+    render_run_controls(run)
+    run_scenario = replace(run["scenario"], num_steps=run["target_steps"])
+
+    if run["status"] == "running":
+        # Every phase of the run is timed; the optional capture covers the whole block
+        profiler = run["profiler"]
+        with profiler.capture():
+            result_cache = get_result_cache()
+            with profiler.phase("cache_lookup"):
+                result = result_cache.get(run_scenario)
+            if result is None:
+                if run["model"] is None:
+                    # Initialize the model with updated initial satisfaction
+                    with profiler.phase("build_model"):
+                        run["model"] = build_model(run_scenario, profiler=profiler)
+                if run["export_format"] != "none" and (run["exporter"] is None or run["exporter"].closed):
+                    # Streams every step to disk; the files stay open while the run is stopped and extended
+                    with profiler.phase("export"):
+                        run["exporter"] = RunExporter(new_export_dir(), run["export_format"])
+                        run["export_dirs"].append(run["exporter"].directory)
+                        run["exporter"].attach(run["model"])
+                        run["export_paths"] = None
+
+                # Run the remaining steps, showing partial results after every chunk
+                model = run["model"]
+                with profiler.phase("simulation"):
+                    stream_simulation(model, run["target_steps"] - model.steps, run["target_steps"])
+                if run["exporter"] is not None:
+                    with profiler.phase("export"):
+                        run["exporter"].flush()
+
+                # Retrieve data
+                with profiler.phase("collect_results"):
+                    result = SimulationResult.from_model(run_scenario, model)
+                with profiler.phase("cache_put"):
+                    result_cache.put(result)
+            elif run["export_format"] != "none":
+                # A cached result has no model to stream from, so it is exported whole
+                with profiler.phase("export"):
+                    if run["exporter"] is not None and not run["exporter"].closed:
+                        # The streamed files lag the cached result
+                        run["exporter"].discard()
+                    directory = new_export_dir()
+                    run["export_dirs"].append(directory)
+                    run["export_paths"] = export_result(result, directory, run["export_format"])
+
+            # Run the replicates for the confidence bands
+            if run["replicates"] > 1:
+                with st.spinner(f"Running {run['replicates']} replicates..."), profiler.phase("ensemble"):
+                    run["ensemble"] = run_ensemble(run_scenario, run["replicates"])
+
+        run["result"] = result
+        run["status"] = "completed"
+        st.rerun()  # Swap the stop control for the extend controls
+
+    profiler = run["profiler"]
+    if run["status"] == "completed":
+        # Display Simulation Results using the UI module
+        result = run["result"]
+        rendered = len(result.figures)
+        with profiler.phase("display"):
+            display_simulation_results(result, ensemble=run["ensemble"], profiler=profiler)
+        if len(result.figures) != rendered:
+            # Store the newly drawn charts next to the cached result
+            with profiler.phase("cache_put"):
+                get_result_cache().put(result)
+        if run["exporter"] is not None or run["export_paths"]:
+            render_export_panel(run)
+    elif run["model"] is not None and run["model"].steps > 0:
+        # Show what a stopped run has produced so far
+        model = run["model"]
+        with profiler.phase("display"):
+            partial = SimulationResult.from_model(replace(run_scenario, num_steps=model.steps), model, snapshot=False)
+            display_simulation_results(partial, profiler=profiler)
+    render_performance_panel(profiler)
@@ -0,0 +1,89 @@
+# benchmarks/import_time.py
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules profiled by default, from the lightest entry points to the full app stack
+DEFAULT_MODULES = [
+    "simulation",
+    "simulation.personas",
+    "simulation.runner",
+    "simulation.cache",
+    "simulation.ensemble",
+    "simulation.sweep",
+    "simulation.cli",
+    "simulation.vectorized",
+    "simulation.model",
+    "visualization.plots",
+    "ui.components",
+    "streamlit"
+]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile_import(module):
+    """
+    Imports a module in a fresh interpreter with -X importtime and parses the report.
+
+    Modules the interpreter loads at startup, up to and including `site`, are left out.
+
+    Args:
+        module (str): Dotted name of the module to import.
+
+    Returns:
+        list: (depth, cumulative_us, name) for every module the import loaded, in load order.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == "site":
+            entries = []  # Everything so far was interpreter startup
+            continue
+        entries.append((depth, int(cumulative_us), name.strip()))
+    return entries
+
+
+def main(argv=None):
+    """
+    Prints the cold import time of each module and its heaviest dependencies.
+
+    Args:
+        argv (list, optional): Command-line arguments; defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Profile the cold import time of the app's modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to profile.")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest dependencies to list per module.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest is reported.")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        runs = [profile_import(module) for _ in range(args.repeat)]
+        totals = [sum(us for depth, us, _ in run if depth == 0) for run in runs]
+        entries = runs[totals.index(min(totals))]
+        print(f"{module:<24} {min(totals) / 1000:9.1f} ms")
+        # Top-level packages only; a package's time includes whatever it imported itself
+        packages = {}
+        for _, cumulative_us, name in entries:
+            if "." not in name and name != module.split(".")[0]:
+                packages[name] = max(packages.get(name, 0), cumulative_us)
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, cumulative_us in heaviest:
+            print(f"    {name:<20} {cumulative_us / 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
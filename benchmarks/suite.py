@@ -0,0 +1,371 @@
+# benchmarks/suite.py
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from simulation.runner import ENGINES, Scenario, SimulationResult, build_model, group_nps_columns, run_scenario, scenario_key
+
+# Population sizes and step counts of each preset; "full" is meant for dedicated benchmark hosts
+SCALES = {
+    "quick": {"sizes": [1000], "steps": [10]},
+    "default": {"sizes": [1000, 10000, 100000], "steps": [100]},
+    "full": {"sizes": [1000, 10000, 100000, 1000000], "steps": [100, 1000]}
+}
+
+DEFAULT_TOLERANCE = 0.25
+
+# Timings below this many seconds are too noisy to be reported as regressions
+MIN_SECONDS = 0.005
+
+# Stepped models shared by the read-only cases, by scenario key; cases that change the model run their own
+_STEPPED = {}
+
+
+def stepped_model(scenario: Scenario):
+    """
+    Returns a model that has run all of the scenario's steps, running it on first use.
+    The model is shared by every case that only reads it, so no case may change it.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+
+    Returns:
+        UserModel or VectorizedUserModel: The model after its final step.
+    """
+    key = scenario_key(scenario)
+    if key not in _STEPPED:
+        _STEPPED.clear()  # Hold one population at a time; the largest take gigabytes
+        _STEPPED[key] = run_scenario(scenario)
+    return _STEPPED[key]
+
+
+def stepped_result(scenario: Scenario):
+    """
+    Returns the SimulationResult of a stepped model, as passed to the plots by the app.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+
+    Returns:
+        SimulationResult: The collected results.
+    """
+    return SimulationResult.from_model(scenario, stepped_model(scenario), snapshot=False)
+
+
+def bench_init(scenario):
+    """Builds a model, including its agents and preallocated history."""
+    return lambda: build_model(scenario)
+
+
+def bench_step(scenario):
+    """Runs all of a scenario's steps on a freshly built model."""
+    model = build_model(scenario)
+
+    def run():
+        for _ in range(scenario.num_steps):
+            model.step()
+    return run
+
+
+def bench_collect(scenario):
+    """Records one more step of model, agent and persona data on a freshly stepped model."""
+    model = run_scenario(scenario)
+    return lambda: model.datacollector.collect(model)
+
+
+def bench_collect_comments(scenario):
+    """Appends one step of comments to the comment log of a freshly stepped model."""
+    model = run_scenario(scenario)
+    return model.collect_comments
+
+
+def bench_agent_dataframe(scenario):
+    """Builds the agent-level DataFrame from the agent history."""
+    model = stepped_model(scenario)
+    return model.datacollector.get_agent_vars_dataframe
+
+
+def _plot_case(plot, inputs):
+    """
+    Builds a case that draws a chart from a stepped result and encodes it as the app does.
+
+    Args:
+        plot (str): Name of the function in visualization.plots.
+        inputs (callable): Maps a SimulationResult to the plot's positional arguments.
+
+    Returns:
+        callable: The benchmark case.
+    """
+    def case(scenario):
+        from visualization import plots
+        from visualization.rendering import render_figure
+
+        args = inputs(stepped_result(scenario))
+        return lambda: render_figure(getattr(plots, plot)(*args))
+    return case
+
+
+def _final_row(result):
+    """Returns the last row of a result's model data."""
+    return result.model_data.iloc[-1]
+
+
+def _sweep_table(result):
+    """
+    Tiles the final metrics of a result over a 5 x 5 grid, in the layout of run_sweep's output.
+
+    Args:
+        result (SimulationResult): The stepped result.
+
+    Returns:
+        pd.DataFrame: 'CSAT Score' and 'Data Engineer' columns followed by the final metrics.
+    """
+    import pandas as pd
+
+    row = _final_row(result)
+    grid = [{"CSAT Score": csat, "Data Engineer": satisfaction, **row.to_dict()}
+            for csat in (0.2, 0.4, 0.6, 0.8, 1.0) for satisfaction in (2, 4, 6, 8, 10)]
+    return pd.DataFrame(grid)
+
+
+# Benchmark cases by name; each takes a Scenario, does its setup and returns the callable to measure
+CASES = {
+    "UserModel.__init__": bench_init,
+    "UserModel.step": bench_step,
+    "datacollector.collect": bench_collect,
+    "collect_comments": bench_collect_comments,
+    "get_agent_vars_dataframe": bench_agent_dataframe,
+    "plot_comment_sentiment": _plot_case(
+        "plot_comment_sentiment", lambda result: (result.comments.sentiment_totals(),)),
+    "plot_nps_by_persona": _plot_case(
+        "plot_nps_by_persona", lambda result: (result.persona_counts.persona_nps(),)),
+    "plot_group_nps": _plot_case(
+        "plot_group_nps",
+        lambda result: ({column.removesuffix(" NPS"): _final_row(result)[column]
+                         for column in group_nps_columns(result.model_data)},)),
+    "plot_aggregated_nps_over_time": _plot_case(
+        "plot_aggregated_nps_over_time", lambda result: (result.model_data,)),
+    "plot_final_aggregated_nps": _plot_case(
+        "plot_final_aggregated_nps",
+        lambda result: tuple(_final_row(result)[column] for column in ("Promoters %", "Passives %", "Detractors %"))),
+    "plot_sweep_heatmap": _plot_case(
+        "plot_sweep_heatmap", lambda result: (_sweep_table(result), "CSAT Score", "Data Engineer")),
+    "plot_sweep_small_multiples": _plot_case(
+        "plot_sweep_small_multiples",
+        lambda result: (_sweep_table(result), "CSAT Score", ["Overall NPS"] + group_nps_columns(result.model_data)))
+}
+
+
+def measure(case, scenario, repeat):
+    """
+    Times a benchmark case and records its peak traced memory.
+
+    Setup runs before every measurement and is not counted. An untimed warm-up run
+    comes first, so lazy imports and first-use caches do not count as the case's
+    time. Memory is traced in a separate run, so tracing does not slow down the timed runs.
+
+    Args:
+        case (callable): Entry of CASES.
+        scenario (Scenario): The scenario to benchmark.
+        repeat (int): Number of timed runs; the fastest is reported.
+
+    Returns:
+        dict: 'seconds' of the fastest run and 'peak_bytes' allocated while running.
+    """
+    case(scenario)()
+    timings = []
+    for _ in range(repeat):
+        run = case(scenario)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    run = case(scenario)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def case_id(name, engine, num_users, num_steps):
+    """
+    Returns the key of a measurement in a baseline file.
+
+    Args:
+        name (str): Name of the case in CASES.
+        engine (str): Key of the simulation engine in ENGINES.
+        num_users (int): Population size.
+        num_steps (int): Step count.
+
+    Returns:
+        str: e.g. 'UserModel.step[engine=mesa,users=1000,steps=100]'.
+    """
+    return f"{name}[engine={engine},users={num_users},steps={num_steps}]"
+
+
+def run_suite(cases, engine, sizes, steps, repeat=3, agent_history="final", seed=0):
+    """
+    Measures every case at every population size and step count.
+
+    Args:
+        cases (list): Names of entries in CASES.
+        engine (str): Key of the simulation engine in ENGINES.
+        sizes (list): Population sizes.
+        steps (list): Step counts.
+        repeat (int): Number of timed runs per measurement.
+        agent_history (str): Retention policy of the agent history.
+        seed (int): Seed of every scenario.
+
+    Returns:
+        dict: Measurements by case id, in run order.
+    """
+    results = {}
+    for num_steps in steps:
+        for num_users in sizes:
+            scenario = Scenario(
+                num_users=num_users,
+                num_steps=num_steps,
+                csat_score=0.8,
+                seed=seed,
+                engine=engine,
+                comment_history="summary",
+                agent_history=agent_history
+            )
+            for name in cases:
+                key = case_id(name, engine, num_users, num_steps)
+                results[key] = measure(CASES[name], scenario, repeat)
+                print(f"{key:<72} {results[key]['seconds'] * 1000:10.1f} ms "
+                      f"{results[key]['peak_bytes'] / 2**20:10.1f} MiB", file=sys.stderr)
+    _STEPPED.clear()
+    return results
+
+
+def environment():
+    """
+    Describes the interpreter and libraries a baseline was measured with.
+
+    Returns:
+        dict: Platform and version strings.
+    """
+    import mesa
+    import numpy as np
+    import pandas as pd
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "mesa": mesa.__version__
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds measurements that regressed against a baseline.
+
+    Cases missing from either side are skipped. Timings under MIN_SECONDS in both
+    runs are not compared, since they are dominated by noise.
+
+    Args:
+        results (dict): Measurements by case id, from run_suite.
+        baseline (dict): Measurements by case id, from a saved baseline.
+        tolerance (float): Allowed relative increase, e.g. 0.25 for 25%.
+
+    Returns:
+        list: (case id, metric, baseline value, current value) for every regression.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if metric == "seconds" and max(current[metric], previous[metric]) < MIN_SECONDS:
+                continue
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((key, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmark suite, optionally saving a baseline or checking against one.
+
+    Args:
+        argv (list, optional): Command-line arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: 1 if a measurement regressed beyond the tolerance, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Time and memory-profile model construction, stepping, "
+                                                 "collection and rendering.")
+    parser.add_argument("cases", nargs="*", default=list(CASES), help="Cases to run (default: all).")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="default",
+                        help="Preset of population sizes and step counts (default: default).")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        help="Comma-separated population sizes; overrides the preset.")
+    parser.add_argument("--steps", type=lambda value: [int(step) for step in value.split(",")],
+                        help="Comma-separated step counts; overrides the preset.")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="mesa", help="Simulation engine (default: mesa).")
+    parser.add_argument("--agent-history", default="final", help="Agent history retention policy (default: final).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is reported.")
+    parser.add_argument("--save", metavar="PATH", help="Write the measurements to a JSON baseline file.")
+    parser.add_argument("--compare", metavar="PATH", help="Fail if a measurement regressed against this baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed relative increase over the baseline (default: {DEFAULT_TOLERANCE}).")
+    args = parser.parse_args(argv)
+    # Deprecation notices from Mesa and seaborn would bury the report
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    scale = SCALES[args.scale]
+    results = run_suite(
+        args.cases,
+        args.engine,
+        args.sizes or scale["sizes"],
+        args.steps or scale["steps"],
+        repeat=args.repeat,
+        agent_history=args.agent_history
+    )
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for key, metric, previous, current in regressions:
+            print(f"REGRESSION {key} {metric}: {previous:.6g} -> {current:.6g} "
+                  f"(+{(current / previous - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,74 @@
 # simulation/agent.py
 
 from mesa import Agent
+from .mappings import (
+    COMMENTS,
+    SENTIMENTS,
+    NEUTRAL,
+    NPS_BY_SATISFACTION,
+    SENTIMENT_BY_SATISFACTION,
+    CATEGORY_BY_SATISFACTION,
+    nps_category
+)
+
+# Plain tuples of the banded maps; indexing them with an int returns a cached small int
+_NPS_BY_SATISFACTION = tuple(NPS_BY_SATISFACTION.tolist())
+_SENTIMENT_BY_SATISFACTION = tuple(SENTIMENT_BY_SATISFACTION.tolist())
+_CATEGORY_BY_SATISFACTION = tuple(CATEGORY_BY_SATISFACTION.tolist())
 
 class UserAgent(Agent):
-    def __init__(self, unique_id, model, group, persona):
+    # Group, persona, comment and sentiment are indices or codes into tables shared
+    # by every agent. The slots keep these fields out of the instance __dict__, but
+    # mesa.Agent has no __slots__, so agents still carry a __dict__ (unique_id,
+    # model, pos) and sit in Mesa's agent registries; the saving is modest (about 15%).
+    # The vectorized and aggregate engines are the compact representations.
+    __slots__ = ("group_index", "persona_index", "satisfaction", "nps", "sentiment_code")
+
+    def __init__(self, unique_id, model, persona_index, satisfaction=None):
         """
         Initializes a UserAgent.
 
         Args:
             unique_id (int): Unique identifier for the agent.
             model (UserModel): Reference to the simulation model.
-            group (Group): The group to which the agent belongs.
-            persona (Persona): The persona assigned to the agent.
+            persona_index (int): Index of the agent's persona in the model's catalog.
+            satisfaction (int, optional): Initial satisfaction; defaults to the persona's.
         """
         super().__init__(unique_id, model)
-        self.group = group
-        self.persona = persona
-        self.satisfaction = persona.attributes.get('satisfaction', 5)
-        self.nps = persona.attributes.get('nps', 0)
-        self.comment = ""
-        self.sentiment = "Neutral"
+        catalog = model.catalog
+        self.persona_index = persona_index
+        self.group_index = catalog.persona_groups[persona_index]
+        self.satisfaction = catalog.persona_satisfaction[persona_index] if satisfaction is None else satisfaction
+        self.nps = catalog.persona_nps[persona_index]
+        self.sentiment_code = NEUTRAL
+
+    @property
+    def group(self):
+        """
+        Group: The group to which the agent belongs.
+        """
+        return self.model.groups[self.group_index]
+
+    @property
+    def persona(self):
+        """
+        Persona: The persona assigned to the agent.
+        """
+        return self.model.personas[self.persona_index]
+
+    @property
+    def sentiment(self):
+        """
+        str: Sentiment of the agent's latest comment.
+        """
+        return SENTIMENTS[self.sentiment_code]
+
+    @property
+    def comment(self):
+        """
+        str: The agent's latest comment.
+        """
+        return COMMENTS[self.sentiment_code]
 
     def step(self):
         """
@@ -33,36 +82,27 @@ class UserAgent(Agent):
         """
         Updates the agent's satisfaction based on certain conditions or interactions.
         """
-        # Example Logic: Random fluctuation in satisfaction
-        change = self.random.choice([-1, 0, 1])
+        # Example Logic: Random fluctuation in satisfaction, drawn for every agent by the model
+        change = self.model.satisfaction_changes[self.unique_id]
         self.satisfaction = max(0, min(10, self.satisfaction + change))
 
     def update_nps(self):
         """
-        Updates the agent's NPS based on satisfaction.
-        """
-        # Simple Mapping: Higher satisfaction leads to higher NPS
-        if self.satisfaction >= 9:
-            self.nps = 10
-        elif 7 <= self.satisfaction <= 8:
-            self.nps = 8
-        elif 5 <= self.satisfaction <= 6:
-            self.nps = 6
-        elif 3 <= self.satisfaction <= 4:
-            self.nps = 4
-        else:
-            self.nps = 2
+        Updates the agent's NPS based on satisfaction and reports any change
+        of NPS category to the model's running counts.
+        """
+        old_category = nps_category(self.nps)
+
+        # Simple Mapping: Higher satisfaction leads to higher NPS (see mappings.NPS_BY_SATISFACTION)
+        self.nps = _NPS_BY_SATISFACTION[self.satisfaction]
+
+        new_category = _CATEGORY_BY_SATISFACTION[self.satisfaction]
+        if new_category != old_category:
+            self.model.nps_counts.move(self.persona_index, old_category, new_category)
 
     def generate_comment(self):
         """
         Generates a comment based on satisfaction and analyzes sentiment.
         """
-        if self.satisfaction >= 8:
-            self.comment = "Great service!"
-            self.sentiment = "Positive"
-        elif 5 <= self.satisfaction <= 7:
-            self.comment = "I'm okay with the current state."
-            self.sentiment = "Neutral"
-        else:
-            self.comment = "I'm not satisfied with the recent changes."
-            self.sentiment = "Negative"
\ No newline at end of file
+        # Positive from 8, Neutral from 5 to 7, Negative below (see mappings.SENTIMENT_BY_SATISFACTION)
+        self.sentiment_code = _SENTIMENT_BY_SATISFACTION[self.satisfaction]
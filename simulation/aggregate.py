@@ -0,0 +1,280 @@
+# simulation/aggregate.py
+
+from functools import partial
+import numpy as np
+from .change import Change
+from .personas import CATALOG, GROUPS
+from .aggregation import NPSAggregator
+from .collection import AgentHistory, ColumnarDataCollector, PersonaCountHistory
+from .comments import CommentLog
+from .population import persona_counts, validate_mix
+from .profiling import PhaseTimer
+from .rng import COMMENT_SAMPLE_STREAM, COMMENTS_STREAM, POPULATION_STREAM, SATISFACTION_STREAM, RandomStreams
+from .stepping import SteppingMixin
+from .mappings import (
+    CATEGORY_BY_SATISFACTION,
+    SENTIMENT_BY_SATISFACTION,
+    SATISFACTION_LEVELS,
+    NPS_CATEGORIES,
+    SENTIMENTS,
+    PROMOTER,
+    PASSIVE,
+    DETRACTOR,
+    nps_categories
+)
+
+# Probabilities of a satisfaction change of -1, 0 and +1, as in UserAgent.update_satisfaction
+MOVE_PROBABILITIES = (1 / 3, 1 / 3, 1 / 3)
+
+# Agent id of the example comments of the aggregate engine, which has no individual agents
+NO_AGENT_ID = -1
+
+
+def step_level_counts(level_counts, rng):
+    """
+    Advances a (personas x satisfaction levels) count table by one step.
+
+    The agents of every cell split into those moving down, staying and moving up
+    with one multinomial draw, then move to their clamped new levels. Agents
+    change independently, so the counts have exactly the distribution of the
+    counts of a population stepped agent by agent.
+
+    Args:
+        level_counts (np.ndarray): (personas x levels) int64 agent counts.
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        np.ndarray: The counts after the step.
+    """
+    moves = rng.multinomial(level_counts, MOVE_PROBABILITIES)
+    down, stay, up = moves[..., 0], moves[..., 1], moves[..., 2]
+    result = stay.copy()
+    result[:, :-1] += down[:, 1:]
+    result[:, 0] += down[:, 0]
+    result[:, 1:] += up[:, :-1]
+    result[:, -1] += up[:, -1]
+    return result
+
+
+class AggregateUserModel(SteppingMixin):
+    def __init__(self, num_users, change: Change, initial_satisfaction: dict, seed=None, comment_history="summary", max_steps=None,
+                 agent_history="full", agent_history_options=None, profiler=None,
+                 population_mix=None):
+        """
+        Initializes the AggregateUserModel.
+
+        Agents of a persona are exchangeable, so the population is fully described by
+        how many agents of each persona are at each satisfaction level. This engine
+        steps that (personas x levels) count table with multinomial draws and reports
+        the same model-level metrics, persona counts and sentiment counts as UserModel,
+        with the same sampling variance. Its cost per step does not depend on num_users.
+
+        There are no individual agents: the agent history records no agents, and
+        comments are always kept as summaries, with example comments drawn from the
+        counts under agent id NO_AGENT_ID. The persona counts are the same as those of
+        the other engines for the same seed; later steps draw different numbers.
+
+        Args:
+            num_users (int): Number of users in the simulation.
+            change (Change): An object representing changes in satisfaction or other parameters.
+            initial_satisfaction (dict): A dictionary mapping persona names to their initial satisfaction levels.
+            seed (int, optional): Scenario seed of the model's random streams, see rng.RandomStreams.
+            comment_history (str): Accepted for compatibility with the other engines; comments
+                are always summarized.
+            max_steps (int, optional): Expected number of steps, used to preallocate the histories.
+            agent_history (str): Accepted for compatibility with the other engines.
+            agent_history_options (dict, optional): Accepted for compatibility with the other engines.
+            profiler (PhaseTimer, optional): Timer that receives the phases of every step;
+                a private one is created if omitted.
+            population_mix (dict, optional): Group and persona weights or persona counts, see
+                population.validate_mix; groups and personas are drawn uniformly if omitted.
+        """
+        self.profiler = profiler if profiler is not None else PhaseTimer()
+        self.num_users = num_users
+        self.change = change
+        self.streams = RandomStreams(seed)
+        self.steps = 0
+
+        # Initialize groups and personas
+        self.catalog = CATALOG
+        self.groups = GROUPS
+        self.group_names = list(self.catalog.group_names)
+        self.persona_names = list(self.catalog.persona_names)
+        persona_groups = np.array(self.catalog.persona_groups)
+
+        # Same persona counts as the other engines: the draw that precedes their shuffle of agents
+        mix = population_mix or {}
+        validate_mix(self.catalog, mix)
+        counts = persona_counts(self.catalog, num_users, mix, self.streams.generator(POPULATION_STREAM))
+        self.level_counts = np.zeros((len(self.persona_names), SATISFACTION_LEVELS), dtype=np.int64)
+        self.level_counts[np.arange(len(self.persona_names)), self.catalog.initial_satisfaction(initial_satisfaction)] = counts
+
+        # Category and sentiment of every satisfaction level as one-hot columns
+        self._category_of_level = np.eye(len(NPS_CATEGORIES), dtype=np.int64)[CATEGORY_BY_SATISFACTION]
+        self._sentiment_of_level = np.eye(len(SENTIMENTS), dtype=np.int64)[SENTIMENT_BY_SATISFACTION]
+
+        # Before the first step, agents carry their persona's initial NPS rating
+        self.nps_counts = NPSAggregator(self.group_names, self.persona_names, persona_groups)
+        initial_categories = nps_categories(np.array(self.catalog.persona_nps))
+        self.nps_counts.set_persona_table(np.eye(len(NPS_CATEGORIES), dtype=np.int64)[initial_categories] * counts[:, None])
+
+        self.comments = CommentLog(
+            self.group_names,
+            self.persona_names,
+            persona_groups,
+            summary_only=True,
+            seed=self.streams.seed_sequence(COMMENTS_STREAM)
+        )
+        self._no_agents = np.empty(0, dtype=np.int8)
+
+        model_reporters = {
+            "Overall NPS": self.compute_overall_nps,
+            "Promoters %": self.compute_promoters_percentage,
+            "Passives %": self.compute_passives_percentage,
+            "Detractors %": self.compute_detractors_percentage
+        }
+        # One numeric column per group rather than a dict per step
+        for group_index, group_name in enumerate(self.nps_counts.group_names):
+            model_reporters[f"{group_name} NPS"] = partial(self.nps_counts.group_score, group_index)
+        self.datacollector = ColumnarDataCollector(
+            model_reporters=model_reporters,
+            agent_reporter=self.get_agent_nps,
+            agent_history=AgentHistory(
+                np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.int8),
+                np.empty(0, dtype=np.int8),
+                self.group_names,
+                self.persona_names,
+                capacity=(max_steps or 0) + 1,
+                retention="final"
+            ),
+            persona_reporter=self.nps_counts.persona_table,
+            persona_history=PersonaCountHistory(
+                self.group_names,
+                self.persona_names,
+                persona_groups,
+                capacity=(max_steps or 0) + 1
+            )
+        )
+        self.datacollector.collect(self)  # Collect initial data
+
+    def step(self):
+        """
+        Advances the whole population by one step.
+        """
+        with self.profiler.phase("update"):
+            rng = self.streams.step_generator(SATISFACTION_STREAM, self.steps)
+            self.level_counts = step_level_counts(self.level_counts, rng)
+            self.nps_counts.set_persona_table(self.level_counts @ self._category_of_level)
+            self.steps += 1
+        with self.profiler.phase("datacollector"):
+            self.datacollector.collect(self)
+        with self.profiler.phase("collect_comments"):
+            self.collect_comments()
+
+    def state_arrays(self):
+        """
+        Returns the population state that, with the seed and step count, determines
+        how the run continues.
+
+        Returns:
+            dict: 'level_counts', the (personas x levels) count table.
+        """
+        return {"level_counts": self.level_counts}
+
+    def restore_state(self, arrays, steps):
+        """
+        Copies the population state of a checkpoint into the model.
+
+        Args:
+            arrays (dict): As returned by state_arrays.
+            steps (int): Number of steps taken when the state was saved.
+
+        Raises:
+            ValueError: If the checkpoint's population differs from the model's.
+        """
+        if not np.array_equal(arrays["level_counts"].sum(axis=1), self.level_counts.sum(axis=1)):
+            raise ValueError("The checkpoint was taken from a different population")
+        self.level_counts = np.array(arrays["level_counts"], dtype=np.int64)
+        self.steps = int(steps)
+
+    def get_agent_nps(self):
+        """
+        Returns the NPS rating of every agent; the engine has no individual agents.
+
+        Returns:
+            np.ndarray: An empty int8 array.
+        """
+        return self._no_agents
+
+    def collect_comments(self):
+        """
+        Appends the step's sentiment counts to the comment log, with example comments
+        subsampled from the counts at the rate that keeps the reservoir sample uniform.
+        """
+        sentiment_counts = self.level_counts @ self._sentiment_of_level
+        rate = min(1.0, self.comments.sample_size / max(self.num_users, 1))
+        sampled = self.streams.step_generator(COMMENT_SAMPLE_STREAM, self.steps).binomial(sentiment_counts, rate)
+        personas, sentiments = np.nonzero(sampled)
+        repeats = sampled[personas, sentiments]
+        self.comments.append_summary(
+            sentiment_counts,
+            self.num_users,
+            np.full(int(repeats.sum()), NO_AGENT_ID, dtype=np.int32),
+            np.repeat(personas, repeats),
+            np.repeat(sentiments, repeats)
+        )
+
+    def get_comments_dataframe(self):
+        """
+        Returns the sample of example comments as a categorical DataFrame.
+
+        Returns:
+            pd.DataFrame: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
+        """
+        return self.comments.to_dataframe()
+
+    def compute_overall_nps(self):
+        """
+        Computes the overall NPS across all agents.
+
+        Returns:
+            float: The overall NPS score.
+        """
+        return self.nps_counts.overall_nps()
+
+    def compute_promoters_percentage(self):
+        """
+        Computes the percentage of Promoters in the simulation.
+
+        Returns:
+            float: Percentage of Promoters.
+        """
+        return self.nps_counts.percentage(PROMOTER)
+
+    def compute_passives_percentage(self):
+        """
+        Computes the percentage of Passives in the simulation.
+
+        Returns:
+            float: Percentage of Passives.
+        """
+        return self.nps_counts.percentage(PASSIVE)
+
+    def compute_detractors_percentage(self):
+        """
+        Computes the percentage of Detractors in the simulation.
+
+        Returns:
+            float: Percentage of Detractors.
+        """
+        return self.nps_counts.percentage(DETRACTOR)
+
+    def compute_group_nps(self):
+        """
+        Computes the NPS for each group.
+
+        Returns:
+            dict: A dictionary mapping group names to their respective NPS scores.
+        """
+        return self.nps_counts.group_nps()
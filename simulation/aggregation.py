@@ -0,0 +1,180 @@
+# simulation/aggregation.py
+
+import numpy as np
+from .mappings import PROMOTER, DETRACTOR, NPS_CATEGORIES
+
+
+class NPSAggregator:
+    def __init__(self, group_names, persona_names, persona_groups):
+        """
+        Keeps running promoter, passive and detractor counts, globally, per group
+        and per persona.
+
+        Counts are only touched when an agent is added or its NPS category changes,
+        so every metric can be read without scanning the agents.
+
+        Args:
+            group_names (list): Group names, in group index order.
+            persona_names (list): Persona names, in persona index order.
+            persona_groups (array-like): Group index of each persona.
+        """
+        self.group_names = list(group_names)
+        self.persona_names = list(persona_names)
+        self.persona_groups = [int(group) for group in persona_groups]
+        self._persona_groups = np.asarray(self.persona_groups, dtype=np.int64)
+        self.counts = [0] * len(NPS_CATEGORIES)
+        self.group_counts = [[0] * len(NPS_CATEGORIES) for _ in self.group_names]
+        self.persona_counts = [[0] * len(NPS_CATEGORIES) for _ in self.persona_names]
+
+    def add(self, persona_index, category):
+        """
+        Counts a new agent.
+
+        Args:
+            persona_index (int): Index of the agent's persona.
+            category (int): The agent's NPS category code.
+        """
+        self.counts[category] += 1
+        self.group_counts[self.persona_groups[persona_index]][category] += 1
+        self.persona_counts[persona_index][category] += 1
+
+    def move(self, persona_index, old_category, new_category):
+        """
+        Moves an agent from one NPS category to another.
+
+        Args:
+            persona_index (int): Index of the agent's persona.
+            old_category (int): The agent's previous NPS category code.
+            new_category (int): The agent's new NPS category code.
+        """
+        if old_category == new_category:
+            return
+        self.counts[old_category] -= 1
+        self.counts[new_category] += 1
+        group_counts = self.group_counts[self.persona_groups[persona_index]]
+        group_counts[old_category] -= 1
+        group_counts[new_category] += 1
+        persona_counts = self.persona_counts[persona_index]
+        persona_counts[old_category] -= 1
+        persona_counts[new_category] += 1
+
+    def add_many(self, persona_index, categories):
+        """
+        Counts a batch of new agents.
+
+        Args:
+            persona_index (np.ndarray): Persona index of each agent.
+            categories (np.ndarray): NPS category code of each agent.
+        """
+        self._apply(self._bincount(persona_index, categories))
+
+    def move_many(self, persona_index, old_categories, new_categories):
+        """
+        Moves a batch of agents between NPS categories. Agents whose category
+        did not change are ignored.
+
+        Args:
+            persona_index (np.ndarray): Persona index of each agent.
+            old_categories (np.ndarray): Previous NPS category code of each agent.
+            new_categories (np.ndarray): New NPS category code of each agent.
+        """
+        changed = old_categories != new_categories
+        if not changed.any():
+            return
+        persona_index = persona_index[changed]
+        delta = self._bincount(persona_index, new_categories[changed]) - self._bincount(persona_index, old_categories[changed])
+        self._apply(delta)
+
+    def set_persona_table(self, table):
+        """
+        Replaces the running counts with a (personas x categories) count table,
+        e.g. the sum of the tables counted by the shards of a population.
+
+        Args:
+            table (np.ndarray): (personas x categories) counts, columns in NPS_CATEGORIES order.
+        """
+        self._apply(np.asarray(table, dtype=np.int64) - self.persona_table())
+
+    def _bincount(self, persona_index, categories):
+        """
+        Returns a (personas x categories) count table for a batch of agents.
+        """
+        num_categories = len(NPS_CATEGORIES)
+        flat = persona_index.astype(np.int64) * num_categories + categories
+        counts = np.bincount(flat, minlength=len(self.persona_names) * num_categories)
+        return counts.reshape(len(self.persona_names), num_categories)
+
+    def _apply(self, delta):
+        """
+        Adds a (personas x categories) count table to the running counts.
+        """
+        group_delta = np.zeros((len(self.group_names), len(NPS_CATEGORIES)), dtype=np.int64)
+        np.add.at(group_delta, self._persona_groups, delta)
+        for counts, rows in ((self.persona_counts, delta), (self.group_counts, group_delta)):
+            for row_counts, row_delta in zip(counts, rows.tolist()):
+                for category, value in enumerate(row_delta):
+                    row_counts[category] += value
+        for category, value in enumerate(delta.sum(axis=0).tolist()):
+            self.counts[category] += value
+
+    def persona_table(self):
+        """
+        Returns a snapshot of the per-persona counts.
+
+        Returns:
+            np.ndarray: (personas x categories) counts, columns in NPS_CATEGORIES order.
+        """
+        return np.array(self.persona_counts, dtype=np.int32).reshape(len(self.persona_names), len(NPS_CATEGORIES))
+
+    @property
+    def total(self):
+        """
+        int: The number of agents counted.
+        """
+        return sum(self.counts)
+
+    def overall_nps(self):
+        """
+        Returns the overall NPS across all counted agents.
+
+        Returns:
+            float: The overall NPS score.
+        """
+        total = self.total
+        return ((self.counts[PROMOTER] - self.counts[DETRACTOR]) / total) * 100 if total > 0 else 0
+
+    def percentage(self, category):
+        """
+        Returns the share of counted agents in an NPS category.
+
+        Args:
+            category (int): PROMOTER, PASSIVE or DETRACTOR.
+
+        Returns:
+            float: Percentage of agents in the category.
+        """
+        total = self.total
+        return (self.counts[category] / total) * 100 if total > 0 else 0
+
+    def group_score(self, group_index):
+        """
+        Returns the NPS of one group.
+
+        Args:
+            group_index (int): Index of the group.
+
+        Returns:
+            float: The group's NPS, or 0.0 for an empty group.
+        """
+        counts = self.group_counts[group_index]
+        total = sum(counts)
+        return ((counts[PROMOTER] - counts[DETRACTOR]) / total) * 100 if total > 0 else 0.0
+
+    def group_nps(self):
+        """
+        Returns the NPS for each group.
+
+        Returns:
+            dict: A dictionary mapping group names to their respective NPS scores.
+        """
+        return {name: self.group_score(index) for index, name in enumerate(self.group_names)}
@@ -0,0 +1,295 @@
+# simulation/cache.py
+
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from .personas import CATALOG
+from .runner import Scenario, scenario_key
+
+# Bump when the layout of cached results changes so stale entries are ignored
+CACHE_VERSION = 10
+
+# Point NPS_SIM_CACHE_DIR at a shared volume to share results between app instances
+DEFAULT_CACHE_DIR = os.environ.get("NPS_SIM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "nps-sim"))
+
+
+def result_key(scenario: Scenario, personas=None):
+    """
+    Returns the cache key of a scenario's result.
+
+    The key is a SHA-256 of the scenario's canonical inputs and of the persona
+    catalog, so editing or switching the persona catalog invalidates earlier results.
+
+    Args:
+        scenario (Scenario): The scenario.
+        personas (dict, optional): Persona definition; defaults to the fingerprint of CATALOG.
+
+    Returns:
+        str: Hex digest identifying the result.
+    """
+    catalog = CATALOG.fingerprint if personas is None else json.dumps(personas, sort_keys=True)
+    payload = f"{CACHE_VERSION}\n{scenario_key(scenario)}\n{catalog}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def metrics_key(scenario: Scenario, personas=None):
+    """
+    Returns the cache key of a scenario's model-level metrics, as returned by
+    runner.run_metrics, which are cached apart from its full result.
+
+    Args:
+        scenario (Scenario): The scenario.
+        personas (dict, optional): Persona definition; defaults to the fingerprint of CATALOG.
+
+    Returns:
+        str: Hex digest identifying the metrics.
+    """
+    return hashlib.sha256(f"metrics\n{result_key(scenario, personas)}".encode("utf-8")).hexdigest()
+
+
+def _owned_copy(result):
+    """
+    Returns a result whose spilled agent history files belong to it alone, or the
+    result itself if nothing was spilled.
+    """
+    if not result.agent_history.spilled():
+        return result
+    return replace(result, agent_history=result.agent_history.snapshot())
+
+
+def _release(result):
+    """
+    Deletes the spilled agent history files of a result leaving the cache.
+    Metrics tables hold no files.
+    """
+    history = getattr(result, "agent_history", None)
+    if history is not None and history.spilled():
+        history.delete_spill()
+
+
+def _size(value):
+    """
+    Returns the memory held by a cached result or metrics table.
+    """
+    if hasattr(value, "agent_history"):
+        return value.nbytes()
+    return int(value.memory_usage(index=True, deep=True).sum())
+
+
+class ResultCache:
+    def __init__(self, max_memory_bytes=512 * 1024 ** 2, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=4 * 1024 ** 3):
+        """
+        Initializes a two-tier cache of simulation results.
+
+        Results live in a size-bounded in-memory LRU tier and, when a cache
+        directory is given, in a gzip-compressed on-disk tier that survives restarts.
+        Only seeded scenarios are cached, since unseeded runs are not reproducible.
+        The model-level metrics of runs that need nothing else, such as the grid
+        points of a parameter sweep, are cached in the same tiers under their own keys.
+
+        Results whose agent history was spilled to disk reference temporary Parquet
+        files, which may not outlive the process or exist on another host sharing
+        the cache directory, so they are kept in the in-memory tier only. The cache
+        keeps its own snapshot of such a history, hard-linking the files, hands out
+        further snapshots, and deletes its files when the entry is evicted.
+
+        Args:
+            max_memory_bytes (int): Upper bound on the memory held by the in-memory tier.
+            cache_dir (str, optional): Directory of the on-disk tier; None disables it.
+            max_disk_bytes (int): Upper bound on the size of the on-disk tier.
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> (result, size), least recently used first
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, scenario: Scenario):
+        """
+        Returns the cached result of a scenario, or None.
+
+        Args:
+            scenario (Scenario): The scenario.
+
+        Returns:
+            SimulationResult or None: The cached result.
+        """
+        if scenario.seed is None:
+            return None
+        return self._lookup(result_key(scenario), _owned_copy)
+
+    def get_metrics(self, scenario: Scenario):
+        """
+        Returns the cached model-level metrics of a scenario, or None.
+
+        Args:
+            scenario (Scenario): The scenario.
+
+        Returns:
+            pd.DataFrame or None: A copy of the table cached by put_metrics.
+        """
+        if scenario.seed is None:
+            return None
+        return self._lookup(metrics_key(scenario), lambda metrics: metrics.copy())
+
+    def _lookup(self, key, owned):
+        """
+        Returns `owned(value)` for the value cached under a key, reading it from the
+        on-disk tier into the in-memory tier if needed, or None.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return owned(self._entries[key][0])
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, value, _size(value))
+        return owned(value)
+
+    def put(self, result):
+        """
+        Caches a result under its scenario.
+
+        Args:
+            result (SimulationResult): The result to cache.
+        """
+        if result.scenario.seed is None:
+            return
+        key = result_key(result.scenario)
+        if result.agent_history.spilled():
+            self._remember(key, _owned_copy(result), result.nbytes())
+            return
+        self._remember(key, result, result.nbytes())
+        self._write(key, result)
+
+    def put_metrics(self, scenario: Scenario, metrics):
+        """
+        Caches the model-level metrics of a scenario.
+
+        Args:
+            scenario (Scenario): The scenario.
+            metrics (pd.DataFrame): Its metrics, as returned by runner.run_metrics.
+        """
+        if scenario.seed is None:
+            return
+        key = metrics_key(scenario)
+        metrics = metrics.copy()
+        self._remember(key, metrics, _size(metrics))
+        self._write(key, metrics)
+
+    def clear(self):
+        """
+        Empties the in-memory tier. The on-disk tier is kept.
+        """
+        with self._lock:
+            evicted = [result for result, _ in self._entries.values()]
+            self._entries.clear()
+            self._memory_bytes = 0
+        for result in evicted:
+            _release(result)
+
+    def _remember(self, key, result, size):
+        """
+        Adds a result or metrics table of `size` bytes to the in-memory tier,
+        evicting least recently used entries.
+        """
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                old, old_size = self._entries.pop(key)
+                self._memory_bytes -= old_size
+                if old is not result:
+                    evicted.append(old)
+            if size > self.max_memory_bytes:
+                evicted.append(result)
+            else:
+                self._entries[key] = (result, size)
+                self._memory_bytes += size
+                while self._memory_bytes > self.max_memory_bytes:
+                    _, (old, old_size) = self._entries.popitem(last=False)
+                    self._memory_bytes -= old_size
+                    evicted.append(old)
+        for old in evicted:
+            _release(old)
+
+    def _path(self, key):
+        """
+        Returns the on-disk path of a key.
+        """
+        return os.path.join(self.cache_dir, f"{key}.pkl.gz")
+
+    def _read(self, key):
+        """
+        Loads a result or metrics table from the on-disk tier, or returns None.
+        """
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rb") as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Corrupt or outdated entry; drop it and recompute
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)  # Mark as recently used for disk eviction
+        return result
+
+    def _write(self, key, result):
+        """
+        Writes a result or metrics table to the on-disk tier atomically, then enforces the size bound.
+        """
+        if self.cache_dir is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=3) as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """
+        Removes the least recently used on-disk entries until the tier fits its bound.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl.gz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total -= size
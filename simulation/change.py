@@ -0,0 +1,13 @@
+# simulation/change.py
+
+from dataclasses import dataclass
+
+@dataclass
+class Change:
+    """
+    A data class to encapsulate simulation change parameters.
+    
+    Attributes:
+        csat_score (float): The Customer Satisfaction Score influencing the simulation.
+    """
+    csat_score: float
@@ -0,0 +1,156 @@
+# simulation/checkpoint.py
+
+import json
+from dataclasses import asdict, replace
+import numpy as np
+from .change import Change
+from .runner import Scenario, build_model
+
+# Bump when the layout of checkpoint files changes so old files are rejected
+CHECKPOINT_VERSION = 1
+
+
+def _json_value(value):
+    """
+    Converts NumPy scalars, e.g. a seed from a number input, for json.dumps.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__} in a checkpoint")
+
+
+class Checkpoint:
+    """
+    A snapshot of a run after some step, from which the run can be resumed or
+    forked into branches.
+
+    Every random draw is addressed by (seed, agent id, step), so the snapshot
+    only needs the seed's entropy and the step count besides the agent state,
+    the collected histories and the comment log. A resumed run continues exactly
+    as the original would have.
+
+    The arrays of a checkpoint are read-only. Restored models copy the agent
+    state, which they update in place, but keep the collected agent history and
+    comments as a shared prefix; branches forked from one checkpoint therefore
+    share the history of the steps before the fork instead of each copying it.
+    """
+
+    def __init__(self, scenario: Scenario, steps, entropy, arrays):
+        """
+        Initializes a checkpoint; use from_model or load rather than calling this directly.
+
+        Args:
+            scenario (Scenario): The scenario the run was built from.
+            steps (int): Number of steps taken when the snapshot was made.
+            entropy (int): Entropy of the run's RandomStreams.
+            arrays (dict): Named arrays holding the model's state, histories and comments.
+        """
+        self.scenario = scenario
+        self.steps = int(steps)
+        self.entropy = int(entropy)
+        self.arrays = arrays
+        for array in arrays.values():
+            array.flags.writeable = False
+
+    @classmethod
+    def from_model(cls, scenario: Scenario, model):
+        """
+        Takes a snapshot of a model between steps.
+
+        Args:
+            scenario (Scenario): The scenario the model was built from.
+            model: A model of any engine in runner.ENGINES.
+
+        Returns:
+            Checkpoint: A snapshot independent of the model, which can keep running.
+
+        Raises:
+            ValueError: If the model's agent history has been spilled to disk.
+        """
+        arrays = {f"state.{name}": array for name, array in model.state_arrays().items()}
+        arrays.update({f"data.{name}": array for name, array in model.datacollector.state_arrays().items()})
+        arrays.update({f"comments.{name}": array for name, array in model.comments.state_arrays().items()})
+        arrays["nps_table"] = model.nps_counts.persona_table()
+        # Copies, since the model keeps updating its own arrays
+        arrays = {name: np.array(array, copy=True) for name, array in arrays.items()}
+        return cls(scenario, model.steps, model.streams.entropy, arrays)
+
+    def _section(self, prefix):
+        """
+        Returns the arrays under a name prefix, with the prefix removed.
+        """
+        return {name.removeprefix(prefix): array for name, array in self.arrays.items() if name.startswith(prefix)}
+
+    def restore(self, change: Change = None, profiler=None):
+        """
+        Builds a model in the state of the snapshot, ready to take further steps.
+
+        Args:
+            change (Change, optional): Change applied from the snapshot on; defaults to the
+                scenario's own.
+            profiler (PhaseTimer, optional): Timer that receives the phases of every step.
+
+        Returns:
+            tuple: The branch's Scenario and the restored model.
+        """
+        scenario = self.scenario if change is None else replace(self.scenario, csat_score=change.csat_score)
+        # Unseeded runs are rebuilt from their entropy, which reproduces the same population
+        model = build_model(replace(scenario, seed=self.entropy) if scenario.seed is None else scenario, profiler=profiler)
+        model.restore_state(self._section("state."), self.steps)
+        model.nps_counts.set_persona_table(self.arrays["nps_table"])
+        model.datacollector.restore_state(self._section("data."))
+        model.comments.restore_state(self._section("comments."))
+        return scenario, model
+
+    def fork(self, changes, profiler=None):
+        """
+        Restores one branch per change, all sharing the history before the snapshot.
+
+        Branches draw the same random numbers after the fork, so differences between
+        them come from their changes alone.
+
+        Args:
+            changes (iterable): One Change per branch.
+            profiler (PhaseTimer, optional): Timer that receives the phases of every branch's steps.
+
+        Returns:
+            list: (Scenario, model) of each branch, in the order of the changes.
+        """
+        return [self.restore(change, profiler=profiler) for change in changes]
+
+    def save(self, path):
+        """
+        Writes the checkpoint to a compressed .npz file, with the scenario and step
+        count as JSON inside it. No pickles are written.
+
+        Args:
+            path (str or file): Destination; NumPy adds '.npz' to names without it.
+        """
+        meta = {
+            "version": CHECKPOINT_VERSION,
+            "scenario": asdict(self.scenario),
+            "steps": self.steps,
+            "entropy": self.entropy
+        }
+        np.savez_compressed(path, meta=np.array(json.dumps(meta, default=_json_value)), **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a checkpoint written by save.
+
+        Args:
+            path (str or file): The .npz file.
+
+        Returns:
+            Checkpoint: The checkpoint.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version: {meta.get('version')!r}")
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+        return cls(Scenario(**meta["scenario"]), meta["steps"], meta["entropy"], arrays)
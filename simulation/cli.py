@@ -0,0 +1,138 @@
+# simulation/cli.py
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import fields, replace
+from .export import EXPORT_FORMATS, RunExporter
+from .personas import CATALOG
+from .population import validate_mix
+from .runner import ENGINES, Scenario, build_model
+
+# Keys a scenario entry may set besides those of Scenario
+SCENARIO_EXTRA_KEYS = {"name", "seeds"}
+
+
+def load_scenarios(path):
+    """
+    Reads a scenario file and expands it into one Scenario per seed.
+
+    The file is JSON holding a single scenario object, a list of them, or an object
+    with a "scenarios" list and optional "defaults" applied to every entry. Each
+    entry takes the fields of Scenario plus an optional "name" and a "seeds" list
+    that runs the entry once per seed, e.g.
+
+        {"defaults": {"num_steps": 50, "csat_score": 0.8},
+         "scenarios": [{"name": "baseline", "num_users": 1000, "seeds": [1, 2, 3],
+                        "initial_satisfaction": {"Data Engineer": 6}}]}
+
+    Args:
+        path (str): Path of the scenario file.
+
+    Returns:
+        list: (name, Scenario) pairs in file order.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        spec = json.load(file)
+
+    defaults = {}
+    if isinstance(spec, dict) and "scenarios" in spec:
+        defaults = spec.get("defaults", {})
+        entries = spec["scenarios"]
+    elif isinstance(spec, list):
+        entries = spec
+    else:
+        entries = [spec]
+
+    scenario_keys = {f.name for f in fields(Scenario)}
+    runs = []
+    for index, entry in enumerate(entries):
+        entry = {**defaults, **entry}
+        name = str(entry.pop("name", f"scenario-{index}"))
+        unknown = set(entry) - scenario_keys - SCENARIO_EXTRA_KEYS
+        if unknown:
+            raise ValueError(f"Scenario {name!r} has unknown keys: {', '.join(sorted(unknown))}")
+        unknown = set(entry.get("initial_satisfaction", {})) - set(CATALOG.persona_ids)
+        if unknown:
+            raise ValueError(f"Scenario {name!r} has unknown personas: {', '.join(sorted(unknown))}")
+        if entry.get("engine", "mesa") not in ENGINES:
+            raise ValueError(f"Scenario {name!r} has unknown engine: {entry['engine']!r}")
+        try:
+            validate_mix(CATALOG, entry.get("population_mix", {}))
+        except ValueError as error:
+            raise ValueError(f"Scenario {name!r}: {error}") from None
+
+        seeds = entry.pop("seeds", None)
+        scenario = Scenario(**entry)
+        if seeds is None:
+            runs.append((name, scenario))
+        else:
+            runs.extend((name, replace(scenario, seed=int(seed))) for seed in seeds)
+    return runs
+
+
+def run_to_files(scenario: Scenario, output_dir, output_format="parquet"):
+    """
+    Runs a scenario, streaming its data to one file per table as it runs.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        output_dir (str): Directory that receives the tables of export.EXPORT_TABLES
+            plus the resolved 'scenario.json'.
+        output_format (str): One of export.EXPORT_FORMATS.
+
+    Returns:
+        dict: Table names mapped to the paths written.
+    """
+    model = build_model(scenario)
+    try:
+        exporter = RunExporter(output_dir, output_format)
+        exporter.attach(model)
+        for _ in range(scenario.num_steps):
+            model.step()
+        paths = exporter.close(scenario)
+        # Every step was exported as it was recorded, so spilled files are no longer needed
+        model.datacollector.agent_history.delete_spill()
+        return paths
+    finally:
+        # Shuts down a sharded model's workers and frees its shared memory
+        model.close()
+
+
+def main(argv=None):
+    """
+    Runs every scenario in a scenario file without loading the UI or plotting modules.
+
+    Args:
+        argv (list, optional): Command-line arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: Process exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m simulation",
+        description="Run NPS simulation scenarios headlessly and write the results to Parquet or Arrow files."
+    )
+    parser.add_argument("scenario_file", help="JSON file describing the scenarios to run.")
+    parser.add_argument("-o", "--output-dir", default="results",
+                        help="Directory that receives one sub-directory per scenario and seed (default: results).")
+    parser.add_argument("-f", "--format", choices=sorted(EXPORT_FORMATS), default="parquet",
+                        help="Output file format (default: parquet).")
+    args = parser.parse_args(argv)
+
+    try:
+        runs = load_scenarios(args.scenario_file)
+    except (OSError, ValueError, TypeError) as error:
+        parser.error(str(error))
+
+    for name, scenario in runs:
+        run_dir = os.path.join(args.output_dir, name)
+        if scenario.seed is not None:
+            run_dir = os.path.join(run_dir, f"seed-{scenario.seed}")
+        start = time.perf_counter()
+        run_to_files(scenario, run_dir, args.format)
+        print(f"{name} (seed {scenario.seed}): {scenario.num_steps} steps, {scenario.num_users} users "
+              f"in {time.perf_counter() - start:.2f}s -> {run_dir}", file=sys.stderr)
+    return 0
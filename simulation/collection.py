@@ -0,0 +1,704 @@
+# simulation/collection.py
+
+import copy
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+import numpy as np
+from .mappings import PROMOTER, PASSIVE, DETRACTOR, NPS_CATEGORIES, code_dtype
+
+
+# Agent history retention policies, see AgentHistory
+AGENT_HISTORY_POLICIES = ("full", "final", "every", "sample", "spill")
+
+# Spilled agent history goes here unless a spill directory is given
+DEFAULT_SPILL_DIR = os.environ.get("NPS_SIM_SPILL_DIR", os.path.join(tempfile.gettempdir(), "nps-sim-spill"))
+
+
+class AgentHistory:
+    def __init__(self, agent_ids, group_codes, persona_codes, group_names, persona_names, capacity=1,
+                 retention="full", every=10, sample_size=1000, seed=None, spill_dir=None, chunk_steps=64):
+        """
+        Initializes preallocated (steps x agents) buffers for agent-level data.
+
+        NPS ratings are stored as int8, one row per recorded step; group and persona
+        are stored once per agent as categorical codes, since they never change.
+        Buffers double in size when a run outgrows them.
+
+        The retention policy bounds memory on long or large runs:
+        "full" keeps every agent at every step; "final" keeps only the latest step;
+        "every" keeps the steps that are multiples of `every`; "sample" keeps every
+        step for a fixed uniform sample of `sample_size` agents; "spill" keeps every
+        step but writes each chunk of `chunk_steps` steps to a Parquet file, holding
+        only the current chunk in memory.
+
+        Args:
+            agent_ids (np.ndarray): Agent ids, in the order agent values are recorded.
+            group_codes (np.ndarray): Group index of each agent.
+            persona_codes (np.ndarray): Persona index of each agent.
+            group_names (list): Group names, in group index order.
+            persona_names (list): Persona names, in persona index order.
+            capacity (int): Number of steps to preallocate.
+            retention (str): One of AGENT_HISTORY_POLICIES.
+            every (int): Step interval of the "every" policy.
+            sample_size (int): Number of agents tracked by the "sample" policy.
+            seed (int or np.random.SeedSequence, optional): Seed for choosing the agents tracked by the "sample" policy.
+            spill_dir (str, optional): Directory of the "spill" policy; defaults to DEFAULT_SPILL_DIR.
+            chunk_steps (int): Steps per Parquet file of the "spill" policy.
+        """
+        if retention not in AGENT_HISTORY_POLICIES:
+            raise ValueError(f"Unknown agent history retention: {retention!r}")
+        self.retention = retention
+        self.every = max(int(every), 1)
+        self.group_names = list(group_names)
+        self.persona_names = list(persona_names)
+        agent_ids = np.asarray(agent_ids, dtype=np.int32)
+        group_codes = np.asarray(group_codes, dtype=code_dtype(len(self.group_names)))
+        persona_codes = np.asarray(persona_codes, dtype=code_dtype(len(self.persona_names)))
+
+        # Positions of the tracked agents in the recorded NPS arrays; None tracks everyone
+        self._tracked = None
+        if retention == "sample" and sample_size < len(agent_ids):
+            rng = np.random.default_rng(seed)
+            self._tracked = np.sort(rng.choice(len(agent_ids), size=int(sample_size), replace=False))
+            agent_ids, group_codes, persona_codes = (
+                agent_ids[self._tracked], group_codes[self._tracked], persona_codes[self._tracked]
+            )
+        self.agent_ids = agent_ids
+        self.group_codes = group_codes
+        self.persona_codes = persona_codes
+
+        self._spill_dir = None
+        self._spill_files = []
+        self._spill_last_steps = []  # Last step written to each spill file
+        self._spilled_steps = 0
+        if retention == "final":
+            capacity = 1
+        elif retention == "every":
+            capacity = capacity // self.every + 1
+        elif retention == "spill":
+            capacity = max(int(chunk_steps), 1)
+            self._spill_dir = os.path.join(spill_dir or DEFAULT_SPILL_DIR, uuid.uuid4().hex)
+
+        num_agents = len(self.agent_ids)
+        capacity = max(capacity, 1)
+        self._steps = np.empty(capacity, dtype=np.int32)
+        # Group and persona codes never change, so they are kept once per agent, not per step
+        self._nps = np.empty((capacity, num_agents), dtype=np.int8)
+        self._size = 0
+
+        # Steps restored from a checkpoint, read-only and possibly shared with other branches
+        self._prefix_steps = np.empty(0, dtype=np.int32)
+        self._prefix_nps = np.empty((0, num_agents), dtype=np.int8)
+
+        # Per-row arrays that depend only on the number of steps, held weakly, see _per_row
+        self._per_row_arrays = weakref.WeakValueDictionary()
+
+    def __getstate__(self):
+        """
+        Returns the state to pickle, without the weakly held per-row arrays.
+        """
+        state = self.__dict__.copy()
+        del state["_per_row_arrays"]
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled history with no per-row arrays built yet.
+        """
+        self.__dict__.update(state)
+        self._per_row_arrays = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        """
+        Returns the number of recorded steps, including any restored or spilled to disk.
+        """
+        return len(self._prefix_steps) + self._spilled_steps + self._size
+
+    def nbytes(self):
+        """
+        Returns the memory held by the in-memory buffers, including restored steps.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return (
+            self._steps.nbytes + self._nps.nbytes + self.group_codes.nbytes + self.persona_codes.nbytes
+            + self._prefix_steps.nbytes + self._prefix_nps.nbytes
+        )
+
+    def record(self, step, nps):
+        """
+        Records the NPS rating of every agent at a step, subject to the retention policy.
+
+        Args:
+            step (int): The model step.
+            nps (np.ndarray): NPS rating of each agent, in the order of the agent ids
+                passed to the constructor.
+        """
+        if self.retention == "every" and step % self.every:
+            return
+        if self.retention == "final":
+            self._size = 0
+            self._prefix_steps, self._prefix_nps = self._prefix_steps[:0], self._prefix_nps[:0]
+        if self._tracked is not None:
+            nps = nps[self._tracked]
+        if self._size == len(self._steps):
+            if self.retention == "spill":
+                self._spill()
+            else:
+                self._grow(2 * self._size)
+        row = self._size
+        self._steps[row] = step
+        self._nps[row] = nps
+        self._size += 1
+
+    def _grow(self, capacity):
+        """
+        Reallocates the buffers with room for `capacity` steps.
+        """
+        for name in ("_steps", "_nps"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _spill(self):
+        """
+        Writes the buffered steps to a new Parquet file and empties the buffers.
+        """
+        import pyarrow.parquet as pq
+
+        os.makedirs(self._spill_dir, exist_ok=True)
+        path = os.path.join(self._spill_dir, f"part-{len(self._spill_files):05d}.parquet")
+        pq.write_table(self._buffered_table(), path)
+        self._spill_files.append(path)
+        self._spill_last_steps.append(int(self._steps[self._size - 1]))
+        self._spilled_steps += self._size
+        self._size = 0
+
+    def spilled(self):
+        """
+        Returns whether any steps have been spilled to Parquet files.
+        """
+        return bool(self._spill_files)
+
+    def delete_spill(self):
+        """
+        Deletes the Parquet files of spilled steps, e.g. once they have been exported.
+        The history then only holds the steps still in memory.
+        """
+        for path in self._spill_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if self._spill_dir is not None and os.path.isdir(self._spill_dir):
+            os.rmdir(self._spill_dir)
+        self._spill_files = []
+        self._spill_last_steps = []
+        self._spilled_steps = 0
+
+    def steps(self):
+        """
+        Returns the step numbers held in memory.
+
+        Returns:
+            np.ndarray: Step numbers of the restored and buffered rows.
+        """
+        if len(self._prefix_steps):
+            return np.concatenate([self._prefix_steps, self._steps[:self._size]])
+        return self._steps[:self._size]
+
+    def snapshot(self):
+        """
+        Returns a copy of the history that later steps of the model do not change.
+
+        The buffered steps are copied and restored steps, which are read-only, are
+        shared. Spilled files are hard-linked (or copied, across file systems) into
+        a spill directory of the snapshot's own, so either history can delete its
+        files without affecting the other.
+
+        Returns:
+            AgentHistory: The snapshot.
+        """
+        snapshot = copy.copy(self)
+        snapshot._steps = self._steps[:self._size].copy()
+        snapshot._nps = self._nps[:self._size].copy()
+        snapshot._spill_last_steps = list(self._spill_last_steps)
+        if self._spill_dir is not None:
+            snapshot._spill_dir = os.path.join(os.path.dirname(self._spill_dir), uuid.uuid4().hex)
+        snapshot._spill_files = []
+        if self._spill_files:
+            os.makedirs(snapshot._spill_dir)
+            for path in self._spill_files:
+                target = os.path.join(snapshot._spill_dir, os.path.basename(path))
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copyfile(path, target)
+                snapshot._spill_files.append(target)
+        return snapshot
+
+    def state_arrays(self):
+        """
+        Returns the recorded steps for a checkpoint.
+
+        Returns:
+            dict: 'steps' (step numbers) and 'nps' ((steps x tracked agents) NPS ratings).
+
+        Raises:
+            ValueError: If steps have been spilled to disk.
+        """
+        if self._spill_files:
+            raise ValueError("Agent history spilled to disk cannot be checkpointed")
+        return {"steps": self.steps(), "nps": np.concatenate([self._prefix_nps, self._nps[:self._size]])}
+
+    def restore_state(self, arrays):
+        """
+        Replaces the recorded steps with those of a checkpoint. The arrays are kept
+        as a read-only prefix, not copied, so branches restored from the same
+        checkpoint share them; later steps go to the history's own buffers.
+
+        Args:
+            arrays (dict): 'steps' and 'nps', as returned by state_arrays.
+        """
+        nps = arrays["nps"]
+        if nps.shape[1:] != (len(self.agent_ids),):
+            raise ValueError(f"Checkpoint tracks {nps.shape[1]} agents, not {len(self.agent_ids)}")
+        self._prefix_steps = arrays["steps"]
+        self._prefix_nps = nps
+        self._size = 0
+
+    def to_dataframe(self):
+        """
+        Returns the agent history as a DataFrame indexed by (Step, AgentID).
+
+        Without spilled or restored steps, nothing recorded is copied: 'NPS Rating'
+        is a view of the buffer and the Step level is a view of the step buffer.
+        The per-row index codes and 'Group'/'Persona' codes are built in the
+        narrowest integer dtype pandas keeps, and are shared with any earlier
+        frame or table of the history that is still referenced (see _per_row).
+        Spilled and restored steps are read back through to_arrow and copied.
+
+        Returns:
+            pd.DataFrame: 'Group', 'Persona' and 'NPS Rating' columns.
+        """
+        import pandas as pd
+
+        if self._spill_files or len(self._prefix_steps):
+            return self.to_arrow().to_pandas().set_index(["Step", "AgentID"])
+
+        size = self._size
+        num_agents = len(self.agent_ids)
+        step_dtype, agent_dtype = code_dtype(size), code_dtype(num_agents)
+        index = pd.MultiIndex(
+            levels=[pd.Index(self._steps[:size]), pd.Index(self.agent_ids)],
+            codes=[
+                self._per_row(("step", step_dtype), size, lambda n: np.arange(n, dtype=step_dtype)[:, None]),
+                self._per_row(("agent", agent_dtype), size, lambda n: np.arange(num_agents, dtype=agent_dtype))
+            ],
+            names=["Step", "AgentID"],
+            verify_integrity=False
+        )
+        group_codes = self._per_row("group", size, lambda n: self.group_codes)
+        persona_codes = self._per_row("persona", size, lambda n: self.persona_codes)
+        return pd.DataFrame({
+            "Group": pd.Categorical.from_codes(group_codes, categories=self.group_names, validate=False),
+            "Persona": pd.Categorical.from_codes(persona_codes, categories=self.persona_names, validate=False),
+            "NPS Rating": self._nps[:size].reshape(-1)
+        }, index=index, copy=False)
+
+    def _per_row(self, key, size, values):
+        """
+        Returns a read-only array with one element per agent per step, for `size` steps.
+
+        `values(steps)` gives what each row repeats: an array with one value per
+        agent, or a (steps x 1) column with one value per step. The array for fewer
+        steps is a prefix of the one for more, so the last (steps x agents) array
+        built for each key is held weakly: while a frame or table still references
+        it, later calls return a view of it instead of allocating again, and once
+        nothing does, its memory is freed rather than kept by the history.
+
+        Args:
+            key (hashable): Identifies the array, including its dtype.
+            size (int): Number of steps.
+            values (callable): Returns the values to broadcast over a number of steps.
+
+        Returns:
+            np.ndarray: Flat view of the (steps x agents) array.
+        """
+        array = self._per_row_arrays.get(key)
+        if array is None or len(array) < size:
+            # A new array, not a view, so the slices handed out keep this very object alive
+            array = np.empty((size, len(self.agent_ids)), dtype=values(0).dtype)
+            array[:] = values(size)
+            array.flags.writeable = False
+            self._per_row_arrays[key] = array
+        return array[:size].reshape(-1)
+
+    def iter_tables(self, after=None):
+        """
+        Yields the agent history chunk by chunk as pyarrow Tables: first the steps
+        restored from a checkpoint, then every spilled file, then the steps held in memory.
+
+        Args:
+            after (int, optional): Only yield steps later than this one, e.g. those not yet
+                exported; spilled files holding no such step are not read.
+
+        Yields:
+            pyarrow.Table: 'Step', 'AgentID', 'Group', 'Persona' and 'NPS Rating' columns.
+        """
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        if len(self._prefix_steps):
+            start = 0 if after is None else np.searchsorted(self._prefix_steps, after, side="right")
+            if start < len(self._prefix_steps):
+                yield self._table(self._prefix_steps[start:], self._prefix_nps[start:])
+        for path, last_step in zip(self._spill_files, self._spill_last_steps):
+            if after is None:
+                yield pq.read_table(path)
+            elif last_step > after:
+                table = pq.read_table(path)
+                yield table.filter(pc.greater(table["Step"], after))
+        start = 0 if after is None else np.searchsorted(self._steps[:self._size], after, side="right")
+        yield self._table(self._steps[start:self._size], self._nps[start:self._size])
+
+    def to_arrow(self):
+        """
+        Returns the agent history as a pyarrow Table with 'Step' and 'AgentID'
+        columns. 'Group' and 'Persona' are dictionary-encoded. Without spilled or
+        restored steps, 'NPS Rating' is a view of the buffer, 'Step' is built per
+        call, and 'AgentID' and the dictionary indices are shared like the codes
+        of to_dataframe.
+
+        Returns:
+            pyarrow.Table: 'Step', 'AgentID', 'Group', 'Persona' and 'NPS Rating' columns.
+        """
+        import pyarrow as pa
+
+        if not self._spill_files and not len(self._prefix_steps):
+            return self._buffered_table()
+        return pa.concat_tables(self.iter_tables())
+
+    def _buffered_table(self):
+        """
+        Returns the steps held in memory as a pyarrow Table.
+        """
+        return self._table(self._steps[:self._size], self._nps[:self._size])
+
+    def _table(self, steps, nps):
+        """
+        Returns recorded steps as a pyarrow Table.
+
+        Args:
+            steps (np.ndarray): Step numbers.
+            nps (np.ndarray): (steps x tracked agents) NPS ratings.
+        """
+        import pyarrow as pa
+
+        size = len(steps)
+        # int32 dictionary indices, as Parquet reads them back, so spilled and buffered chunks concatenate
+        group_codes = self._per_row("group32", size, lambda n: self.group_codes.astype(np.int32))
+        persona_codes = self._per_row("persona32", size, lambda n: self.persona_codes.astype(np.int32))
+        return pa.table({
+            "Step": np.repeat(steps, len(self.agent_ids)),
+            "AgentID": self._per_row("agent_id", size, lambda n: self.agent_ids),
+            "Group": pa.DictionaryArray.from_arrays(group_codes, self.group_names),
+            "Persona": pa.DictionaryArray.from_arrays(persona_codes, self.persona_names),
+            "NPS Rating": nps.reshape(-1)
+        })
+
+
+class PersonaCountHistory:
+    def __init__(self, group_names, persona_names, persona_groups, capacity=1):
+        """
+        Initializes a preallocated (steps x personas x NPS categories) count cube.
+
+        Each persona belongs to one group, so the cube also holds every group
+        breakdown. Buffers double in size when a run outgrows them.
+
+        Args:
+            group_names (list): Group names, in group index order.
+            persona_names (list): Persona names, in persona index order.
+            persona_groups (array-like): Group index of each persona.
+            capacity (int): Number of steps to preallocate.
+        """
+        self.group_names = list(group_names)
+        self.persona_names = list(persona_names)
+        self.persona_groups = np.asarray(persona_groups, dtype=code_dtype(len(self.group_names)))
+        capacity = max(capacity, 1)
+        self._steps = np.empty(capacity, dtype=np.int32)
+        self._counts = np.empty((capacity, len(self.persona_names), len(NPS_CATEGORIES)), dtype=np.int32)
+        self._size = 0
+
+    def __len__(self):
+        """
+        Returns the number of recorded steps.
+        """
+        return self._size
+
+    def nbytes(self):
+        """
+        Returns the memory held by the count buffers.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return self._steps.nbytes + self._counts.nbytes
+
+    def record(self, step, counts):
+        """
+        Records the per-persona NPS category counts at a step.
+
+        Args:
+            step (int): The model step.
+            counts (np.ndarray): (personas x categories) counts, e.g. NPSAggregator.persona_table().
+        """
+        if self._size == len(self._steps):
+            for name in ("_steps", "_counts"):
+                old = getattr(self, name)
+                new = np.empty((2 * self._size,) + old.shape[1:], dtype=old.dtype)
+                new[:self._size] = old[:self._size]
+                setattr(self, name, new)
+        self._steps[self._size] = step
+        self._counts[self._size] = counts
+        self._size += 1
+
+    def steps(self):
+        """
+        Returns the recorded step numbers.
+
+        Returns:
+            np.ndarray: Step numbers, one per recorded row.
+        """
+        return self._steps[:self._size]
+
+    def snapshot(self):
+        """
+        Returns a copy of the count cube that later steps of the model do not change.
+
+        Returns:
+            PersonaCountHistory: The snapshot.
+        """
+        snapshot = copy.copy(self)
+        snapshot._steps = self.steps().copy()
+        snapshot._counts = self.counts().copy()
+        return snapshot
+
+    def state_arrays(self):
+        """
+        Returns the recorded steps for a checkpoint.
+
+        Returns:
+            dict: 'steps' and 'counts', see steps() and counts().
+        """
+        return {"steps": self.steps(), "counts": self.counts()}
+
+    def restore_state(self, arrays):
+        """
+        Replaces the recorded steps with copies of those of a checkpoint.
+
+        Args:
+            arrays (dict): 'steps' and 'counts', as returned by state_arrays.
+        """
+        size = len(arrays["steps"])
+        capacity = max(len(self._steps), size)
+        self._steps = np.empty(capacity, dtype=np.int32)
+        self._counts = np.empty((capacity, len(self.persona_names), len(NPS_CATEGORIES)), dtype=np.int32)
+        self._steps[:size] = arrays["steps"]
+        self._counts[:size] = arrays["counts"]
+        self._size = size
+
+    def counts(self):
+        """
+        Returns the recorded count cube.
+
+        Returns:
+            np.ndarray: (steps x personas x categories) counts, categories in NPS_CATEGORIES order.
+        """
+        return self._counts[:self._size]
+
+    def persona_nps(self, row=-1):
+        """
+        Returns the NPS breakdown of every persona with agents at one recorded step.
+
+        Args:
+            row (int): Index of the recorded step; the last one by default.
+
+        Returns:
+            pd.DataFrame: 'Group', 'Persona', 'Promoters %', 'Passives %', 'Detractors %'
+                and 'NPS Score' columns, one row per persona.
+        """
+        import pandas as pd
+
+        counts = self.counts()[row].astype(np.float64)
+        totals = counts.sum(axis=1)
+        present = totals > 0
+        shares = counts[present] / totals[present, None] * 100
+        return pd.DataFrame({
+            "Group": [self.group_names[group] for group in self.persona_groups[present]],
+            "Persona": [name for name, keep in zip(self.persona_names, present) if keep],
+            "Promoters %": shares[:, PROMOTER],
+            "Passives %": shares[:, PASSIVE],
+            "Detractors %": shares[:, DETRACTOR],
+            "NPS Score": shares[:, PROMOTER] - shares[:, DETRACTOR]
+        })
+
+    def persona_nps_over_time(self):
+        """
+        Returns the NPS of every persona with agents at every recorded step.
+
+        Returns:
+            pd.DataFrame: Indexed by 'Step', one column per persona.
+        """
+        import pandas as pd
+
+        counts = self.counts().astype(np.float64)
+        totals = counts.sum(axis=2)
+        present = totals[0] > 0 if self._size else np.zeros(len(self.persona_names), dtype=bool)
+        nps = (counts[:, present, PROMOTER] - counts[:, present, DETRACTOR]) / totals[:, present] * 100
+        return pd.DataFrame(
+            nps,
+            index=pd.Index(self.steps(), name="Step"),
+            columns=[name for name, keep in zip(self.persona_names, present) if keep]
+        )
+
+    def to_dataframe(self):
+        """
+        Returns the count cube as a tidy DataFrame.
+
+        Returns:
+            pd.DataFrame: 'Step', 'Group', 'Persona', 'Category' and 'Count' columns.
+        """
+        import pandas as pd
+
+        num_personas, num_categories = len(self.persona_names), len(NPS_CATEGORIES)
+        personas = np.tile(np.repeat(np.arange(num_personas), num_categories), self._size)
+        return pd.DataFrame({
+            "Step": np.repeat(self.steps(), num_personas * num_categories),
+            "Group": pd.Categorical.from_codes(self.persona_groups[personas], categories=self.group_names),
+            "Persona": pd.Categorical.from_codes(personas, categories=self.persona_names),
+            "Category": pd.Categorical.from_codes(
+                np.tile(np.arange(num_categories), self._size * num_personas), categories=list(NPS_CATEGORIES)
+            ),
+            "Count": self.counts().reshape(-1)
+        })
+
+    def to_arrow(self, start=0):
+        """
+        Returns recorded steps of the count cube as a tidy pyarrow Table.
+
+        Args:
+            start (int): Index of the first recorded step to include.
+
+        Returns:
+            pyarrow.Table: 'Step', 'Group', 'Persona', 'Category' and 'Count' columns.
+        """
+        import pyarrow as pa
+
+        counts = self.counts()[start:]
+        size = len(counts)
+        num_personas, num_categories = len(self.persona_names), len(NPS_CATEGORIES)
+        personas = np.tile(np.repeat(np.arange(num_personas, dtype=np.int32), num_categories), size)
+        return pa.table({
+            "Step": np.repeat(self.steps()[start:], num_personas * num_categories),
+            "Group": pa.DictionaryArray.from_arrays(self.persona_groups.astype(np.int32)[personas], self.group_names),
+            "Persona": pa.DictionaryArray.from_arrays(personas, self.persona_names),
+            "Category": pa.DictionaryArray.from_arrays(
+                np.tile(np.arange(num_categories, dtype=np.int32), size * num_personas), list(NPS_CATEGORIES)
+            ),
+            "Count": counts.reshape(-1)
+        })
+
+
+class ColumnarDataCollector:
+    def __init__(self, model_reporters, agent_reporter, agent_history, persona_reporter=None, persona_history=None):
+        """
+        Collects model-level reporters and agent-level history.
+
+        Offers the parts of Mesa's DataCollector interface the app uses, with agent
+        data kept in an AgentHistory instead of a tuple per agent per step.
+
+        Args:
+            model_reporters (dict): Mapping of variable names to zero-argument callables.
+            agent_reporter (callable): Returns the NPS rating of every agent as an array.
+            agent_history (AgentHistory): Buffers the agent-level data is recorded into.
+            persona_reporter (callable, optional): Returns the (personas x categories) NPS counts.
+            persona_history (PersonaCountHistory, optional): Count cube the persona counts are recorded into.
+        """
+        self.model_reporters = model_reporters
+        self.model_vars = {name: [] for name in model_reporters}
+        self.agent_reporter = agent_reporter
+        self.agent_history = agent_history
+        self.persona_reporter = persona_reporter
+        self.persona_history = persona_history
+        # Called with the model after every collection, e.g. export.RunExporter.sync
+        self.listeners = []
+
+    def collect(self, model):
+        """
+        Collects all the data for the given model.
+
+        Args:
+            model: The model to collect data from; must expose a `steps` count.
+        """
+        for name, reporter in self.model_reporters.items():
+            self.model_vars[name].append(reporter())
+        self.agent_history.record(model.steps, self.agent_reporter())
+        if self.persona_history is not None:
+            self.persona_history.record(model.steps, self.persona_reporter())
+        for listener in self.listeners:
+            listener(model)
+
+    def state_arrays(self):
+        """
+        Returns everything collected so far, for a checkpoint.
+
+        Returns:
+            dict: 'model_vars' ((steps x reporters) values in model_reporters order), plus
+                the agent and persona history arrays under 'agent_history.' and 'persona_history.'.
+        """
+        arrays = {"model_vars": np.array([values for values in self.model_vars.values()], dtype=np.float64).T}
+        for prefix, history in (("agent_history", self.agent_history), ("persona_history", self.persona_history)):
+            if history is not None:
+                arrays.update({f"{prefix}.{name}": array for name, array in history.state_arrays().items()})
+        return arrays
+
+    def restore_state(self, arrays):
+        """
+        Replaces everything collected with the data of a checkpoint.
+
+        Args:
+            arrays (dict): As returned by state_arrays.
+        """
+        model_vars = arrays["model_vars"]
+        self.model_vars = {name: model_vars[:, column].tolist() for column, name in enumerate(self.model_reporters)}
+        for prefix, history in (("agent_history", self.agent_history), ("persona_history", self.persona_history)):
+            if history is not None:
+                history.restore_state({
+                    name.removeprefix(f"{prefix}."): array for name, array in arrays.items() if name.startswith(f"{prefix}.")
+                })
+
+    def get_model_vars_dataframe(self):
+        """
+        Returns the model-level variables as a DataFrame indexed by step.
+
+        Returns:
+            pd.DataFrame: One column per model reporter.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.model_vars)
+
+    def get_agent_vars_dataframe(self):
+        """
+        Returns the agent-level variables as a DataFrame indexed by (Step, AgentID).
+
+        Returns:
+            pd.DataFrame: 'Group', 'Persona' and 'NPS Rating' columns.
+        """
+        return self.agent_history.to_dataframe()
@@ -0,0 +1,365 @@
+# simulation/comments.py
+
+import copy
+import json
+import numpy as np
+from .mappings import SENTIMENTS, COMMENTS, code_dtype
+
+
+class CommentLog:
+    def __init__(self, group_names, persona_names, persona_groups, summary_only=False, sample_size=1000, seed=None):
+        """
+        Initializes a columnar comment log.
+
+        Each comment is stored as a row of small integer codes into interned lookup
+        tables (group, persona, sentiment); the comment text is fully determined by
+        the sentiment and shares its codes. Per-step sentiment counts by persona are
+        always kept. In summary-only mode the rows themselves are not kept, only a
+        bounded reservoir sample of example comments.
+
+        Args:
+            group_names (list): Group names, in group index order.
+            persona_names (list): Persona names, in persona index order.
+            persona_groups (list): Group index of each persona.
+            summary_only (bool): Keep only counts and a reservoir sample instead of every comment.
+            sample_size (int): Size of the reservoir sample kept in summary-only mode.
+            seed (int or np.random.SeedSequence, optional): Seed for the reservoir sampler.
+        """
+        self.group_names = list(group_names)
+        self.persona_names = list(persona_names)
+        self.persona_groups = np.asarray(persona_groups, dtype=code_dtype(len(self.group_names)))
+        self.summary_only = summary_only
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        self._dtypes = {
+            "agent_id": np.dtype(np.int32),
+            "group": code_dtype(len(self.group_names)),
+            "persona": code_dtype(len(self.persona_names)),
+            "sentiment": code_dtype(len(SENTIMENTS))
+        }
+        capacity = sample_size if summary_only else 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self._dtypes.items()}
+        self._size = 0  # Rows held in self._columns
+        self._seen = 0  # Rows appended so far
+        self._offered = 0  # Rows offered to the reservoir sample so far
+        self._counts = []  # One (personas x sentiments) count table per step
+        self._prefix = None  # Rows restored from a checkpoint, read-only and possibly shared with other branches
+
+    def __len__(self):
+        """
+        Returns the number of comments appended so far.
+        """
+        return self._seen
+
+    def nbytes(self):
+        """
+        Returns the memory held by the log's arrays.
+
+        Returns:
+            int: Size in bytes.
+        """
+        prefix = sum(column.nbytes for column in self._prefix.values()) if self._prefix is not None else 0
+        return prefix + sum(column.nbytes for column in self._columns.values()) + sum(counts.nbytes for counts in self._counts)
+
+    def append(self, agent_ids, persona_codes, sentiment_codes):
+        """
+        Appends one step's comments.
+
+        Args:
+            agent_ids (np.ndarray): Agent id of each comment.
+            persona_codes (np.ndarray): Persona index of each comment.
+            sentiment_codes (np.ndarray): Sentiment code of each comment.
+        """
+        persona_codes = np.asarray(persona_codes, dtype=self._dtypes["persona"])
+        sentiment_codes = np.asarray(sentiment_codes, dtype=self._dtypes["sentiment"])
+        rows = {
+            "agent_id": np.asarray(agent_ids, dtype=self._dtypes["agent_id"]),
+            "group": self.persona_groups[persona_codes],
+            "persona": persona_codes,
+            "sentiment": sentiment_codes
+        }
+
+        num_sentiments = len(SENTIMENTS)
+        counts = np.bincount(
+            persona_codes.astype(np.int64) * num_sentiments + sentiment_codes,
+            minlength=len(self.persona_names) * num_sentiments
+        )
+        self._counts.append(counts.reshape(len(self.persona_names), num_sentiments))
+
+        if self.summary_only:
+            self._sample(rows, len(persona_codes))
+        else:
+            self._extend(rows, len(persona_codes))
+        self._seen += len(persona_codes)
+
+    def append_summary(self, counts, num_comments, agent_ids, persona_codes, sentiment_codes):
+        """
+        Appends one step's comments in summary-only mode from precomputed counts and
+        a subsample of the step's rows.
+
+        The reservoir sample stays uniform over all comments as long as every step's
+        rows are subsampled independently with the same probability.
+
+        Args:
+            counts (np.ndarray): (personas x sentiments) comment counts of the step.
+            num_comments (int): Number of comments made in the step.
+            agent_ids (np.ndarray): Agent id of each subsampled comment.
+            persona_codes (np.ndarray): Persona index of each subsampled comment.
+            sentiment_codes (np.ndarray): Sentiment code of each subsampled comment.
+        """
+        if not self.summary_only:
+            raise ValueError("append_summary requires a summary-only comment log")
+        persona_codes = np.asarray(persona_codes, dtype=self._dtypes["persona"])
+        rows = {
+            "agent_id": np.asarray(agent_ids, dtype=self._dtypes["agent_id"]),
+            "group": self.persona_groups[persona_codes],
+            "persona": persona_codes,
+            "sentiment": np.asarray(sentiment_codes, dtype=self._dtypes["sentiment"])
+        }
+        self._counts.append(np.asarray(counts).reshape(len(self.persona_names), len(SENTIMENTS)))
+        self._sample(rows, len(persona_codes))
+        self._seen += int(num_comments)
+
+    def _extend(self, rows, n):
+        """
+        Writes rows to the end of the column buffers, growing them geometrically.
+        """
+        needed = self._size + n
+        capacity = len(self._columns["agent_id"])
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            for name, column in self._columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        for name, values in rows.items():
+            self._columns[name][self._size:needed] = values
+        self._size = needed
+
+    def _sample(self, rows, n):
+        """
+        Offers rows to the reservoir sample, replacing earlier rows with the
+        probabilities of sequential reservoir sampling (Algorithm R).
+        """
+        fill = min(max(self.sample_size - self._offered, 0), n)
+        if fill:
+            for name, values in rows.items():
+                self._columns[name][self._size:self._size + fill] = values[:fill]
+            self._size += fill
+        if fill < n:
+            # The i-th row offered overall replaces a random slot with probability sample_size / i
+            offered = np.arange(self._offered + fill + 1, self._offered + n + 1)
+            slots = (self._rng.random(n - fill) * offered).astype(np.int64)
+            keep = slots < self.sample_size
+            source = fill + np.flatnonzero(keep)
+            for name, values in rows.items():
+                self._columns[name][slots[keep]] = values[source]
+        self._offered += n
+
+    def _stored_columns(self, start=0):
+        """
+        Returns the stored rows from `start` on by column, restored rows first.
+        """
+        restored = len(self._prefix["agent_id"]) if self._prefix is not None else 0
+        own = max(start - restored, 0)
+        columns = {name: column[own:self._size] for name, column in self._columns.items()}
+        if start < restored:
+            columns = {name: np.concatenate([self._prefix[name][start:], column]) for name, column in columns.items()}
+        return columns
+
+    def snapshot(self):
+        """
+        Returns a copy of the log that later appends to this one do not change.
+        Restored rows are read-only and shared rather than copied.
+
+        Returns:
+            CommentLog: The snapshot.
+        """
+        snapshot = copy.copy(self)
+        # The reservoir of summary-only mode keeps its full capacity
+        snapshot._columns = {
+            name: column.copy() if self.summary_only else column[:self._size].copy()
+            for name, column in self._columns.items()
+        }
+        snapshot._counts = list(self._counts)
+        snapshot._rng = copy.deepcopy(self._rng)
+        return snapshot
+
+    def state_arrays(self):
+        """
+        Returns the log's contents for a checkpoint, including the state of the
+        reservoir sampler.
+
+        Returns:
+            dict: One array per stored column, 'counts' ((steps x personas x sentiments)),
+                'seen', 'offered' and 'rng_state' (the sampler's state as JSON).
+        """
+        arrays = dict(self._stored_columns())
+        arrays["counts"] = (
+            np.stack(self._counts) if self._counts
+            else np.empty((0, len(self.persona_names), len(SENTIMENTS)), dtype=np.int64)
+        )
+        arrays["seen"] = np.array(self._seen, dtype=np.int64)
+        arrays["offered"] = np.array(self._offered, dtype=np.int64)
+        arrays["rng_state"] = np.array(json.dumps(self._rng.bit_generator.state))
+        return arrays
+
+    def restore_state(self, arrays):
+        """
+        Replaces the log's contents with those of a checkpoint.
+
+        Stored comments and count tables are kept as read-only views, not copied, so
+        branches restored from the same checkpoint share them. The reservoir sample
+        of summary-only mode is copied, since later steps replace its rows.
+
+        Args:
+            arrays (dict): As returned by state_arrays.
+        """
+        rows = {name: arrays[name] for name in self._dtypes}
+        size = len(rows["agent_id"])
+        if self.summary_only:
+            for name, column in self._columns.items():
+                column[:size] = rows[name]
+            self._size = size
+        else:
+            self._prefix = rows
+            self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in self._dtypes.items()}
+            self._size = 0
+        self._counts = list(arrays["counts"])
+        self._seen = int(arrays["seen"])
+        self._offered = int(arrays["offered"])
+        self._rng.bit_generator.state = json.loads(str(arrays["rng_state"]))
+
+    def to_dataframe(self):
+        """
+        Returns the stored comments (or the reservoir sample in summary-only mode)
+        as a categorical DataFrame that shares memory with the log.
+
+        Returns:
+            pd.DataFrame: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
+        """
+        import pandas as pd
+
+        columns = self._stored_columns()
+        sentiment_codes = columns["sentiment"]
+        return pd.DataFrame({
+            "agent_id": columns["agent_id"],
+            "group": pd.Categorical.from_codes(columns["group"], categories=self.group_names, validate=False),
+            "persona": pd.Categorical.from_codes(columns["persona"], categories=self.persona_names, validate=False),
+            "comment": pd.Categorical.from_codes(sentiment_codes, categories=list(COMMENTS), validate=False),
+            "sentiment": pd.Categorical.from_codes(sentiment_codes, categories=list(SENTIMENTS), validate=False)
+        }, copy=False)
+
+    def to_arrow(self, start=0):
+        """
+        Returns the stored comments (or the reservoir sample in summary-only mode)
+        as a pyarrow Table with dictionary-encoded text columns.
+
+        Args:
+            start (int): Index of the first stored row to include, e.g. the number
+                of rows already exported.
+
+        Returns:
+            pyarrow.Table: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
+        """
+        import pyarrow as pa
+
+        columns = self._stored_columns(start)
+        # int32 dictionary indices, as Parquet reads them back, so tables from any step concatenate
+        sentiment_codes = columns["sentiment"].astype(np.int32)
+        return pa.table({
+            "agent_id": columns["agent_id"],
+            "group": pa.DictionaryArray.from_arrays(columns["group"].astype(np.int32), self.group_names),
+            "persona": pa.DictionaryArray.from_arrays(columns["persona"].astype(np.int32), self.persona_names),
+            "comment": pa.DictionaryArray.from_arrays(sentiment_codes, list(COMMENTS)),
+            "sentiment": pa.DictionaryArray.from_arrays(sentiment_codes, list(SENTIMENTS))
+        })
+
+    def count_tables(self, start=0):
+        """
+        Returns the per-step sentiment counts by persona.
+
+        Args:
+            start (int): Index of the first step to include.
+
+        Returns:
+            np.ndarray: (steps x personas x sentiments) counts of the steps from `start` on.
+        """
+        if start >= len(self._counts):
+            return np.empty((0, len(self.persona_names), len(SENTIMENTS)), dtype=np.int64)
+        return np.stack(self._counts[start:])
+
+    def counts_to_arrow(self, start=0):
+        """
+        Returns the per-step sentiment counts by persona as a tidy pyarrow Table.
+
+        Args:
+            start (int): Index of the first step to include.
+
+        Returns:
+            pyarrow.Table: 'Step', 'Group', 'Persona', 'Sentiment' and 'Count' columns,
+                with steps numbered from 1 as in sentiment_counts.
+        """
+        import pyarrow as pa
+
+        counts = self.count_tables(start)
+        steps, personas, sentiments = np.indices(counts.shape, dtype=np.int32).reshape(3, -1)
+        return pa.table({
+            "Step": steps + np.int32(start + 1),
+            "Group": pa.DictionaryArray.from_arrays(self.persona_groups.astype(np.int32)[personas], self.group_names),
+            "Persona": pa.DictionaryArray.from_arrays(personas, self.persona_names),
+            "Sentiment": pa.DictionaryArray.from_arrays(sentiments, list(SENTIMENTS)),
+            "Count": counts.reshape(-1).astype(np.int64)
+        })
+
+    def sentiment_totals(self):
+        """
+        Returns the number of comments of each sentiment over the whole run.
+
+        Returns:
+            pd.Series: Counts indexed by sentiment, in display order.
+        """
+        import pandas as pd
+
+        totals = np.zeros(len(SENTIMENTS), dtype=np.int64)
+        for counts in self._counts:
+            totals += counts.sum(axis=0)
+        return pd.Series(totals, index=pd.Index(SENTIMENTS, name="sentiment"), name="count")
+
+    def sentiment_counts(self, by="persona"):
+        """
+        Returns the per-step sentiment counts as a tidy DataFrame.
+
+        Args:
+            by (str): 'persona' or 'group'.
+
+        Returns:
+            pd.DataFrame: 'Step', 'Group' (and 'Persona'), 'Sentiment' and 'Count' columns.
+                Steps are numbered from 1, matching the model step that produced them.
+        """
+        import pandas as pd
+
+        if by not in ("persona", "group"):
+            raise ValueError(f"Unknown grouping: {by!r}")
+        if not self._counts:
+            columns = ["Step", "Group", "Persona", "Sentiment", "Count"] if by == "persona" else ["Step", "Group", "Sentiment", "Count"]
+            return pd.DataFrame(columns=columns)
+        counts = np.stack(self._counts)  # (steps, personas, sentiments)
+        if by == "group":
+            grouped = np.zeros((counts.shape[0], len(self.group_names), counts.shape[2]), dtype=counts.dtype)
+            np.add.at(grouped, (slice(None), self.persona_groups), counts)
+            steps, groups, sentiments = np.indices(grouped.shape).reshape(3, -1)
+            return pd.DataFrame({
+                "Step": steps + 1,
+                "Group": pd.Categorical.from_codes(groups, categories=self.group_names),
+                "Sentiment": pd.Categorical.from_codes(sentiments, categories=list(SENTIMENTS)),
+                "Count": grouped.reshape(-1)
+            })
+        steps, personas, sentiments = np.indices(counts.shape).reshape(3, -1)
+        return pd.DataFrame({
+            "Step": steps + 1,
+            "Group": pd.Categorical.from_codes(self.persona_groups[personas], categories=self.group_names),
+            "Persona": pd.Categorical.from_codes(personas, categories=self.persona_names),
+            "Sentiment": pd.Categorical.from_codes(sentiments, categories=list(SENTIMENTS)),
+            "Count": counts.reshape(-1)
+        })
@@ -0,0 +1,70 @@
+# simulation/ensemble.py
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+import numpy as np
+from .runner import POOLED_ENGINES, Scenario, run_metrics
+
+
+def replicate_seeds(seed, replicates):
+    """
+    Derives independent replicate seeds from a single scenario seed.
+
+    Args:
+        seed (int): The scenario seed; None draws fresh entropy.
+        replicates (int): Number of seeds to derive.
+
+    Returns:
+        list: One integer seed per replicate.
+    """
+    children = np.random.SeedSequence(seed).spawn(replicates)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def run_ensemble(scenario: Scenario, replicates, max_workers=None, percentiles=(5, 95)):
+    """
+    Runs independent replicates of a scenario across a process pool and reduces
+    them to per-step mean and percentile bands.
+
+    Args:
+        scenario (Scenario): The scenario to replicate. Its seed seeds the replicate seeds.
+        replicates (int): Number of replicates to run.
+        max_workers (int, optional): Size of the process pool; defaults to the CPU count.
+        percentiles (tuple): Lower and upper percentiles of the band.
+
+    Returns:
+        pd.DataFrame: Indexed by step, with (metric, statistic) columns where the
+            statistic is 'mean', 'lower' or 'upper'. Metrics are 'Overall NPS',
+            'Promoters %', 'Passives %', 'Detractors %' and '<group> NPS' per group.
+    """
+    import pandas as pd
+
+    # Replicates only feed the bands, so a summary comment log and the final agent states are enough;
+    # they already run in a process pool, so they do not shard
+    scenarios = [
+        replace(scenario, seed=seed, comment_history="summary", agent_history="final",
+                engine=POOLED_ENGINES.get(scenario.engine, scenario.engine))
+        for seed in replicate_seeds(scenario.seed, replicates)
+    ]
+    if max_workers == 1 or replicates == 1:
+        results = [run_metrics(s) for s in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(run_metrics, scenarios))
+
+    columns = results[0].columns
+    values = np.stack([result[columns].to_numpy() for result in results])  # (replicates, steps, metrics)
+    lower, upper = np.percentile(values, percentiles, axis=0)
+    bands = pd.concat(
+        {
+            "mean": pd.DataFrame(values.mean(axis=0), columns=columns),
+            "lower": pd.DataFrame(lower, columns=columns),
+            "upper": pd.DataFrame(upper, columns=columns)
+        },
+        axis=1
+    ).swaplevel(axis=1)
+    bands = bands[columns]  # Group the statistics of each metric together
+    bands.index.name = "Step"
+    bands.attrs["replicates"] = replicates
+    bands.attrs["percentiles"] = tuple(percentiles)
+    return bands
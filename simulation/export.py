@@ -0,0 +1,408 @@
+# simulation/export.py
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import asdict
+import numpy as np
+
+# File extension of each export format
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Codec of every exported file; pyarrow's wheels support it in both formats
+EXPORT_COMPRESSION = "zstd"
+
+# Rows buffered per table before they are written as one row group or record batch
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+# Tables of an export, in the order they are written
+EXPORT_TABLES = ("model_data", "agent_data", "persona_counts", "comment_counts", "comments")
+
+# Largest exported file the app serves as a download; the button holds the whole file in memory
+MAX_DOWNLOAD_BYTES = int(os.environ.get("NPS_SIM_MAX_DOWNLOAD_MB", "200")) * 2 ** 20
+
+# Exports of the app go here unless an export directory is given
+DEFAULT_EXPORT_DIR = os.environ.get("NPS_SIM_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "nps-sim-exports"))
+
+# Exports under DEFAULT_EXPORT_DIR untouched for this long are removed by prune_exports
+EXPORT_TTL_SECONDS = float(os.environ.get("NPS_SIM_EXPORT_TTL_HOURS", "24")) * 3600
+
+
+def new_export_dir(root=None):
+    """
+    Returns a fresh directory path for one export.
+
+    Args:
+        root (str, optional): Parent directory; defaults to DEFAULT_EXPORT_DIR.
+
+    Returns:
+        str: A path under the root that does not exist yet.
+    """
+    return os.path.join(root or DEFAULT_EXPORT_DIR, uuid.uuid4().hex)
+
+
+def _last_modified(directory):
+    """
+    Returns the latest modification time of a directory and the files in it.
+    """
+    latest = os.path.getmtime(directory)
+    for entry in os.scandir(directory):
+        latest = max(latest, entry.stat().st_mtime)
+    return latest
+
+
+def prune_exports(root=None, max_age=EXPORT_TTL_SECONDS):
+    """
+    Removes the exports under a root that were not written to for longer than max_age,
+    e.g. those of app sessions that ended without replacing their run.
+
+    Args:
+        root (str, optional): Parent directory of the exports; defaults to DEFAULT_EXPORT_DIR.
+        max_age (float): Age in seconds past which an export is removed.
+
+    Returns:
+        list: Paths of the removed exports.
+    """
+    root = root or DEFAULT_EXPORT_DIR
+    if not os.path.isdir(root):
+        return []
+    cutoff = time.time() - max_age
+    removed = []
+    for entry in os.scandir(root):
+        try:
+            if entry.is_dir(follow_symlinks=False) and _last_modified(entry.path) < cutoff:
+                shutil.rmtree(entry.path)
+                removed.append(entry.path)
+        except OSError:
+            # Removed concurrently by another session
+            continue
+    return removed
+
+
+def _json_value(value):
+    """
+    Converts NumPy scalars, e.g. a seed from a number input, for json.dump.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__} in a scenario")
+
+
+class TableWriter:
+    def __init__(self, path, output_format="parquet", chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Initializes a writer of pyarrow Tables to one compressed Parquet or Arrow IPC file.
+
+        Tables are buffered until `chunk_rows` rows are pending, then written as
+        one row group (Parquet) or record batches (Arrow IPC), so memory stays
+        bounded by the chunk size whatever the size of the file. The file is
+        written under a '.partial' name and moved into place by close, so readers
+        never see a file without its footer. The file stays open until close, so
+        appending never rewrites what was written; a closed writer takes no more rows.
+
+        Args:
+            path (str): Destination path.
+            output_format (str): One of EXPORT_FORMATS.
+            chunk_rows (int): Rows per written chunk.
+        """
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {output_format!r}")
+        self.path = path
+        self.output_format = output_format
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.num_rows = 0  # Rows written to the file
+        self.closed = False
+        self._schema = None
+        self._writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def write(self, table):
+        """
+        Buffers a table, writing the buffer once it holds at least a chunk.
+
+        Args:
+            table (pyarrow.Table): Rows with the schema of every other table of the file.
+
+        Raises:
+            ValueError: If the writer is closed.
+        """
+        if self.closed:
+            raise ValueError(f"Cannot write to {self.path}: the file is closed")
+        if self._schema is None:
+            self._schema = table.schema
+        if table.num_rows:
+            self._pending.append(table)
+            self._pending_rows += table.num_rows
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered tables to the file.
+        """
+        import pyarrow as pa
+
+        if not self._pending:
+            return
+        writer = self._open()
+        table = pa.concat_tables(self._pending)
+        if self.output_format == "parquet":
+            writer.write_table(table, row_group_size=self.chunk_rows)
+        else:
+            writer.write_table(table, max_chunksize=self.chunk_rows)
+        self.num_rows += table.num_rows
+        self._pending = []
+        self._pending_rows = 0
+
+    def close(self):
+        """
+        Writes the buffered tables and moves the finished file into place. No file
+        is written if no table was.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._schema is None:
+            return
+        self.flush()
+        self._open().close()
+        self._writer = None
+        os.replace(self.path + ".partial", self.path)
+
+    def discard(self):
+        """
+        Closes the writer without finishing the file, deleting what was written.
+        """
+        self.closed = True
+        self._pending = []
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self.path + ".partial")
+
+    def _open(self):
+        """
+        Returns the open file writer, opening it on first use.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            partial = self.path + ".partial"
+            if self.output_format == "parquet":
+                self._writer = pq.ParquetWriter(partial, self._schema, compression=EXPORT_COMPRESSION)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=EXPORT_COMPRESSION)
+                self._writer = pa.ipc.new_file(partial, self._schema, options=options)
+        return self._writer
+
+
+class RunExporter:
+    def __init__(self, directory, output_format="parquet", chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Initializes an export of one run's data to one file per table in EXPORT_TABLES.
+
+        The exporter keeps a cursor per table and writes only what was collected
+        since its last sync. Attached to a model, it syncs after every step, so the
+        agent history is exported at every step it records even when its retention
+        policy then drops the step from memory; peak memory stays bounded by the
+        chunk size of the writers. The files stay open across the syncs of a run,
+        including those of a stopped and extended one, until close finishes them.
+
+        'comments' holds every comment with its 'step' in full mode, and the sample
+        of example comments (without steps) in summary-only mode.
+
+        Args:
+            directory (str): Directory that receives the files; created if missing.
+            output_format (str): One of EXPORT_FORMATS.
+            chunk_rows (int): Rows per written chunk, see TableWriter.
+        """
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {output_format!r}")
+        self.directory = directory
+        self.output_format = output_format
+        self.chunk_rows = chunk_rows
+        self.paths = {name: os.path.join(directory, name + EXPORT_FORMATS[output_format]) for name in EXPORT_TABLES}
+        self._writers = {}
+        self._model_rows = 0  # Model data rows exported
+        self._agent_step = None  # Last agent history step exported
+        self._persona_rows = 0  # Persona count steps exported
+        self._comment_steps = 0  # Comment count steps exported
+        self._comment_rows = 0  # Stored comment rows exported
+        self._comments = None  # Comment log of the last sync, for the sample written by close
+        self._model = None
+        self.closed = False
+
+    def attach(self, model):
+        """
+        Exports what the model has collected so far, then syncs after every step.
+
+        Args:
+            model: A model of any engine in runner.ENGINES.
+        """
+        self.sync(model)
+        model.datacollector.listeners.append(self.sync)
+        self._model = model
+
+    def detach(self):
+        """
+        Stops syncing with the attached model.
+        """
+        if self._model is not None:
+            self._model.datacollector.listeners.remove(self.sync)
+            self._model = None
+
+    def sync(self, model):
+        """
+        Writes everything the model collected since the last sync.
+
+        Args:
+            model: A model of any engine in runner.ENGINES.
+
+        Raises:
+            ValueError: If the exporter is closed.
+        """
+        collector = model.datacollector
+        self._export(collector.model_vars, collector.agent_history, collector.persona_history, model.comments)
+
+    def export_result(self, result):
+        """
+        Writes the collected data of a finished run, e.g. one served from the result cache.
+
+        Args:
+            result (SimulationResult): The run's results.
+        """
+        model_vars = {name: column.to_numpy() for name, column in result.model_data.items()}
+        self._export(model_vars, result.agent_history, result.persona_counts, result.comments)
+
+    def _write(self, name, table):
+        """
+        Passes a table to the writer of a table name.
+        """
+        if self.closed:
+            raise ValueError(f"Cannot write to {self.directory}: the export is closed")
+        if name not in self._writers:
+            os.makedirs(self.directory, exist_ok=True)
+            self._writers[name] = TableWriter(self.paths[name], self.output_format, self.chunk_rows)
+        self._writers[name].write(table)
+
+    def _export(self, model_vars, agent_history, persona_history, comments):
+        """
+        Writes the rows of every table that are past its cursor.
+
+        Args:
+            model_vars (dict): Model reporter values by name, one per step.
+            agent_history (AgentHistory): The agent history.
+            persona_history (PersonaCountHistory): The per-step persona counts.
+            comments (CommentLog): The comment log.
+        """
+        import pyarrow as pa
+
+        # Model data has one row per step from step 0
+        start = self._model_rows
+        num_rows = len(next(iter(model_vars.values()), ()))
+        columns = {"Step": np.arange(start, num_rows, dtype=np.int32)}
+        columns.update({name: np.asarray(values[start:], dtype=np.float64) for name, values in model_vars.items()})
+        self._write("model_data", pa.table(columns))
+        self._model_rows = num_rows
+
+        for table in agent_history.iter_tables(after=self._agent_step):
+            self._write("agent_data", table)
+            if table.num_rows:
+                self._agent_step = int(table["Step"][-1].as_py())
+
+        self._write("persona_counts", persona_history.to_arrow(self._persona_rows))
+        self._persona_rows = len(persona_history)
+
+        counts = comments.count_tables(self._comment_steps)
+        self._write("comment_counts", comments.counts_to_arrow(self._comment_steps))
+        if not comments.summary_only:
+            # Rows are appended step by step, so each new step owns the next counts.sum() rows
+            table = comments.to_arrow(self._comment_rows)
+            first_step = self._comment_steps + 1
+            steps = np.repeat(np.arange(first_step, first_step + len(counts), dtype=np.int32), counts.sum(axis=(1, 2)))
+            self._write("comments", table.add_column(0, "step", pa.array(steps)))
+            self._comment_rows += table.num_rows
+        self._comment_steps += len(counts)
+        self._comments = comments
+
+    def rows_written(self):
+        """
+        Returns the rows written to disk so far, by table name.
+
+        Returns:
+            dict: Table names mapped to row counts.
+        """
+        return {name: writer.num_rows for name, writer in self._writers.items()}
+
+    def flush(self):
+        """
+        Syncs with the attached model and writes every buffered row to disk. The
+        files stay open, so they can only be read once close has finished them.
+        """
+        if self._model is not None:
+            # Comments are collected after the step's sync
+            self.sync(self._model)
+        for writer in self._writers.values():
+            writer.flush()
+
+    def close(self, scenario=None):
+        """
+        Syncs with the attached model, detaches from it and finishes every file.
+
+        Args:
+            scenario (Scenario, optional): Written to 'scenario.json' next to the tables.
+
+        Returns:
+            dict: Table names mapped to the paths of the finished files.
+        """
+        if self.closed:
+            return {name: path for name, path in self.paths.items() if os.path.exists(path)}
+        if self._model is not None:
+            # Comments are collected after the step's sync
+            self.sync(self._model)
+            self.detach()
+        if self._comments is not None and self._comments.summary_only:
+            # The sample changes every step, so only the final one is written
+            self._write("comments", self._comments.to_arrow())
+        for writer in self._writers.values():
+            writer.close()
+        self.closed = True
+        if scenario is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, "scenario.json"), "w", encoding="utf-8") as file:
+                json.dump(asdict(scenario), file, indent=2, sort_keys=True, default=_json_value)
+        return {name: path for name, path in self.paths.items() if os.path.exists(path)}
+
+    def discard(self):
+        """
+        Detaches from the attached model, closes every file and removes the export directory.
+        """
+        self.detach()
+        for writer in self._writers.values():
+            writer.discard()
+        self.closed = True
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def export_result(result, directory, output_format="parquet", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Exports a finished run to one file per table, reading spilled agent history
+    back from disk one file at a time.
+
+    Args:
+        result (SimulationResult): The run's results.
+        directory (str): Directory that receives the files and 'scenario.json'.
+        output_format (str): One of EXPORT_FORMATS.
+        chunk_rows (int): Rows per written chunk, see TableWriter.
+
+    Returns:
+        dict: Table names mapped to the paths written.
+    """
+    exporter = RunExporter(directory, output_format, chunk_rows)
+    exporter.export_result(result)
+    return exporter.close(result.scenario)
@@ -0,0 +1,81 @@
+# simulation/mappings.py
+
+import numpy as np
+
+# Satisfaction is an integer on 0..10. The tables below mirror the banded rules
+# in UserAgent.update_nps and UserAgent.generate_comment so that array-based
+# engines can map a whole population with a single indexed lookup.
+MIN_SATISFACTION = 0
+MAX_SATISFACTION = 10
+SATISFACTION_LEVELS = MAX_SATISFACTION - MIN_SATISFACTION + 1
+
+NPS_BY_SATISFACTION = np.array([2, 2, 2, 4, 4, 6, 6, 8, 8, 10, 10], dtype=np.int8)
+
+# Sentiment codes, in display order
+POSITIVE, NEUTRAL, NEGATIVE = 0, 1, 2
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+COMMENTS = (
+    "Great service!",
+    "I'm okay with the current state.",
+    "I'm not satisfied with the recent changes."
+)
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+SENTIMENT_BY_SATISFACTION = np.array([2, 2, 2, 2, 2, 1, 1, 1, 0, 0, 0], dtype=np.int8)
+
+# NPS category codes, in the same order as the model-level reporters
+PROMOTER, PASSIVE, DETRACTOR = 0, 1, 2
+NPS_CATEGORIES = ("Promoters", "Passives", "Detractors")
+
+
+def nps_category(nps):
+    """
+    Returns the NPS category code for a single NPS rating.
+
+    Args:
+        nps (int): The NPS rating (0-10).
+
+    Returns:
+        int: PROMOTER, PASSIVE or DETRACTOR.
+    """
+    if nps >= 9:
+        return PROMOTER
+    if nps <= 6:
+        return DETRACTOR
+    return PASSIVE
+
+
+def nps_categories(nps):
+    """
+    Returns the NPS category codes for an array of NPS ratings.
+
+    Args:
+        nps (np.ndarray): Array of NPS ratings (0-10).
+
+    Returns:
+        np.ndarray: int8 array of PROMOTER, PASSIVE or DETRACTOR codes.
+    """
+    nps = np.asarray(nps)
+    return np.where(nps >= 9, PROMOTER, np.where(nps <= 6, DETRACTOR, PASSIVE)).astype(np.int8)
+
+
+CATEGORY_BY_SATISFACTION = nps_categories(NPS_BY_SATISFACTION)
+
+
+def code_dtype(num_categories):
+    """
+    Returns the smallest integer dtype pandas uses for categorical codes.
+
+    Code arrays stored with this dtype can be wrapped by pd.Categorical.from_codes
+    without being copied.
+
+    Args:
+        num_categories (int): Number of categories.
+
+    Returns:
+        np.dtype: int8, int16 or int32.
+    """
+    if num_categories < np.iinfo(np.int8).max:
+        return np.dtype(np.int8)
+    if num_categories < np.iinfo(np.int16).max:
+        return np.dtype(np.int16)
+    return np.dtype(np.int32)
@@ -0,0 +1,202 @@
+# simulation/markov.py
+
+import numpy as np
+from .personas import CATALOG
+from .population import persona_probabilities, validate_mix
+from .mappings import (
+    CATEGORY_BY_SATISFACTION,
+    SENTIMENT_BY_SATISFACTION,
+    SATISFACTION_LEVELS,
+    NPS_CATEGORIES,
+    SENTIMENTS,
+    NEUTRAL,
+    PROMOTER,
+    DETRACTOR,
+    nps_categories
+)
+
+
+def transition_matrix():
+    """
+    Returns the one-step transition matrix of an agent's satisfaction.
+
+    UserAgent.update_satisfaction moves satisfaction by -1, 0 or +1 with equal
+    probability and clamps it to the satisfaction range, so the two end levels
+    keep their agents with probability 2/3.
+
+    Returns:
+        np.ndarray: (levels x levels) row-stochastic matrix; entry [i, j] is the
+            probability of moving from level i to level j.
+    """
+    matrix = np.zeros((SATISFACTION_LEVELS, SATISFACTION_LEVELS))
+    for level in range(SATISFACTION_LEVELS):
+        for change in (-1, 0, 1):
+            matrix[level, min(max(level + change, 0), SATISFACTION_LEVELS - 1)] += 1 / 3
+    return matrix
+
+
+class MarkovNPSModel:
+    def __init__(self, initial_satisfaction: dict, population_mix=None, catalog=CATALOG):
+        """
+        Initializes the exact expectation engine.
+
+        Agents of a persona are exchangeable and their satisfaction follows the same
+        Markov chain, so each persona's distribution over satisfaction levels evolves
+        by a product with transition_matrix(). Expected NPS category and sentiment
+        shares are linear in these distributions, which makes every expectation
+        computed here exact for any population size, without simulating agents.
+
+        Args:
+            initial_satisfaction (dict): Persona names mapped to their initial satisfaction levels.
+            population_mix (dict, optional): Group and persona weights or persona counts, see
+                population.validate_mix; groups and personas are uniform if omitted.
+            catalog (PersonaCatalog): The personas of the simulation.
+        """
+        self.catalog = catalog
+        mix = population_mix or {}
+        validate_mix(catalog, mix)
+        if "persona_counts" in mix:
+            counts = np.array([mix["persona_counts"].get(name, 0) for name in catalog.persona_names], dtype=np.float64)
+            if counts.sum() <= 0:
+                raise ValueError("Persona counts must add up to at least one user")
+            self.persona_weights = counts / counts.sum()
+        else:
+            self.persona_weights = persona_probabilities(catalog, mix.get("group_weights"), mix.get("persona_weights"))
+        self.persona_groups = np.asarray(catalog.persona_groups)
+        self.transition = transition_matrix()
+
+        num_personas = len(catalog.persona_names)
+        self.initial = np.zeros((num_personas, SATISFACTION_LEVELS))
+        self.initial[np.arange(num_personas), catalog.initial_satisfaction(initial_satisfaction)] = 1.0
+
+        # Category and sentiment of every satisfaction level as one-hot columns
+        self._category_of_level = np.eye(len(NPS_CATEGORIES))[CATEGORY_BY_SATISFACTION]
+        self._sentiment_of_level = np.eye(len(SENTIMENTS))[SENTIMENT_BY_SATISFACTION]
+        # Before the first step, agents carry their persona's initial NPS rating and a neutral comment
+        self._initial_categories = np.eye(len(NPS_CATEGORIES))[nps_categories(np.array(catalog.persona_nps))]
+
+    def distributions(self, num_steps):
+        """
+        Returns every persona's satisfaction distribution at every step.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            np.ndarray: (steps + 1, personas, levels) probabilities; row 0 is the initial state.
+        """
+        result = np.empty((num_steps + 1,) + self.initial.shape)
+        result[0] = self.initial
+        for step in range(num_steps):
+            result[step + 1] = result[step] @ self.transition
+        return result
+
+    def category_shares(self, num_steps):
+        """
+        Returns the expected share of each NPS category within each persona.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            np.ndarray: (steps + 1, personas, categories) shares, columns in NPS_CATEGORIES order.
+        """
+        shares = self.distributions(num_steps) @ self._category_of_level
+        shares[0] = self._initial_categories
+        return shares
+
+    def sentiment_shares(self, num_steps):
+        """
+        Returns the expected share of each comment sentiment across the population.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            np.ndarray: (steps + 1, sentiments) shares, columns in SENTIMENTS order.
+        """
+        shares = np.einsum("p,tpl,ls->ts", self.persona_weights, self.distributions(num_steps), self._sentiment_of_level)
+        shares[0] = np.eye(len(SENTIMENTS))[NEUTRAL]
+        return shares
+
+    def persona_nps(self, num_steps):
+        """
+        Returns the expected NPS of each persona.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            np.ndarray: (steps + 1, personas) NPS scores.
+        """
+        shares = self.category_shares(num_steps)
+        return (shares[..., PROMOTER] - shares[..., DETRACTOR]) * 100
+
+    def expected_metrics(self, num_steps):
+        """
+        Returns the expected model-level metrics reported by the simulation engines.
+
+        A group's NPS is the expectation given that the group is not empty: the
+        personas of its members are drawn with the group's persona weights whatever
+        the group's size.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            pd.DataFrame: 'Overall NPS', 'Promoters %', 'Passives %', 'Detractors %' and one
+                '<group> NPS' column per group, indexed by step.
+        """
+        import pandas as pd
+
+        shares = self.category_shares(num_steps)
+        overall = np.einsum("p,tpc->tc", self.persona_weights, shares) * 100
+        data = {
+            "Overall NPS": overall[:, PROMOTER] - overall[:, DETRACTOR],
+            "Promoters %": overall[:, 0],
+            "Passives %": overall[:, 1],
+            "Detractors %": overall[:, 2]
+        }
+        persona_nps = self.persona_nps(num_steps)
+        for group_index, group_name in enumerate(self.catalog.group_names):
+            members = self.persona_groups == group_index
+            group_weight = self.persona_weights[members].sum()
+            if group_weight > 0:
+                data[f"{group_name} NPS"] = persona_nps[:, members] @ (self.persona_weights[members] / group_weight)
+            else:
+                data[f"{group_name} NPS"] = np.zeros(num_steps + 1)
+        df = pd.DataFrame(data)
+        df.index.name = "Step"
+        return df
+
+    def expected_persona_nps(self, num_steps):
+        """
+        Returns the expected NPS of each persona as a table.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            pd.DataFrame: One column per persona, indexed by step.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.persona_nps(num_steps), columns=list(self.catalog.persona_names))
+        df.index.name = "Step"
+        return df
+
+    def expected_sentiment_shares(self, num_steps):
+        """
+        Returns the expected share of each comment sentiment as a table.
+
+        Args:
+            num_steps (int): Number of steps to propagate.
+
+        Returns:
+            pd.DataFrame: One column per sentiment in percent, indexed by step.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.sentiment_shares(num_steps) * 100, columns=list(SENTIMENTS))
+        df.index.name = "Step"
+        return df
@@ -1,24 +1,25 @@
 # simulation/model.py
 
-from dataclasses import dataclass
+from functools import partial
+import numpy as np
 from mesa import Model
 from mesa.time import RandomActivation
-from mesa.datacollection import DataCollector
-from .personas import Group, Persona, PERSONAS
+from .change import Change
+from .personas import CATALOG, GROUPS
 from .agent import UserAgent
+from .aggregation import NPSAggregator
+from .collection import AgentHistory, ColumnarDataCollector, PersonaCountHistory
+from .comments import CommentLog
+from .population import assign_personas
+from .profiling import PhaseTimer
+from .rng import COMMENTS_STREAM, HISTORY_STREAM, POPULATION_STREAM, SATISFACTION_STREAM, RandomStreams
+from .stepping import SteppingMixin
+from .mappings import PROMOTER, PASSIVE, DETRACTOR, nps_categories
 
-@dataclass
-class Change:
-    """
-    A data class to encapsulate simulation change parameters.
-    
-    Attributes:
-        csat_score (float): The Customer Satisfaction Score influencing the simulation.
-    """
-    csat_score: float
-
-class UserModel(Model):
-    def __init__(self, num_users, change: Change, initial_satisfaction: dict):
+class UserModel(SteppingMixin, Model):
+    def __init__(self, num_users, change: Change, initial_satisfaction: dict, seed=None, comment_history="full",
+                 max_steps=None, agent_history="full", agent_history_options=None, profiler=None,
+                 population_mix=None):
         """
         Initializes the UserModel.
         
@@ -26,62 +27,184 @@ class UserModel(Model):
             num_users (int): Number of user agents in the simulation.
             change (Change): An object representing changes in satisfaction or other parameters.
             initial_satisfaction (dict): A dictionary mapping persona names to their initial satisfaction levels.
-        """
+            seed (int, optional): Scenario seed of the model's random streams, see rng.RandomStreams.
+            comment_history (str): "full" to keep every comment, or "summary" to keep per-step
+                sentiment counts and a bounded sample of example comments.
+            max_steps (int, optional): Expected number of steps, used to preallocate the agent
+                history. Runs may go longer.
+            agent_history (str): Retention policy of the agent history, one of
+                collection.AGENT_HISTORY_POLICIES.
+            agent_history_options (dict, optional): Further AgentHistory keyword arguments,
+                e.g. {"every": 10} or {"sample_size": 1000}.
+            profiler (PhaseTimer, optional): Timer that receives the phases of every step;
+                a private one is created if omitted.
+            population_mix (dict, optional): Group and persona weights or persona counts, see
+                population.validate_mix; groups and personas are drawn uniformly if omitted.
+        """
+        self.profiler = profiler if profiler is not None else PhaseTimer()
+        if seed is not None:
+            self.reset_randomizer(seed)  # Only orders agent activation, which does not affect results
+        # Counter-based streams for every random decision, shared with the other engines
+        self.streams = RandomStreams(seed)
+        self.satisfaction_changes = None
         self.num_users = num_users
-        self.schedule = RandomActivation(self)
         self.change = change  # Incorporates change parameters into the model
-        self.datacollector = DataCollector(
-            model_reporters={
-                "Overall NPS": self.compute_overall_nps,
-                "Promoters %": self.compute_promoters_percentage,
-                "Passives %": self.compute_passives_percentage,
-                "Detractors %": self.compute_detractors_percentage,
-                "Group NPS": self.compute_group_nps
-            },
-            agent_reporters={
-                "Group": "group.name",
-                "Persona": "persona.name",
-                "NPS Rating": "nps"
-            }
-        )
         
-        # Initialize groups and personas
-        self.groups = [Group(name, details["role"], details["personas"]) for name, details in PERSONAS.items()]
+        # Initialize groups and personas; agents refer to them by catalog index
+        self.catalog = CATALOG
+        self.groups = GROUPS
+        self.personas = [persona for group in self.groups for persona in group.personas]
+        self.group_ids = {name: i for i, name in enumerate(self.catalog.group_names)}
+        self.persona_ids = {name: i for i, name in enumerate(self.catalog.persona_names)}
+        persona_groups = self.catalog.persona_groups
+
+        # Running NPS category counts; agents report category changes in update_nps
+        self.nps_counts = NPSAggregator(self.group_ids, self.persona_ids, persona_groups)
         
-        # Initialize agents
-        for i in range(self.num_users):
-            group = self.random.choice(self.groups)
-            persona = self.random.choice(group.personas)
-            agent = UserAgent(i, self, group, persona)
-            # Set initial satisfaction based on UI inputs
-            agent.satisfaction = initial_satisfaction.get(persona.name, persona.attributes.get('satisfaction', 5))
-            agent.nps = persona.attributes.get('nps', 0)
-            self.schedule.add(agent)
+        # Initialize agents in bulk: one batched draw of every persona under the population mix,
+        # with initial satisfaction based on UI inputs
+        persona_index = assign_personas(self.catalog, num_users, population_mix, self.streams.generator(POPULATION_STREAM))
+        satisfaction = self.catalog.initial_satisfaction(initial_satisfaction)
+        self.user_agents = [  # Agents in unique_id order
+            UserAgent(i, self, persona, satisfaction[persona]) for i, persona in enumerate(persona_index.tolist())
+        ]
+        self.schedule = RandomActivation(self, self.user_agents)
+        persona_nps = np.array(self.catalog.persona_nps, dtype=np.int8)
+        self.nps_counts.add_many(persona_index, nps_categories(persona_nps[persona_index]))
         
-        self.comments = []  # Initialize comments list
+        # Columnar comment log; agent ids and persona codes are fixed for the whole run
+        self.comments = CommentLog(
+            self.group_ids,
+            self.persona_ids,
+            persona_groups,
+            summary_only=comment_history == "summary",
+            seed=self.streams.seed_sequence(COMMENTS_STREAM)
+        )
+        self._agent_ids = np.arange(self.num_users, dtype=np.int32)
+        self._persona_codes = persona_index
+        self._group_codes = np.asarray(persona_groups, dtype=np.int32)[persona_index]
+
+        model_reporters = {
+            "Overall NPS": self.compute_overall_nps,
+            "Promoters %": self.compute_promoters_percentage,
+            "Passives %": self.compute_passives_percentage,
+            "Detractors %": self.compute_detractors_percentage
+        }
+        # One numeric column per group rather than a dict per step
+        for group_index, group_name in enumerate(self.nps_counts.group_names):
+            model_reporters[f"{group_name} NPS"] = partial(self.nps_counts.group_score, group_index)
+        self.datacollector = ColumnarDataCollector(
+            model_reporters=model_reporters,
+            agent_reporter=self.get_agent_nps,
+            agent_history=AgentHistory(
+                self._agent_ids,
+                self._group_codes,
+                self._persona_codes,
+                self.group_ids,
+                self.persona_ids,
+                capacity=(max_steps or 0) + 1,
+                retention=agent_history,
+                seed=self.streams.seed_sequence(HISTORY_STREAM),
+                **(agent_history_options or {})
+            ),
+            persona_reporter=self.nps_counts.persona_table,
+            persona_history=PersonaCountHistory(
+                self.group_ids,
+                self.persona_ids,
+                persona_groups,
+                capacity=(max_steps or 0) + 1
+            )
+        )
         self.datacollector.collect(self)  # Collect initial data
 
+    @property
+    def steps(self):
+        """
+        int: The number of steps the model has taken.
+        """
+        return self.schedule.steps
+
     def step(self):
         """
         Advances the simulation by one step.
         """
-        self.schedule.step()
-        self.datacollector.collect(self)
-        self.collect_comments()
+        with self.profiler.phase("draw"):
+            # Each agent's change depends only on (seed, agent id, step), never on activation order
+            self.satisfaction_changes = self.streams.integers(
+                SATISFACTION_STREAM, -1, 2, self.steps, 0, self.num_users, dtype=np.int8
+            ).tolist()
+        with self.profiler.phase("schedule"):
+            self.schedule.step()
+        with self.profiler.phase("datacollector"):
+            self.datacollector.collect(self)
+        with self.profiler.phase("collect_comments"):
+            self.collect_comments()
 
     def collect_comments(self):
         """
-        Collects comments from all agents and stores them in the comments list.
+        Collects comments from all agents and appends them to the comment log.
+        """
+        sentiments = np.fromiter(
+            (agent.sentiment_code for agent in self.user_agents),
+            dtype=np.int8,
+            count=self.num_users
+        )
+        self.comments.append(self._agent_ids, self._persona_codes, sentiments)
+
+    def state_arrays(self):
+        """
+        Returns the agent state that, with the seed and step count, determines how
+        the run continues.
+
+        Returns:
+            dict: 'persona_index', 'satisfaction', 'nps' and 'sentiment' arrays in unique_id order.
+        """
+        return {
+            "persona_index": self._persona_codes,
+            "satisfaction": np.fromiter((agent.satisfaction for agent in self.user_agents), dtype=np.int8, count=self.num_users),
+            "nps": self.get_agent_nps(),
+            "sentiment": np.fromiter((agent.sentiment_code for agent in self.user_agents), dtype=np.int8, count=self.num_users)
+        }
+
+    def restore_state(self, arrays, steps):
+        """
+        Sets every agent to its state in a checkpoint.
+
+        Args:
+            arrays (dict): As returned by state_arrays.
+            steps (int): Number of steps taken when the state was saved.
+
+        Raises:
+            ValueError: If the checkpoint's population differs from the model's.
+        """
+        if not np.array_equal(arrays["persona_index"], self._persona_codes):
+            raise ValueError("The checkpoint was taken from a different population")
+        for agent, satisfaction, nps, sentiment in zip(
+            self.user_agents, arrays["satisfaction"].tolist(), arrays["nps"].tolist(), arrays["sentiment"].tolist()
+        ):
+            agent.satisfaction = satisfaction
+            agent.nps = nps
+            agent.sentiment_code = sentiment
+        self.schedule.steps = self.schedule.time = int(steps)
+
+    def get_agent_nps(self):
+        """
+        Returns the NPS rating of every agent.
+
+        Returns:
+            np.ndarray: int8 NPS ratings in unique_id order.
+        """
+        return np.fromiter((agent.nps for agent in self.user_agents), dtype=np.int8, count=self.num_users)
+
+    def get_comments_dataframe(self):
+        """
+        Returns the collected comments as a categorical DataFrame. In summary mode
+        this is the sample of example comments.
+
+        Returns:
+            pd.DataFrame: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
         """
-        for agent in self.schedule.agents:
-            if hasattr(agent, 'comment') and hasattr(agent, 'sentiment'):
-                self.comments.append({
-                    "agent_id": agent.unique_id,
-                    "group": agent.group.name,
-                    "persona": agent.persona.name,
-                    "comment": agent.comment,
-                    "sentiment": agent.sentiment
-                })
+        return self.comments.to_dataframe()
 
     def compute_overall_nps(self):
         """
@@ -90,14 +213,7 @@ class UserModel(Model):
         Returns:
             float: The overall NPS score.
         """
-        promoters = detractors = total = 0
-        for agent in self.schedule.agents:
-            total += 1
-            if agent.nps >= 9:
-                promoters += 1
-            elif agent.nps <= 6:
-                detractors += 1
-        return ((promoters - detractors) / total) * 100 if total > 0 else 0
+        return self.nps_counts.overall_nps()
 
     def compute_promoters_percentage(self):
         """
@@ -106,8 +222,7 @@ class UserModel(Model):
         Returns:
             float: Percentage of Promoters.
         """
-        promoters = sum(1 for agent in self.schedule.agents if agent.nps >= 9)
-        return (promoters / self.num_users) * 100 if self.num_users > 0 else 0
+        return self.nps_counts.percentage(PROMOTER)
 
     def compute_passives_percentage(self):
         """
@@ -116,8 +231,7 @@ class UserModel(Model):
         Returns:
             float: Percentage of Passives.
         """
-        passives = sum(1 for agent in self.schedule.agents if 7 <= agent.nps <= 8)
-        return (passives / self.num_users) * 100 if self.num_users > 0 else 0
+        return self.nps_counts.percentage(PASSIVE)
 
     def compute_detractors_percentage(self):
         """
@@ -126,8 +240,7 @@ class UserModel(Model):
         Returns:
             float: Percentage of Detractors.
         """
-        detractors = sum(1 for agent in self.schedule.agents if agent.nps <= 6)
-        return (detractors / self.num_users) * 100 if self.num_users > 0 else 0
+        return self.nps_counts.percentage(DETRACTOR)
 
     def compute_group_nps(self):
         """
@@ -136,15 +249,4 @@ class UserModel(Model):
         Returns:
             dict: A dictionary mapping group names to their respective NPS scores.
         """
-        group_nps = {}
-        for group in self.groups:
-            promoters = detractors = total = 0
-            for agent in self.schedule.agents:
-                if agent.group.name == group.name:
-                    total += 1
-                    if agent.nps >= 9:
-                        promoters += 1
-                    elif agent.nps <= 6:
-                        detractors += 1
-            group_nps[group.name] = ((promoters - detractors) / total) * 100 if total > 0 else 0
-        return group_nps
\ No newline at end of file
+        return self.nps_counts.group_nps()
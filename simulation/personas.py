@@ -1,5 +1,12 @@
 # simulation/personas.py
 
+import hashlib
+import json
+import numbers
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
 class Persona:
     def __init__(self, name, age, experience, attributes):
         """
@@ -30,197 +37,236 @@ class Group:
         self.role = role
         self.personas = [Persona(**persona) for persona in personas]
 
-# Define the groups and their personas
-PERSONAS = {
-    "Business Specialist": {
-        "role": "The Business Specialist often has specialist skills, knowledge, and experience when working with data to provide analysis, support, or drive decision-making with analytics in the organization. Even though many of these people are focused and skilled in working on data, their role and ambition are to support business with analytics.",
-        "personas": [
-            {
-                "name": "Operational Worker",
-                "age": 30,
-                "experience": "5 years",
-                "attributes": {
-                    "satisfaction": 7,
-                    "nps": 8
-                }
-            },
-            {
-                "name": "Business Manager",
-                "age": 40,
-                "experience": "15 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "Company Executive",
-                "age": 50,
-                "experience": "25 years",
-                "attributes": {
-                    "satisfaction": 9,
-                    "nps": 10
-                }
-            }
-        ]
-    },
-    "Business Casual": {
-        "role": "The Business Casual is at the end of the value chain, often with little time, skill, or motivation to work with data on their own. Instead, they depend on reliable and actionable information to use when executing their job of running the business. They are often the business leaders responsible for business functions or conducting operational tasks in the business.",
-        "personas": [
-            {
-                "name": "Business Analyst",
-                "age": 35,
-                "experience": "10 years",
-                "attributes": {
-                    "satisfaction": 6,
-                    "nps": 7
-                }
-            },
-            {
-                "name": "Analytics Developer",
-                "age": 32,
-                "experience": "8 years",
-                "attributes": {
-                    "satisfaction": 7,
-                    "nps": 8
-                }
-            },
-            {
-                "name": "Analytics Engineer",
-                "age": 38,
-                "experience": "12 years",
-                "attributes": {
-                    "satisfaction": 7,
-                    "nps": 8
-                }
-            },
-            {
-                "name": "Solution Architect",
-                "age": 45,
-                "experience": "20 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "Data Scientist",
-                "age": 33,
-                "experience": "9 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            }
-        ]
-    },
-    "Data Expert": {
-        "role": "The Data Expert focuses on acquiring, creating, validating, storing, protecting, transforming, and processing data to ensure the accessibility, reliability, fitness, and timeliness of such data for use within the organization.",
-        "personas": [
-            {
-                "name": "Data Architect",
-                "age": 42,
-                "experience": "18 years",
-                "attributes": {
-                    "satisfaction": 9,
-                    "nps": 10
-                }
-            },
-            {
-                "name": "Data Engineer",
-                "age": 36,
-                "experience": "12 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "Transformation Specialist",
-                "age": 39,
-                "experience": "14 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "Onboarding Specialist",
-                "age": 29,
-                "experience": "6 years",
-                "attributes": {
-                    "satisfaction": 7,
-                    "nps": 8
-                }
-            },
-            {
-                "name": "Data Steward",
-                "age": 40,
-                "experience": "16 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "Data Product Manager",
-                "age": 37,
-                "experience": "13 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            }
-        ]
-    },
-    "System Expert": {
-        "role": "The System Expert is an expert on creating and managing systems, data, and technology solutions for others in the organization to use as a platform for other data and analytics jobs along the value chain.",
-        "personas": [
-            {
-                "name": "Enterprise Architect",
-                "age": 45,
-                "experience": "20 years",
-                "attributes": {
-                    "satisfaction": 9,
-                    "nps": 10
-                }
-            },
-            {
-                "name": "Software Engineer",
-                "age": 30,
-                "experience": "7 years",
-                "attributes": {
-                    "satisfaction": 7,
-                    "nps": 8
-                }
-            },
-            {
-                "name": "System and Database Admin",
-                "age": 35,
-                "experience": "10 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            },
-            {
-                "name": "System Operator",
-                "age": 28,
-                "experience": "5 years",
-                "attributes": {
-                    "satisfaction": 6,
-                    "nps": 7
-                }
-            },
-            {
-                "name": "DataOps",
-                "age": 34,
-                "experience": "9 years",
-                "attributes": {
-                    "satisfaction": 8,
-                    "nps": 9
-                }
-            }
+# The persona catalog: a JSON or YAML file in the layout of personas.json, which holds the default one
+DEFAULT_PERSONAS_PATH = os.path.join(os.path.dirname(__file__), "personas.json")
+PERSONAS_PATH = os.environ.get("NPS_SIM_PERSONAS", DEFAULT_PERSONAS_PATH)
+
+
+def load_personas(path):
+    """
+    Reads and validates a persona catalog file.
+
+    Args:
+        path (str): A .json, .yaml or .yml file mapping group names to a "role" and a
+            list of "personas", each with a "name", "age", "experience" and
+            "attributes" holding its initial "satisfaction" and "nps".
+
+    Returns:
+        dict: The catalog, in the layout PersonaCatalog.from_dict expects.
+
+    Raises:
+        ValueError: If the file is not a valid catalog.
+        ImportError: If the file is YAML and PyYAML is not installed.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as error:
+                raise ImportError("Reading YAML persona catalogs requires PyYAML (pip install pyyaml)") from error
+            # The C loader, when PyYAML was built with it, reads large catalogs several times faster
+            personas = yaml.load(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        else:
+            personas = json.load(file)
+    validate_personas(personas)
+    return personas
+
+
+def validate_personas(personas):
+    """
+    Checks that a persona catalog is complete and consistent.
+
+    Args:
+        personas (dict): The catalog, in the layout of personas.json.
+
+    Raises:
+        ValueError: Listing every problem found, e.g. duplicate persona names or
+            attributes outside the 0-10 scale.
+    """
+    if not isinstance(personas, dict) or not personas:
+        raise ValueError("A persona catalog must map at least one group name to its details")
+    problems = []
+    seen = {}
+    for group, details in personas.items():
+        if not isinstance(details, dict) or not isinstance(details.get("personas"), list) or not details["personas"]:
+            problems.append(f"Group {group!r} needs a non-empty list of personas")
+            continue
+        if not isinstance(details.get("role"), str):
+            problems.append(f"Group {group!r} needs a role description")
+        for persona in details["personas"]:
+            name = persona.get("name") if isinstance(persona, dict) else None
+            if not isinstance(name, str) or not name:
+                problems.append(f"Group {group!r} has a persona without a name")
+                continue
+            if name in seen:
+                problems.append(f"Persona {name!r} appears in both {seen[name]!r} and {group!r}")
+            seen[name] = group
+            missing = {"age", "experience", "attributes"} - set(persona)
+            if missing:
+                problems.append(f"Persona {name!r} is missing {', '.join(sorted(missing))}")
+                continue
+            for attribute, default in (("satisfaction", 5), ("nps", 0)):
+                value = persona["attributes"].get(attribute, default)
+                if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+                    problems.append(f"Persona {name!r} has {attribute} {value!r}; expected an integer from 0 to 10")
+    if problems:
+        raise ValueError("Invalid persona catalog: " + "; ".join(problems))
+
+
+@dataclass(frozen=True)
+class PersonaCatalog:
+    """
+    An immutable, index-based view of a persona definition such as PERSONAS.
+
+    Groups and personas are numbered in definition order, so agents only need to
+    hold small integer indices; names, roles and defaults are stored once here.
+    Name lookups go through read-only indexes built once, so they cost the same
+    for any catalog size. The model, the engines and the UI all share CATALOG.
+
+    Attributes:
+        group_names (tuple): Group names, in group index order.
+        group_roles (tuple): Role description of each group.
+        group_personas (tuple): Persona indices of each group.
+        persona_names (tuple): Persona names, in persona index order.
+        persona_groups (tuple): Group index of each persona.
+        persona_satisfaction (tuple): Default initial satisfaction of each persona.
+        persona_nps (tuple): Initial NPS rating of each persona.
+        fingerprint (str): SHA-256 of the definition the catalog was built from.
+        group_ids (Mapping): Group name -> group index.
+        persona_ids (Mapping): Persona name -> persona index.
+    """
+    group_names: tuple
+    group_roles: tuple
+    group_personas: tuple
+    persona_names: tuple
+    persona_groups: tuple
+    persona_satisfaction: tuple
+    persona_nps: tuple
+    fingerprint: str = ""
+    group_ids: MappingProxyType = field(default=None, compare=False, repr=False)
+    persona_ids: MappingProxyType = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        """
+        Builds the name indexes.
+        """
+        object.__setattr__(self, "group_ids", MappingProxyType({name: i for i, name in enumerate(self.group_names)}))
+        object.__setattr__(self, "persona_ids", MappingProxyType({name: i for i, name in enumerate(self.persona_names)}))
+
+    @classmethod
+    def from_dict(cls, personas):
+        """
+        Builds a catalog from a nested persona definition.
+
+        Args:
+            personas (dict): Group names mapped to a "role" and a list of "personas",
+                in the layout of PERSONAS.
+
+        Returns:
+            PersonaCatalog: The catalog.
+        """
+        group_personas, persona_names, persona_groups, satisfaction, nps = [], [], [], [], []
+        for group_index, details in enumerate(personas.values()):
+            start = len(persona_names)
+            for persona in details["personas"]:
+                persona_names.append(persona["name"])
+                persona_groups.append(group_index)
+                satisfaction.append(persona["attributes"].get("satisfaction", 5))
+                nps.append(persona["attributes"].get("nps", 0))
+            group_personas.append(tuple(range(start, len(persona_names))))
+        return cls(
+            group_names=tuple(personas),
+            group_roles=tuple(details["role"] for details in personas.values()),
+            group_personas=tuple(group_personas),
+            persona_names=tuple(persona_names),
+            persona_groups=tuple(persona_groups),
+            persona_satisfaction=tuple(satisfaction),
+            persona_nps=tuple(nps),
+            fingerprint=hashlib.sha256(json.dumps(personas, sort_keys=True).encode("utf-8")).hexdigest()
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads, validates and indexes a persona catalog file.
+
+        Args:
+            path (str): A JSON or YAML catalog, see load_personas.
+
+        Returns:
+            PersonaCatalog: The catalog.
+        """
+        return cls.from_dict(load_personas(path))
+
+    def group_of(self, persona):
+        """
+        Returns the name of a persona's group.
+
+        Args:
+            persona (str): Persona name.
+
+        Returns:
+            str: The group name.
+        """
+        return self.group_names[self.persona_groups[self.persona_ids[persona]]]
+
+    def initial_satisfaction(self, overrides):
+        """
+        Returns the initial satisfaction of each persona.
+
+        Args:
+            overrides (dict): Persona names mapped to initial satisfaction levels,
+                e.g. from the sidebar; other personas keep their default.
+
+        Returns:
+            tuple: Initial satisfaction of each persona, in persona index order.
+        """
+        return tuple(
+            overrides.get(name, default) for name, default in zip(self.persona_names, self.persona_satisfaction)
+        )
+
+    def satisfaction_overrides(self, shift=0, group_shifts=None, persona_levels=None):
+        """
+        Returns initial satisfaction overrides from bulk adjustments.
+
+        Every persona's default is moved by `shift` plus its group's shift and clamped
+        to the 0-10 scale; levels given per persona replace the result. Only personas
+        that end up away from their default are returned, so the overrides of a large
+        catalog stay small.
+
+        Args:
+            shift (int): Shift applied to every persona.
+            group_shifts (dict, optional): Group names mapped to a further shift for their personas.
+            persona_levels (dict, optional): Persona names mapped to an explicit level.
+
+        Returns:
+            dict: Persona names mapped to initial satisfaction levels, for initial_satisfaction.
+
+        Raises:
+            ValueError: If a group or persona name is unknown, or an explicit level is
+                not an integer from 0 to 10.
+        """
+        group_shifts = group_shifts or {}
+        persona_levels = persona_levels or {}
+        unknown = (set(group_shifts) - set(self.group_ids)) | (set(persona_levels) - set(self.persona_ids))
+        if unknown:
+            raise ValueError(f"Unknown groups or personas: {', '.join(sorted(unknown))}")
+        invalid = [
+            f"{name!r}: {level!r}" for name, level in persona_levels.items()
+            if isinstance(level, bool) or not isinstance(level, numbers.Integral) or not 0 <= level <= 10
         ]
-    }
-}
\ No newline at end of file
+        if invalid:
+            raise ValueError(f"Satisfaction levels must be integers from 0 to 10: {', '.join(invalid)}")
+        group_total = [shift + group_shifts.get(name, 0) for name in self.group_names]
+        overrides = {}
+        for name, group, default in zip(self.persona_names, self.persona_groups, self.persona_satisfaction):
+            level = persona_levels.get(name, min(max(default + group_total[group], 0), 10))
+            if level != default:
+                overrides[name] = int(level)
+        return overrides
+
+
+PERSONAS = load_personas(PERSONAS_PATH)
+CATALOG = PersonaCatalog.from_dict(PERSONAS)
+# Group and Persona objects of the catalog, built once and shared by every model
+GROUPS = tuple(Group(name, details["role"], details["personas"]) for name, details in PERSONAS.items())
@@ -0,0 +1,121 @@
+# simulation/population.py
+
+import numpy as np
+
+# Keys of a population mix; an empty mix draws groups, then personas within them, uniformly
+POPULATION_MIX_KEYS = ("group_weights", "persona_weights", "persona_counts")
+
+
+def validate_mix(catalog, mix):
+    """
+    Checks that a population mix only refers to known keys, groups and personas.
+
+    Args:
+        catalog (PersonaCatalog): The personas of the simulation.
+        mix (dict): Population mix with optional "group_weights" (group name -> weight),
+            "persona_weights" (persona name -> weight within its group) or
+            "persona_counts" (persona name -> number of agents).
+
+    Raises:
+        ValueError: If the mix has unknown keys or names, negative values, or combines
+            counts with weights.
+    """
+    unknown = set(mix) - set(POPULATION_MIX_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown population mix keys: {', '.join(sorted(unknown))}")
+    if "persona_counts" in mix and ("group_weights" in mix or "persona_weights" in mix):
+        raise ValueError("A population mix takes either persona counts or weights, not both")
+    for key, names in (
+        ("group_weights", catalog.group_names),
+        ("persona_weights", catalog.persona_names),
+        ("persona_counts", catalog.persona_names)
+    ):
+        values = mix.get(key, {})
+        unknown = set(values) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown names in {key}: {', '.join(sorted(unknown))}")
+        if any(value < 0 for value in values.values()):
+            raise ValueError(f"Values in {key} must not be negative")
+
+
+def persona_probabilities(catalog, group_weights=None, persona_weights=None):
+    """
+    Returns the probability of each persona under group and within-group weights.
+
+    A persona's probability is its group's share of the group weights times its own
+    share of the persona weights within that group. Missing weights default to 1, so
+    no weights at all give uniform groups and uniform personas within each group.
+
+    Args:
+        catalog (PersonaCatalog): The personas of the simulation.
+        group_weights (dict, optional): Group names mapped to relative weights.
+        persona_weights (dict, optional): Persona names mapped to relative weights within their group.
+
+    Returns:
+        np.ndarray: float64 probabilities in persona index order, summing to 1.
+    """
+    group_weights = group_weights or {}
+    persona_weights = persona_weights or {}
+    groups = np.asarray(catalog.persona_groups)
+    group_w = np.array([float(group_weights.get(name, 1.0)) for name in catalog.group_names])
+    persona_w = np.array([float(persona_weights.get(name, 1.0)) for name in catalog.persona_names])
+
+    within_group = np.bincount(groups, weights=persona_w, minlength=len(catalog.group_names))
+    if group_w.sum() <= 0:
+        raise ValueError("At least one group needs a positive weight")
+    if ((group_w > 0) & (within_group <= 0)).any():
+        raise ValueError("Every group with a positive weight needs a persona with a positive weight")
+
+    # Groups of weight 0 contribute nothing, whatever the weights of their personas
+    group_share = group_w / group_w.sum()
+    persona_share = np.divide(persona_w, within_group[groups], out=np.zeros_like(persona_w), where=within_group[groups] > 0)
+    return group_share[groups] * persona_share
+
+
+def persona_counts(catalog, num_users, mix, rng):
+    """
+    Returns how many agents each persona gets.
+
+    Absolute counts are used as given; weights are turned into counts with a single
+    multinomial draw.
+
+    Args:
+        catalog (PersonaCatalog): The personas of the simulation.
+        num_users (int): Population size.
+        mix (dict): Population mix, see validate_mix.
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        np.ndarray: int64 agent counts in persona index order.
+    """
+    if "persona_counts" in mix:
+        counts = np.array([int(mix["persona_counts"].get(name, 0)) for name in catalog.persona_names], dtype=np.int64)
+        if counts.sum() != num_users:
+            raise ValueError(f"Persona counts add up to {counts.sum()}, not to the {num_users} users of the simulation")
+        return counts
+    probabilities = persona_probabilities(catalog, mix.get("group_weights"), mix.get("persona_weights"))
+    return rng.multinomial(num_users, probabilities)
+
+
+def assign_personas(catalog, num_users, mix, rng):
+    """
+    Draws the persona of every agent in one batch.
+
+    The persona counts are laid out in persona order and shuffled, so agent ids
+    carry no information about personas.
+
+    Args:
+        catalog (PersonaCatalog): The personas of the simulation.
+        num_users (int): Population size.
+        mix (dict, optional): Population mix, see validate_mix; None or empty for uniform groups and personas.
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        np.ndarray: Persona index of each agent, in agent id order.
+    """
+    mix = mix or {}
+    validate_mix(catalog, mix)
+    counts = persona_counts(catalog, num_users, mix, rng)
+    persona_index = np.repeat(np.arange(len(catalog.persona_names), dtype=np.int32), counts)
+    rng.shuffle(persona_index)
+    return persona_index
@@ -0,0 +1,165 @@
+# simulation/profiling.py
+
+import io
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Optional capture modes: a cProfile of every function call, or tracemalloc allocation sites
+CAPTURE_MODES = ("none", "cprofile", "tracemalloc")
+
+# Lines kept in the report of a capture
+CAPTURE_REPORT_LINES = 30
+
+
+class PhaseTimer:
+    """
+    Hierarchical wall-clock timers and allocation counters for the phases of a run.
+
+    Phases nest: a phase entered while another is open is recorded under the outer
+    phase's path, e.g. "simulation/schedule". Every phase counts its calls, its total
+    time and the net number of memory blocks it left allocated. While a tracemalloc
+    capture is active, the net traced bytes are counted as well.
+
+    Timing a phase costs a few microseconds, so models time whole steps and their
+    parts, never individual agents.
+    """
+
+    def __init__(self, capture="none"):
+        """
+        Initializes an empty timer.
+
+        Args:
+            capture (str): Capture mode used by capture(): "none", "cprofile" or "tracemalloc".
+        """
+        if capture not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture!r}")
+        self.capture_mode = capture
+        self.capture_report = None
+        self._stack = []
+        self._phases = {}  # Path -> [calls, seconds, net blocks, net traced bytes]
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as a phase nested in the currently open phase.
+
+        Args:
+            name (str): Name of the phase.
+        """
+        self._stack.append(name)
+        stats = self._phases.setdefault("/".join(self._stack), [0, 0.0, 0, 0])
+        tracing = tracemalloc.is_tracing()
+        traced = tracemalloc.get_traced_memory()[0] if tracing else 0
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += sys.getallocatedblocks() - blocks
+            if tracing and tracemalloc.is_tracing():
+                stats[3] += tracemalloc.get_traced_memory()[0] - traced
+            self._stack.pop()
+
+    @contextmanager
+    def capture(self):
+        """
+        Runs the enclosed block under the capture mode chosen at construction.
+
+        With "cprofile", the report lists the functions with the highest cumulative
+        time. With "tracemalloc", it lists the source lines holding the most memory
+        at the end of the block, and phases also count their net traced bytes. With
+        "none", the block runs unchanged.
+        """
+        if self.capture_mode == "cprofile":
+            import cProfile
+            import pstats
+
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                stream = io.StringIO()
+                pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(CAPTURE_REPORT_LINES)
+                self.capture_report = stream.getvalue()
+        elif self.capture_mode == "tracemalloc":
+            already_tracing = tracemalloc.is_tracing()
+            if not already_tracing:
+                tracemalloc.start()
+            try:
+                yield
+            finally:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if not already_tracing:
+                    tracemalloc.stop()
+                lines = [f"Peak traced memory: {peak / 2**20:.1f} MiB"]
+                lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:CAPTURE_REPORT_LINES])
+                self.capture_report = "\n".join(lines)
+        else:
+            yield
+
+    def rows(self):
+        """
+        Returns the recorded phases, in the order they were first entered.
+
+        Returns:
+            list: One dict per phase with 'phase', 'calls', 'seconds', 'mean_ms',
+                'net_blocks' and 'net_traced_bytes'.
+        """
+        return [
+            {
+                "phase": path,
+                "calls": calls,
+                "seconds": seconds,
+                "mean_ms": seconds / calls * 1000,
+                "net_blocks": blocks,
+                "net_traced_bytes": traced
+            }
+            for path, (calls, seconds, blocks, traced) in self._phases.items()
+        ]
+
+    def to_dataframe(self):
+        """
+        Returns the recorded phases as a table.
+
+        Returns:
+            pd.DataFrame: The rows of rows(), with a 'share %' column giving each
+                phase's time relative to its top-level phase.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.rows(), columns=["phase", "calls", "seconds", "mean_ms", "net_blocks", "net_traced_bytes"])
+        top_level = df["phase"].str.split("/").str[0]
+        totals = df.loc[~df["phase"].str.contains("/"), ["phase", "seconds"]].set_index("phase")["seconds"]
+        df["share %"] = (df["seconds"] / top_level.map(totals) * 100).round(1)
+        return df
+
+    def to_dict(self):
+        """
+        Returns everything recorded, in a JSON-serializable form.
+
+        Returns:
+            dict: 'capture_mode', 'phases' (see rows()) and 'capture_report'.
+        """
+        return {
+            "capture_mode": self.capture_mode,
+            "phases": self.rows(),
+            "capture_report": self.capture_report
+        }
+
+    def to_json(self):
+        """
+        Returns everything recorded as a JSON document.
+
+        Returns:
+            str: The JSON form of to_dict().
+        """
+        return json.dumps(self.to_dict(), indent=2)
@@ -0,0 +1,149 @@
+# simulation/rng.py
+
+import numpy as np
+
+# Stream ids; every random decision of a run comes from exactly one of them
+POPULATION_STREAM = 0
+SATISFACTION_STREAM = 1
+COMMENTS_STREAM = 2
+HISTORY_STREAM = 3
+COMMENT_SAMPLE_STREAM = 4
+
+# 64-bit outputs the Philox generator produces per counter increment
+_PHILOX_BLOCK = 4
+
+# Last counter word of step_generator; per-agent draws use 0, so the two never overlap
+_STEP_LANE = 1
+
+
+class RandomStreams:
+    """
+    Counter-based random streams derived from a single scenario seed.
+
+    Each stream has its own Philox key derived with a NumPy SeedSequence, and its
+    draws are addressed by (step, agent id) through the Philox counter rather than
+    by how many numbers were drawn before. The value an agent gets at a step is
+    therefore the same whether the population is stepped serially, in chunks, or
+    split into shards stepped by different processes, and both engines see the
+    same numbers.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initializes the streams.
+
+        Args:
+            seed (int, optional): The scenario seed; None draws fresh entropy, which is
+                kept in `entropy` so the run can be reproduced.
+        """
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self._keys = {}
+
+    def seed_sequence(self, stream):
+        """
+        Returns the SeedSequence of a stream.
+
+        Args:
+            stream (int): Stream id, e.g. POPULATION_STREAM.
+
+        Returns:
+            np.random.SeedSequence: Independent of the sequences of all other streams.
+        """
+        return np.random.SeedSequence(self.entropy, spawn_key=(stream,))
+
+    def key(self, stream):
+        """
+        Returns the Philox key of a stream.
+
+        Args:
+            stream (int): Stream id.
+
+        Returns:
+            np.ndarray: Two uint64 words.
+        """
+        if stream not in self._keys:
+            self._keys[stream] = self.seed_sequence(stream).generate_state(2, dtype=np.uint64)
+        return self._keys[stream]
+
+    def generator(self, stream):
+        """
+        Returns a sequential Generator for one-off draws such as the population.
+
+        Args:
+            stream (int): Stream id.
+
+        Returns:
+            np.random.Generator: A Philox generator on the stream's key.
+        """
+        return np.random.Generator(np.random.Philox(key=self.key(stream)))
+
+    def step_generator(self, stream, step):
+        """
+        Returns a Generator for population-level draws at a step.
+
+        Engines that draw per step rather than per agent, such as the aggregate
+        engine, get the same numbers at a step however the run was chunked or
+        resumed.
+
+        Args:
+            stream (int): Stream id.
+            step (int): Step number.
+
+        Returns:
+            np.random.Generator: A Philox generator whose counter starts at the step.
+        """
+        return np.random.Generator(np.random.Philox(counter=[0, 0, int(step), _STEP_LANE], key=self.key(stream)))
+
+    def raw(self, stream, step, start, stop):
+        """
+        Returns the raw draws of a range of agents at a step.
+
+        Args:
+            stream (int): Stream id.
+            step (int): Step number.
+            start (int): First agent id.
+            stop (int): One past the last agent id.
+
+        Returns:
+            np.ndarray: One uint64 per agent; agent i always gets the same value
+                for the same stream and step, whatever the range requested.
+        """
+        block, skip = divmod(int(start), _PHILOX_BLOCK)
+        bit_generator = np.random.Philox(counter=[block, 0, int(step), 0], key=self.key(stream))
+        return bit_generator.random_raw(int(stop) - int(start) + skip)[skip:]
+
+    def integers(self, stream, low, high, step, start, stop, dtype=np.int64):
+        """
+        Returns a uniform integer in [low, high) for each of a range of agents at a step.
+
+        Args:
+            stream (int): Stream id.
+            low (int): Lowest value.
+            high (int): One past the highest value.
+            step (int): Step number.
+            start (int): First agent id.
+            stop (int): One past the last agent id.
+            dtype (np.dtype): Integer dtype of the result.
+
+        Returns:
+            np.ndarray: One value per agent.
+        """
+        # Multiply-shift on the top 32 bits; the bias is below 2**-32 per value
+        top = self.raw(stream, step, start, stop) >> np.uint64(32)
+        values = (top * np.uint64(high - low)) >> np.uint64(32)
+        return (values.astype(np.int64) + low).astype(dtype)
+
+    def random(self, stream, step, start, stop):
+        """
+        Returns a uniform float in [0, 1) for each of a range of agents at a step.
+
+        Args:
+            stream (int): Stream id.
+            step (int): Step number.
+            start (int): First agent id.
+            stop (int): One past the last agent id.
+
+        Returns:
+            np.ndarray: float64 values, one per agent.
+        """
+        return (self.raw(stream, step, start, stop) >> np.uint64(11)) * (1.0 / 2**53)
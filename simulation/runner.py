@@ -0,0 +1,262 @@
+# simulation/runner.py
+
+import importlib
+import json
+from dataclasses import dataclass, field, asdict
+from typing import TYPE_CHECKING
+from .change import Change
+from .collection import AgentHistory, PersonaCountHistory
+from .comments import CommentLog
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+NPS_METRICS = ["Overall NPS", "Promoters %", "Passives %", "Detractors %"]
+
+# Simulation engines, by the key used in scenarios and the sidebar, as (module, class).
+# Engines are imported on first use, so Mesa is only loaded when the Mesa engine runs.
+ENGINES = {
+    "mesa": (".model", "UserModel"),
+    "vectorized": (".vectorized", "VectorizedUserModel"),
+    "sharded": (".sharded", "ShardedUserModel"),
+    "aggregate": (".aggregate", "AggregateUserModel")
+}
+
+
+# Engines to use instead for runs that already execute in a process pool, such as ensemble
+# replicates and sweep points; they give the same metrics in a single process
+POOLED_ENGINES = {"sharded": "vectorized"}
+
+
+def engine_class(engine):
+    """
+    Imports and returns the model class of a simulation engine.
+
+    Args:
+        engine (str): Key of the engine in ENGINES.
+
+    Returns:
+        type: UserModel, VectorizedUserModel, ShardedUserModel or AggregateUserModel.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown simulation engine: {engine!r}")
+    module, name = ENGINES[engine]
+    return getattr(importlib.import_module(module, __package__), name)
+
+
+@dataclass
+class Scenario:
+    """
+    A data class describing one simulation run.
+
+    Attributes:
+        num_users (int): Number of users in the simulation.
+        num_steps (int): Number of simulation steps.
+        csat_score (float): The Customer Satisfaction Score influencing the simulation.
+        initial_satisfaction (dict): Persona names mapped to their initial satisfaction levels.
+        seed (int): Seed for the model's random number generator.
+        engine (str): Key of the simulation engine in ENGINES.
+        comment_history (str): "full" or "summary".
+        agent_history (str): Retention policy of the agent history: "full", "final",
+            "every", "sample" or "spill".
+        agent_history_every (int): Step interval of the "every" policy.
+        agent_history_sample (int): Number of agents tracked by the "sample" policy.
+        population_mix (dict): Group and persona weights or persona counts of the population,
+            see population.validate_mix; empty for uniform groups and personas.
+    """
+    num_users: int
+    num_steps: int
+    csat_score: float
+    initial_satisfaction: dict = field(default_factory=dict)
+    seed: int = None
+    engine: str = "mesa"
+    comment_history: str = "full"
+    agent_history: str = "full"
+    agent_history_every: int = 10
+    agent_history_sample: int = 1000
+    population_mix: dict = field(default_factory=dict)
+
+
+@dataclass
+class SimulationResult:
+    """
+    A data class holding everything a finished run produced.
+
+    Attributes:
+        scenario (Scenario): The scenario that was run.
+        model_data (pd.DataFrame): Model-level data, one row per step.
+        agent_history (AgentHistory): Agent-level data, as retained by the scenario's policy.
+        comments (CommentLog): The run's comment log.
+        persona_counts (PersonaCountHistory): Per-step NPS category counts by persona and group.
+        figures (dict): Encoded chart images by key, filled in by visualization.rendering
+            so each chart is drawn once per result.
+    """
+    scenario: Scenario
+    model_data: "pd.DataFrame"
+    agent_history: AgentHistory
+    comments: CommentLog
+    persona_counts: PersonaCountHistory
+    figures: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_model(cls, scenario: Scenario, model, snapshot=True):
+        """
+        Collects the results of a model that has been run.
+
+        Args:
+            scenario (Scenario): The scenario the model was built from.
+            model (UserModel or VectorizedUserModel): The model after its final step.
+            snapshot (bool): Copy the agent history, comments and persona counts so the
+                result does not change when the model takes further steps, e.g. when a
+                cached run is extended. Pass False when the model is discarded or the
+                result is only displayed once.
+
+        Returns:
+            SimulationResult: The collected results.
+        """
+        agent_history = model.datacollector.agent_history
+        comments = model.comments
+        persona_counts = model.datacollector.persona_history
+        if snapshot:
+            agent_history, comments, persona_counts = agent_history.snapshot(), comments.snapshot(), persona_counts.snapshot()
+        return cls(
+            scenario=scenario,
+            model_data=model.datacollector.get_model_vars_dataframe(),
+            agent_history=agent_history,
+            comments=comments,
+            persona_counts=persona_counts
+        )
+
+    @property
+    def agent_data(self):
+        """
+        pd.DataFrame: Agent-level data indexed by (Step, AgentID), built from the
+            agent history on access. Spilled steps are read back from disk.
+        """
+        return self.agent_history.to_dataframe()
+
+    def get_comments_dataframe(self):
+        """
+        Returns the comments as a categorical DataFrame (a sample of them in summary mode).
+
+        Returns:
+            pd.DataFrame: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
+        """
+        return self.comments.to_dataframe()
+
+    def nbytes(self):
+        """
+        Returns the approximate memory held by the result.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return int(
+            self.model_data.memory_usage(index=True, deep=True).sum()
+            + self.agent_history.nbytes()
+            + self.comments.nbytes()
+            + self.persona_counts.nbytes()
+            + sum(len(image) for image in self.figures.values())
+        )
+
+
+def build_model(scenario: Scenario, profiler=None):
+    """
+    Creates the model for a scenario without stepping it.
+
+    Args:
+        scenario (Scenario): The scenario to build.
+        profiler (PhaseTimer, optional): Timer that receives the phases of every step.
+
+    Returns:
+        UserModel or VectorizedUserModel: The initialized model.
+    """
+    return engine_class(scenario.engine)(
+        scenario.num_users,
+        Change(csat_score=scenario.csat_score),
+        scenario.initial_satisfaction,
+        seed=scenario.seed,
+        comment_history=scenario.comment_history,
+        max_steps=scenario.num_steps,
+        agent_history=scenario.agent_history,
+        agent_history_options={
+            "every": scenario.agent_history_every,
+            "sample_size": scenario.agent_history_sample
+        },
+        profiler=profiler,
+        population_mix=scenario.population_mix
+    )
+
+
+def run_scenario(scenario: Scenario):
+    """
+    Builds a model for a scenario and runs it for all of its steps.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+
+    Returns:
+        UserModel or VectorizedUserModel: The model after the final step.
+    """
+    model = build_model(scenario)
+    for _ in range(scenario.num_steps):
+        model.step()
+    return model
+
+
+def run_metrics(scenario: Scenario):
+    """
+    Runs a scenario and returns its model-level metrics as numeric columns.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+
+    Returns:
+        pd.DataFrame: 'Overall NPS', 'Promoters %', 'Passives %', 'Detractors %' and
+            one '<group> NPS' column per group, indexed by step.
+    """
+    model = run_scenario(scenario)
+    try:
+        model.datacollector.agent_history.delete_spill()
+        return model.datacollector.get_model_vars_dataframe()
+    finally:
+        model.close()
+
+
+def group_nps_columns(model_data):
+    """
+    Returns the names of the per-group NPS columns of model-level data.
+
+    Args:
+        model_data (pd.DataFrame): Model-level data, or metrics from run_metrics.
+
+    Returns:
+        list: The '<group> NPS' column names, in group order.
+    """
+    return [column for column in model_data.columns if column not in NPS_METRICS]
+
+
+def scenario_key(scenario: Scenario):
+    """
+    Returns a canonical string identifying a scenario's inputs.
+
+    Args:
+        scenario (Scenario): The scenario.
+
+    Returns:
+        str: JSON with sorted keys; equal scenarios give equal keys.
+    """
+    data = asdict(scenario)
+    # NumPy scalars and int/float variants of the same value must give the same key
+    data["num_users"] = int(data["num_users"])
+    data["num_steps"] = int(data["num_steps"])
+    data["agent_history_every"] = int(data["agent_history_every"])
+    data["agent_history_sample"] = int(data["agent_history_sample"])
+    data["csat_score"] = float(data["csat_score"])
+    data["initial_satisfaction"] = {name: float(value) for name, value in data["initial_satisfaction"].items()}
+    data["population_mix"] = {
+        key: {name: float(value) for name, value in values.items()} for key, values in data["population_mix"].items()
+    }
+    if data["seed"] is not None:
+        data["seed"] = int(data["seed"])
+    return json.dumps(data, sort_keys=True)
@@ -0,0 +1,233 @@
+# simulation/sharded.py
+
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .vectorized import VectorizedUserModel
+from .rng import COMMENT_SAMPLE_STREAM, SATISFACTION_STREAM, RandomStreams
+from .mappings import (
+    NPS_BY_SATISFACTION,
+    SENTIMENT_BY_SATISFACTION,
+    CATEGORY_BY_SATISFACTION,
+    NPS_CATEGORIES,
+    SENTIMENTS,
+    MIN_SATISFACTION,
+    MAX_SATISFACTION
+)
+
+# Agent state arrays kept in shared memory; every other array stays private to the coordinator
+SHARED_ARRAYS = ("satisfaction", "nps", "sentiment", "nps_category", "persona_index")
+
+# Worker processes, by default one per CPU; results do not depend on it
+DEFAULT_WORKERS = int(os.environ.get("NPS_SIM_WORKERS", 0)) or os.cpu_count() or 1
+
+# State of a worker process, set once by _attach_worker
+_WORKER = {}
+
+
+def shard_bounds(num_users, num_shards):
+    """
+    Splits agent ids into contiguous shards of near-equal size.
+
+    Args:
+        num_users (int): Population size.
+        num_shards (int): Number of shards.
+
+    Returns:
+        list: (start, stop) agent id range of each non-empty shard.
+    """
+    edges = np.linspace(0, num_users, max(1, min(num_shards, num_users)) + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+
+def step_shard(arrays, streams, step, start, stop, num_personas, sample_rate):
+    """
+    Advances the agents of one shard by one step, in place, and counts the outcome.
+
+    Args:
+        arrays (dict): SHARED_ARRAYS views over the whole population.
+        streams (RandomStreams): The run's random streams.
+        step (int): Step number being taken.
+        start (int): First agent id of the shard.
+        stop (int): One past the last agent id of the shard.
+        num_personas (int): Number of personas.
+        sample_rate (float): Probability of returning a comment for the sample; 0 for none.
+
+    Returns:
+        tuple: (personas x NPS categories) counts, (personas x sentiments) counts, and
+            the agent ids of the comments sampled from the shard.
+    """
+    satisfaction = arrays["satisfaction"][start:stop]
+    persona_index = arrays["persona_index"][start:stop]
+
+    # Same update as VectorizedUserModel.step, on the shard's slice of the population
+    change = streams.integers(SATISFACTION_STREAM, -1, 2, step, start, stop, dtype=np.int8)
+    np.add(satisfaction, change, out=satisfaction)
+    np.clip(satisfaction, MIN_SATISFACTION, MAX_SATISFACTION, out=satisfaction)
+    np.take(NPS_BY_SATISFACTION, satisfaction, out=arrays["nps"][start:stop])
+    sentiment = arrays["sentiment"][start:stop]
+    np.take(SENTIMENT_BY_SATISFACTION, satisfaction, out=sentiment)
+    category = arrays["nps_category"][start:stop]
+    np.take(CATEGORY_BY_SATISFACTION, satisfaction, out=category)
+
+    personas = persona_index.astype(np.int64)
+    nps_counts = np.bincount(personas * len(NPS_CATEGORIES) + category, minlength=num_personas * len(NPS_CATEGORIES))
+    sentiment_counts = np.bincount(personas * len(SENTIMENTS) + sentiment, minlength=num_personas * len(SENTIMENTS))
+    sampled = np.empty(0, dtype=np.int64)
+    if sample_rate > 0:
+        sampled = start + np.flatnonzero(streams.random(COMMENT_SAMPLE_STREAM, step, start, stop) < sample_rate)
+    return (
+        nps_counts.reshape(num_personas, len(NPS_CATEGORIES)),
+        sentiment_counts.reshape(num_personas, len(SENTIMENTS)),
+        sampled
+    )
+
+
+def _attach_worker(specs, entropy):
+    """
+    Attaches a worker process to the population's shared memory.
+
+    Args:
+        specs (dict): Array name mapped to (shared memory name, dtype string, length).
+        entropy (int): Entropy of the run's RandomStreams.
+    """
+    _WORKER["segments"] = [shared_memory.SharedMemory(name=name) for name, _, _ in specs.values()]
+    _WORKER["arrays"] = {
+        key: np.ndarray((length,), dtype=np.dtype(dtype), buffer=segment.buf)
+        for (key, (_, dtype, length)), segment in zip(specs.items(), _WORKER["segments"])
+    }
+    _WORKER["streams"] = RandomStreams(entropy)
+
+
+def _worker_step(task):
+    """
+    Steps one shard in a worker process.
+
+    Args:
+        task (tuple): (step, start, stop, num_personas, sample_rate).
+
+    Returns:
+        tuple: See step_shard.
+    """
+    return step_shard(_WORKER["arrays"], _WORKER["streams"], *task)
+
+
+def _release(executor, segments):
+    """
+    Shuts down the worker pool and frees the shared memory of a model.
+    """
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            pass  # Views still exist in this process; the mapping goes away with them
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ShardedUserModel(VectorizedUserModel):
+    def __init__(self, *args, workers=None, **kwargs):
+        """
+        Initializes the ShardedUserModel.
+
+        Behaves like VectorizedUserModel and takes the same arguments, but keeps the
+        agent state in shared memory and steps it in contiguous shards across a pool
+        of worker processes. Workers only send back per-shard NPS and sentiment
+        counts (and the ids of comments sampled for the example comments), which
+        the coordinator sums.
+
+        Every draw is addressed by (seed, agent id, step), so results are identical
+        to VectorizedUserModel's for any number of workers. Only the sample of
+        example comments in summary mode is drawn differently.
+
+        Args:
+            *args: Positional arguments of VectorizedUserModel.
+            workers (int, optional): Number of worker processes; defaults to NPS_SIM_WORKERS
+                or the CPU count. With 1 worker, shards are stepped in this process.
+            **kwargs: Keyword arguments of VectorizedUserModel.
+        """
+        super().__init__(*args, **kwargs)
+        self.workers = int(workers or DEFAULT_WORKERS)
+        self.shards = shard_bounds(self.num_users, self.workers)
+        self._sample_rate = 0.0
+        if self.comments.summary_only:
+            self._sample_rate = min(1.0, self.comments.sample_size / max(self.num_users, 1))
+
+        # Move the agent state into shared memory
+        self._segments = []
+        specs = {}
+        for key in SHARED_ARRAYS:
+            private = getattr(self, key)
+            segment = shared_memory.SharedMemory(create=True, size=max(private.nbytes, 1))
+            shared = np.ndarray(private.shape, dtype=private.dtype, buffer=segment.buf)
+            shared[:] = private
+            setattr(self, key, shared)
+            self._segments.append(segment)
+            specs[key] = (segment.name, private.dtype.str, len(private))
+        self._arrays = {key: getattr(self, key) for key in SHARED_ARRAYS}
+
+        self._executor = None
+        if self.workers > 1 and len(self.shards) > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=len(self.shards),
+                initializer=_attach_worker,
+                initargs=(specs, self.streams.entropy)
+            )
+        self._finalizer = weakref.finalize(self, _release, self._executor, self._segments)
+        self._shard_results = []
+
+    def step(self):
+        """
+        Advances the whole population by one step, one shard per worker.
+        """
+        tasks = [
+            (self.steps, start, stop, len(self.persona_names), self._sample_rate)
+            for start, stop in self.shards
+        ]
+        with self.profiler.phase("shards"):
+            if self._executor is None:
+                self._shard_results = [step_shard(self._arrays, self.streams, *task) for task in tasks]
+            else:
+                self._shard_results = list(self._executor.map(_worker_step, tasks))
+        with self.profiler.phase("reduce"):
+            self.nps_counts.set_persona_table(sum(result[0] for result in self._shard_results))
+        self.steps += 1
+        with self.profiler.phase("datacollector"):
+            self.datacollector.collect(self)
+        with self.profiler.phase("collect_comments"):
+            self.collect_comments()
+
+    def collect_comments(self):
+        """
+        Appends the step's comments to the comment log. In summary mode only the
+        shard counts and the sampled comments are used, not the whole population.
+        """
+        if not self.comments.summary_only:
+            super().collect_comments()
+            return
+        sampled = np.concatenate([result[2] for result in self._shard_results])
+        self.comments.append_summary(
+            sum(result[1] for result in self._shard_results),
+            self.num_users,
+            self._agent_ids[sampled],
+            self.persona_index[sampled],
+            self.sentiment[sampled]
+        )
+
+    def close(self):
+        """
+        Shuts down the workers and frees the shared memory. The model keeps private
+        copies of the agent state, so its results stay readable.
+        """
+        if not self._finalizer.alive:
+            return
+        for key in SHARED_ARRAYS:
+            setattr(self, key, getattr(self, key).copy())
+        self._arrays = {}
+        self._finalizer()
@@ -0,0 +1,49 @@
+# simulation/stepping.py
+
+
+class SteppingMixin:
+    """
+    Adds chunked, resumable stepping to a model with `step()`, `steps` and a
+    `datacollector` exposing `model_vars`.
+    """
+
+    def iter_chunks(self, num_steps, chunk_size=1):
+        """
+        Advances the model by `num_steps` steps, yielding after every chunk.
+
+        The model is left in a consistent state between chunks, so a caller can
+        stop iterating at any point and later call iter_chunks again to resume
+        or extend the run.
+
+        Args:
+            num_steps (int): Number of steps to advance.
+            chunk_size (int): Number of steps per chunk.
+
+        Yields:
+            dict: 'Step' plus the latest value of every model-level reporter.
+        """
+        chunk_size = max(1, int(chunk_size))
+        remaining = int(num_steps)
+        while remaining > 0:
+            for _ in range(min(chunk_size, remaining)):
+                self.step()
+                remaining -= 1
+            yield self.latest_metrics()
+
+    def close(self):
+        """
+        Releases resources the model holds outside the process, such as worker pools
+        or shared memory. In-process engines hold none, so this does nothing.
+        """
+
+    def latest_metrics(self):
+        """
+        Returns the most recently collected model-level metrics.
+
+        Returns:
+            dict: 'Step' plus the latest value of every model-level reporter.
+        """
+        metrics = {"Step": self.steps}
+        for name, values in self.datacollector.model_vars.items():
+            metrics[name] = values[-1]
+        return metrics
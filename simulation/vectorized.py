@@ -0,0 +1,257 @@
+# simulation/vectorized.py
+
+from functools import partial
+import numpy as np
+from .change import Change
+from .personas import CATALOG, GROUPS
+from .aggregation import NPSAggregator
+from .collection import AgentHistory, ColumnarDataCollector, PersonaCountHistory
+from .comments import CommentLog
+from .population import assign_personas
+from .profiling import PhaseTimer
+from .rng import COMMENTS_STREAM, HISTORY_STREAM, POPULATION_STREAM, SATISFACTION_STREAM, RandomStreams
+from .stepping import SteppingMixin
+from .mappings import (
+    NPS_BY_SATISFACTION,
+    SENTIMENT_BY_SATISFACTION,
+    CATEGORY_BY_SATISFACTION,
+    PROMOTER,
+    PASSIVE,
+    DETRACTOR,
+    NEUTRAL,
+    MIN_SATISFACTION,
+    MAX_SATISFACTION,
+    code_dtype,
+    nps_categories
+)
+
+
+class VectorizedUserModel(SteppingMixin):
+    def __init__(self, num_users, change: Change, initial_satisfaction: dict, seed=None, comment_history="full", max_steps=None,
+                 agent_history="full", agent_history_options=None, profiler=None,
+                 population_mix=None):
+        """
+        Initializes the VectorizedUserModel.
+
+        Behaves like UserModel, but keeps the population as contiguous NumPy arrays
+        and advances every agent in one batch per step.
+
+        Args:
+            num_users (int): Number of users in the simulation.
+            change (Change): An object representing changes in satisfaction or other parameters.
+            initial_satisfaction (dict): A dictionary mapping persona names to their initial satisfaction levels.
+            seed (int, optional): Scenario seed of the model's random streams, see rng.RandomStreams.
+            comment_history (str): "full" to keep every comment, or "summary" to keep per-step
+                sentiment counts and a bounded sample of example comments.
+            max_steps (int, optional): Expected number of steps, used to preallocate the agent
+                history. Runs may go longer.
+            agent_history (str): Retention policy of the agent history, one of
+                collection.AGENT_HISTORY_POLICIES.
+            agent_history_options (dict, optional): Further AgentHistory keyword arguments,
+                e.g. {"every": 10} or {"sample_size": 1000}.
+            profiler (PhaseTimer, optional): Timer that receives the phases of every step;
+                a private one is created if omitted.
+            population_mix (dict, optional): Group and persona weights or persona counts, see
+                population.validate_mix; groups and personas are drawn uniformly if omitted.
+        """
+        self.profiler = profiler if profiler is not None else PhaseTimer()
+        self.num_users = num_users
+        self.change = change
+        self.streams = RandomStreams(seed)
+        self.steps = 0
+
+        # Initialize groups and personas
+        self.catalog = CATALOG
+        self.groups = GROUPS
+        self.group_names = list(self.catalog.group_names)
+        self.persona_names = list(self.catalog.persona_names)
+
+        # Per-persona lookup tables
+        persona_satisfaction = np.array(self.catalog.initial_satisfaction(initial_satisfaction), dtype=np.int8)
+        persona_nps = np.array(self.catalog.persona_nps, dtype=np.int8)
+        persona_groups = np.array(self.catalog.persona_groups)
+
+        # Same population as UserModel: one batched draw of every agent's persona under the population mix
+        persona_index = assign_personas(self.catalog, num_users, population_mix, self.streams.generator(POPULATION_STREAM))
+        self.persona_index = persona_index.astype(code_dtype(len(self.persona_names)))
+        self.group_index = persona_groups[self.persona_index].astype(code_dtype(len(self.groups)))
+
+        # Agent state
+        self.satisfaction = persona_satisfaction[self.persona_index]
+        self.nps = persona_nps[self.persona_index]
+        self.sentiment = np.full(num_users, NEUTRAL, dtype=np.int8)
+        self.nps_category = nps_categories(self.nps)
+
+        # Running NPS category counts, updated only for agents whose category changes
+        self.nps_counts = NPSAggregator(self.group_names, self.persona_names, persona_groups)
+        self.nps_counts.add_many(self.persona_index, self.nps_category)
+
+        self.comments = CommentLog(
+            self.group_names,
+            self.persona_names,
+            persona_groups,
+            summary_only=comment_history == "summary",
+            seed=self.streams.seed_sequence(COMMENTS_STREAM)
+        )
+        self._agent_ids = np.arange(num_users, dtype=np.int32)
+
+        model_reporters = {
+            "Overall NPS": self.compute_overall_nps,
+            "Promoters %": self.compute_promoters_percentage,
+            "Passives %": self.compute_passives_percentage,
+            "Detractors %": self.compute_detractors_percentage
+        }
+        # One numeric column per group rather than a dict per step
+        for group_index, group_name in enumerate(self.nps_counts.group_names):
+            model_reporters[f"{group_name} NPS"] = partial(self.nps_counts.group_score, group_index)
+        self.datacollector = ColumnarDataCollector(
+            model_reporters=model_reporters,
+            agent_reporter=self.get_agent_nps,
+            agent_history=AgentHistory(
+                self._agent_ids,
+                self.group_index,
+                self.persona_index,
+                self.group_names,
+                self.persona_names,
+                capacity=(max_steps or 0) + 1,
+                retention=agent_history,
+                seed=self.streams.seed_sequence(HISTORY_STREAM),
+                **(agent_history_options or {})
+            ),
+            persona_reporter=self.nps_counts.persona_table,
+            persona_history=PersonaCountHistory(
+                self.group_names,
+                self.persona_names,
+                persona_groups,
+                capacity=(max_steps or 0) + 1
+            )
+        )
+        self.datacollector.collect(self)  # Collect initial data
+
+    def step(self):
+        """
+        Advances the whole population by one step.
+        """
+        with self.profiler.phase("update"):
+            # Random fluctuation in satisfaction, as in UserAgent.update_satisfaction
+            change = self.streams.integers(SATISFACTION_STREAM, -1, 2, self.steps, 0, self.num_users, dtype=np.int8)
+            np.add(self.satisfaction, change, out=self.satisfaction)
+            np.clip(self.satisfaction, MIN_SATISFACTION, MAX_SATISFACTION, out=self.satisfaction)
+
+            # Banded maps, as in UserAgent.update_nps and UserAgent.generate_comment
+            np.take(NPS_BY_SATISFACTION, self.satisfaction, out=self.nps)
+            np.take(SENTIMENT_BY_SATISFACTION, self.satisfaction, out=self.sentiment)
+            new_category = CATEGORY_BY_SATISFACTION[self.satisfaction]
+            self.nps_counts.move_many(self.persona_index, self.nps_category, new_category)
+            self.nps_category = new_category
+
+            self.steps += 1
+        with self.profiler.phase("datacollector"):
+            self.datacollector.collect(self)
+        with self.profiler.phase("collect_comments"):
+            self.collect_comments()
+
+    def state_arrays(self):
+        """
+        Returns the agent state that, with the seed and step count, determines how
+        the run continues.
+
+        Returns:
+            dict: 'persona_index', 'satisfaction', 'nps' and 'sentiment' arrays in agent id order.
+        """
+        return {
+            "persona_index": self.persona_index,
+            "satisfaction": self.satisfaction,
+            "nps": self.nps,
+            "sentiment": self.sentiment
+        }
+
+    def restore_state(self, arrays, steps):
+        """
+        Copies the agent state of a checkpoint into the model.
+
+        Args:
+            arrays (dict): As returned by state_arrays.
+            steps (int): Number of steps taken when the state was saved.
+
+        Raises:
+            ValueError: If the checkpoint's population differs from the model's.
+        """
+        if not np.array_equal(arrays["persona_index"], self.persona_index):
+            raise ValueError("The checkpoint was taken from a different population")
+        self.satisfaction[:] = arrays["satisfaction"]
+        self.nps[:] = arrays["nps"]
+        self.sentiment[:] = arrays["sentiment"]
+        # In place, so subclasses that share these arrays with workers keep seeing them
+        self.nps_category[:] = nps_categories(self.nps)
+        self.steps = int(steps)
+
+    def get_agent_nps(self):
+        """
+        Returns the NPS rating of every agent.
+
+        Returns:
+            np.ndarray: int8 NPS ratings in agent id order.
+        """
+        return self.nps
+
+    def collect_comments(self):
+        """
+        Appends the current comment of every agent to the comment log.
+        """
+        self.comments.append(self._agent_ids, self.persona_index, self.sentiment)
+
+    def get_comments_dataframe(self):
+        """
+        Returns the collected comments as a categorical DataFrame. In summary mode
+        this is the sample of example comments.
+
+        Returns:
+            pd.DataFrame: 'agent_id', 'group', 'persona', 'comment' and 'sentiment' columns.
+        """
+        return self.comments.to_dataframe()
+
+    def compute_overall_nps(self):
+        """
+        Computes the overall NPS across all agents.
+
+        Returns:
+            float: The overall NPS score.
+        """
+        return self.nps_counts.overall_nps()
+
+    def compute_promoters_percentage(self):
+        """
+        Computes the percentage of Promoters in the simulation.
+
+        Returns:
+            float: Percentage of Promoters.
+        """
+        return self.nps_counts.percentage(PROMOTER)
+
+    def compute_passives_percentage(self):
+        """
+        Computes the percentage of Passives in the simulation.
+
+        Returns:
+            float: Percentage of Passives.
+        """
+        return self.nps_counts.percentage(PASSIVE)
+
+    def compute_detractors_percentage(self):
+        """
+        Computes the percentage of Detractors in the simulation.
+
+        Returns:
+            float: Percentage of Detractors.
+        """
+        return self.nps_counts.percentage(DETRACTOR)
+
+    def compute_group_nps(self):
+        """
+        Computes the NPS for each group.
+
+        Returns:
+            dict: A dictionary mapping group names to their respective NPS scores.
+        """
+        return self.nps_counts.group_nps()
@@ -0,0 +1,36 @@
+# tests/test_agent.py
+
+import gc
+import tracemalloc
+from simulation.agent import UserAgent
+from simulation.change import Change
+from simulation.model import UserModel
+from simulation.vectorized import VectorizedUserModel
+
+NUM_AGENTS = 5000
+
+
+def bytes_per_item(build, count=NUM_AGENTS):
+    gc.collect()
+    tracemalloc.start()
+    items = build(count)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return used / count
+
+
+def test_slots_keep_agent_fields_out_of_the_instance_dict():
+    model = UserModel(1, Change(csat_score=0.5), {}, seed=1)
+    agent = UserAgent(0, model, 0)
+    # Only Mesa's own fields remain in the __dict__ that mesa.Agent gives every agent
+    assert set(vars(agent)) == {"unique_id", "model", "pos"}
+    assert (agent.persona_index, agent.satisfaction) == (0, model.catalog.persona_satisfaction[0])
+
+
+def test_vectorized_engine_is_several_fold_smaller_per_agent():
+    mesa_bytes = bytes_per_item(lambda count: UserModel(count, Change(csat_score=0.5), {}, seed=1, agent_history="final"))
+    vectorized_bytes = bytes_per_item(
+        lambda count: VectorizedUserModel(count, Change(csat_score=0.5), {}, seed=1, agent_history="final")
+    )
+    assert vectorized_bytes * 5 < mesa_bytes
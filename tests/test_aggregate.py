@@ -0,0 +1,47 @@
+# test_aggregate.py
+
+import numpy as np
+from simulation.aggregate import AggregateUserModel
+from simulation.change import Change
+from simulation.markov import MarkovNPSModel
+from simulation.vectorized import VectorizedUserModel
+
+NUM_STEPS = 10
+INITIAL_SATISFACTION = {"Data Engineer": 9, "Data Scientist": 2, "Analytics Engineer": 10}
+
+
+def run(model_class, num_users, seed, **kwargs):
+    model = model_class(num_users, Change(csat_score=0), INITIAL_SATISFACTION, seed=seed, max_steps=NUM_STEPS, **kwargs)
+    for _ in range(NUM_STEPS):
+        model.step()
+    return model
+
+
+def test_counts_are_conserved_and_match_the_population_draw():
+    aggregate = run(AggregateUserModel, 100_000, seed=3)
+    vectorized = VectorizedUserModel(100_000, Change(csat_score=0), INITIAL_SATISFACTION, seed=3)
+    expected = np.bincount(vectorized.persona_index, minlength=len(aggregate.persona_names))
+    assert np.array_equal(aggregate.level_counts.sum(axis=1), expected)
+    assert aggregate.comments.sentiment_totals().sum() == 100_000 * NUM_STEPS
+
+
+def test_large_population_matches_expectation():
+    model = run(AggregateUserModel, 50_000_000, seed=5)
+    simulated = model.datacollector.get_model_vars_dataframe()
+    expected = MarkovNPSModel(INITIAL_SATISFACTION).expected_metrics(NUM_STEPS)
+    assert np.abs(expected.to_numpy() - simulated.to_numpy()).max() < 0.5
+
+
+def test_sampling_variance_matches_agent_simulation():
+    aggregate = [run(AggregateUserModel, 1000, seed).compute_overall_nps() for seed in range(200)]
+    vectorized = [
+        run(VectorizedUserModel, 1000, seed, comment_history="summary").compute_overall_nps() for seed in range(200)
+    ]
+    assert abs(np.mean(aggregate) - np.mean(vectorized)) < 1.0
+    assert 0.8 < np.std(aggregate) / np.std(vectorized) < 1.25
+
+
+def test_same_seed_gives_same_trajectory():
+    first = run(AggregateUserModel, 1_000_000, seed=11).datacollector.get_model_vars_dataframe()
+    second = run(AggregateUserModel, 1_000_000, seed=11).datacollector.get_model_vars_dataframe()
+    assert first.equals(second)
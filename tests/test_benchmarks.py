@@ -0,0 +1,34 @@
+# tests/test_benchmarks.py
+
+import json
+from benchmarks import suite
+from simulation.runner import Scenario
+
+ARGS = ["datacollector.collect", "collect_comments", "get_agent_vars_dataframe",
+        "--engine", "vectorized", "--sizes", "200", "--steps", "3", "--repeat", "1"]
+
+
+def test_a_saved_baseline_is_compared_against_the_next_run(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert suite.main(ARGS + ["--save", str(path)]) == 0
+    baseline = json.loads(path.read_text())
+    assert set(baseline["results"]) == {
+        suite.case_id(name, "vectorized", 200, 3) for name in ARGS[:3]
+    }
+    assert suite.main(ARGS + ["--compare", str(path), "--tolerance", "100"]) == 0
+
+    # A baseline that used a tenth of the memory makes the run a regression
+    for measurement in baseline["results"].values():
+        measurement["peak_bytes"] //= 10
+    path.write_text(json.dumps(baseline))
+    assert suite.main(ARGS + ["--compare", str(path)]) == 1
+
+
+def test_cases_that_collect_leave_the_shared_model_alone():
+    scenario = Scenario(num_users=200, num_steps=3, csat_score=0.8, seed=0, engine="vectorized")
+    shared = suite.stepped_model(scenario)
+    for name in ("datacollector.collect", "collect_comments"):
+        suite.measure(suite.CASES[name], scenario, repeat=2)
+    assert len(shared.datacollector.agent_history) == 4
+    assert len(shared.comments) == len(suite.run_scenario(scenario).comments)
+    suite._STEPPED.clear()
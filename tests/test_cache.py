@@ -0,0 +1,88 @@
+# tests/test_cache.py
+
+import os
+from dataclasses import replace
+from simulation.cache import ResultCache
+from simulation.runner import Scenario, SimulationResult, build_model, run_metrics
+
+
+def run(tmp_path, **kwargs):
+    scenario = Scenario(num_users=200, num_steps=6, csat_score=0.5, seed=1, engine="vectorized", **kwargs)
+    model = build_model(scenario)
+    model.datacollector.agent_history._spill_dir = str(tmp_path / "spill" / "live")
+    for _ in range(scenario.num_steps):
+        model.step()
+    return scenario, model
+
+
+def test_spilled_results_stay_in_memory_and_own_their_files(tmp_path):
+    scenario, model = run(tmp_path, agent_history="spill")
+    model.datacollector.agent_history._spill()
+    result = SimulationResult.from_model(scenario, model)
+    expected = result.agent_data
+    cache = ResultCache(cache_dir=str(tmp_path / "cache"))
+    cache.put(result)
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.endswith(".pkl.gz")]
+
+    # The run deletes its own files; the cache's copy is still readable
+    model.datacollector.agent_history.delete_spill()
+    result.agent_history.delete_spill()
+    cached = cache.get(scenario)
+    assert cached.agent_data.equals(expected)
+    cached.agent_history.delete_spill()
+
+    cache.clear()
+    assert os.listdir(tmp_path / "spill") == []
+    assert cache.get(scenario) is None
+
+
+def result(seed):
+    scenario = Scenario(num_users=200, num_steps=6, csat_score=0.5, seed=seed, engine="vectorized")
+    model = build_model(scenario)
+    for _ in range(scenario.num_steps):
+        model.step()
+    return SimulationResult.from_model(scenario, model)
+
+
+def test_memory_tier_evicts_the_least_recently_used_result():
+    first, second, third = result(1), result(2), result(3)
+    cache = ResultCache(max_memory_bytes=int(2.5 * first.nbytes()), cache_dir=None)
+    cache.put(first)
+    cache.put(second)
+    assert cache.get(first.scenario) is first  # Now the most recently used
+    cache.put(third)
+
+    assert cache.get(second.scenario) is None
+    assert cache.get(first.scenario) is first
+    assert cache.get(third.scenario) is third
+    assert cache.get(replace(first.scenario, seed=None)) is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_disk_tier_round_trips_results_across_instances(tmp_path):
+    original = result(5)
+    ResultCache(cache_dir=str(tmp_path)).put(original)
+
+    cache = ResultCache(cache_dir=str(tmp_path))
+    loaded = cache.get(original.scenario)
+    assert cache.disk_hits == 1
+    assert loaded is not original
+    assert loaded.model_data.equals(original.model_data)
+    assert loaded.agent_data.equals(original.agent_data)
+    assert loaded.get_comments_dataframe().equals(original.get_comments_dataframe())
+    assert cache.get(original.scenario) is loaded  # Served from memory after the first read
+    assert cache.hits == 1
+
+
+def test_metrics_are_cached_apart_from_results(tmp_path):
+    original = result(6)
+    metrics = run_metrics(original.scenario)
+    cache = ResultCache(cache_dir=str(tmp_path))
+    cache.put(original)
+    assert cache.get_metrics(original.scenario) is None
+    cache.put_metrics(original.scenario, metrics)
+
+    cached = cache.get_metrics(original.scenario)
+    assert cached.equals(metrics) and cached is not metrics
+    assert ResultCache(cache_dir=str(tmp_path)).get_metrics(original.scenario).equals(metrics)
+    assert cache.get(original.scenario) is original
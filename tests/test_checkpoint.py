@@ -0,0 +1,84 @@
+# test_checkpoint.py
+
+import io
+import numpy as np
+import pytest
+from simulation.change import Change
+from simulation.checkpoint import Checkpoint
+from simulation.mappings import nps_categories
+from simulation.runner import Scenario, SimulationResult, build_model
+from simulation.sharded import SHARED_ARRAYS
+
+PREFIX_STEPS = 5
+BRANCH_STEPS = 7
+
+
+def scenario(engine, **kwargs):
+    return Scenario(num_users=2000, num_steps=PREFIX_STEPS + BRANCH_STEPS, csat_score=0.5, seed=4, engine=engine, **kwargs)
+
+
+def stepped(model, num_steps):
+    for _ in range(num_steps):
+        model.step()
+    return model
+
+
+@pytest.mark.parametrize("engine", ["mesa", "vectorized", "sharded", "aggregate"])
+@pytest.mark.parametrize("comment_history", ["full", "summary"])
+def test_resumed_run_matches_uninterrupted_run(engine, comment_history):
+    base = scenario(engine, comment_history=comment_history)
+    model = stepped(build_model(base), PREFIX_STEPS)
+    checkpoint = Checkpoint.from_model(base, model)
+    uninterrupted = SimulationResult.from_model(base, stepped(model, BRANCH_STEPS))
+
+    file = io.BytesIO()
+    checkpoint.save(file)
+    file.seek(0)
+    branch_scenario, branch = Checkpoint.load(file).restore()
+    resumed = SimulationResult.from_model(branch_scenario, stepped(branch, BRANCH_STEPS))
+
+    assert resumed.model_data.equals(uninterrupted.model_data)
+    assert resumed.agent_data.equals(uninterrupted.agent_data)
+    assert resumed.get_comments_dataframe().equals(uninterrupted.get_comments_dataframe())
+    assert resumed.comments.sentiment_counts().equals(uninterrupted.comments.sentiment_counts())
+    assert np.array_equal(resumed.persona_counts.counts(), uninterrupted.persona_counts.counts())
+
+
+def test_restored_sharded_model_keeps_its_state_in_shared_memory():
+    base = scenario("sharded")
+    model = stepped(build_model(base), PREFIX_STEPS)
+    checkpoint = Checkpoint.from_model(base, model)
+    model.close()
+    _, branch = checkpoint.restore()
+    stepped(branch, BRANCH_STEPS)
+
+    for key in SHARED_ARRAYS:
+        assert np.shares_memory(getattr(branch, key), branch._arrays[key]), key
+    assert np.array_equal(branch.nps_category, nps_categories(branch.nps))
+    branch.close()
+    assert np.array_equal(branch.nps_category, nps_categories(branch.nps))
+
+
+def test_forks_share_the_prefix_history():
+    base = scenario("vectorized")
+    checkpoint = Checkpoint.from_model(base, stepped(build_model(base), PREFIX_STEPS))
+    (first_scenario, first), (second_scenario, second) = checkpoint.fork([Change(csat_score=0.2), Change(csat_score=0.9)])
+    stepped(first, BRANCH_STEPS)
+    stepped(second, BRANCH_STEPS)
+
+    assert (first_scenario.csat_score, second_scenario.csat_score) == (0.2, 0.9)
+    assert first.change.csat_score == 0.2
+    first_history, second_history = first.datacollector.agent_history, second.datacollector.agent_history
+    assert np.shares_memory(first_history._prefix_nps, second_history._prefix_nps)
+    assert np.shares_memory(first.comments._prefix["agent_id"], second.comments._prefix["agent_id"])
+    assert not np.shares_memory(first.satisfaction, second.satisfaction)
+    assert len(first_history) == PREFIX_STEPS + BRANCH_STEPS + 1
+
+
+def test_spilled_history_is_rejected(tmp_path):
+    base = scenario("vectorized", agent_history="spill")
+    model = build_model(base)
+    model.datacollector.agent_history._spill_dir = str(tmp_path / "spill")
+    model.datacollector.agent_history._spill()
+    with pytest.raises(ValueError):
+        Checkpoint.from_model(base, model)
@@ -0,0 +1,54 @@
+# tests/test_cli.py
+
+import json
+import pyarrow as pa
+import pytest
+from simulation.cli import load_scenarios, main
+from simulation.export import EXPORT_TABLES
+
+SPEC = {
+    "defaults": {"num_steps": 4, "csat_score": 0.6, "engine": "vectorized"},
+    "scenarios": [
+        {"name": "baseline", "num_users": 100, "seeds": [1, 2]},
+        {"name": "unhappy", "num_users": 50, "seed": 9, "initial_satisfaction": {"Data Engineer": 2}}
+    ]
+}
+
+
+def write_spec(tmp_path, spec):
+    path = tmp_path / "scenarios.json"
+    path.write_text(json.dumps(spec))
+    return str(path)
+
+
+def test_load_scenarios_expands_seeds_and_applies_defaults(tmp_path):
+    runs = load_scenarios(write_spec(tmp_path, SPEC))
+    assert [(name, scenario.seed) for name, scenario in runs] == [("baseline", 1), ("baseline", 2), ("unhappy", 9)]
+    assert all(scenario.num_steps == 4 and scenario.engine == "vectorized" for _, scenario in runs)
+    assert runs[2][1].initial_satisfaction["Data Engineer"] == 2
+
+
+def test_main_writes_one_directory_per_scenario_and_seed(tmp_path, capsys):
+    output = tmp_path / "results"
+    assert main([write_spec(tmp_path, SPEC), "-o", str(output), "-f", "arrow"]) == 0
+
+    for name, num_users in (("baseline/seed-1", 100), ("baseline/seed-2", 100), ("unhappy/seed-9", 50)):
+        run_dir = output / name
+        assert sorted(path.name for path in run_dir.iterdir()) == sorted(
+            [table + ".arrow" for table in EXPORT_TABLES] + ["scenario.json"]
+        )
+        with pa.memory_map(str(run_dir / "agent_data.arrow")) as file:
+            assert pa.ipc.open_file(file).read_all().num_rows == num_users * 5
+        assert json.loads((run_dir / "scenario.json").read_text())["num_users"] == num_users
+    lines = capsys.readouterr().err.splitlines()
+    assert [line.split(":")[0] for line in lines] == ["baseline (seed 1)", "baseline (seed 2)", "unhappy (seed 9)"]
+    assert lines[2].endswith(str(output / "unhappy" / "seed-9"))
+
+
+@pytest.mark.parametrize("entry", [{"num_user": 10}, {"engine": "quantum"}, {"initial_satisfaction": {"Nobody": 3}}])
+def test_main_rejects_invalid_scenarios(tmp_path, capsys, entry):
+    with pytest.raises(SystemExit) as error:
+        main([write_spec(tmp_path, [entry]), "-o", str(tmp_path / "results")])
+    assert error.value.code == 2
+    assert "scenario-0" in capsys.readouterr().err
+    assert not (tmp_path / "results").exists()
@@ -0,0 +1,44 @@
+# tests/test_comments.py
+
+import numpy as np
+from simulation.comments import CommentLog
+
+STEPS = 40
+ROWS_PER_STEP = 250
+SAMPLE_SIZE = 100
+
+
+def summary_log(seed, append_summary=False):
+    log = CommentLog(["Group"], ["A", "B"], [0, 0], summary_only=True, sample_size=SAMPLE_SIZE, seed=seed)
+    for step in range(STEPS):
+        agent_ids = np.arange(step * ROWS_PER_STEP, (step + 1) * ROWS_PER_STEP)
+        personas = agent_ids % 2
+        sentiments = agent_ids % 3
+        if append_summary:
+            counts = np.bincount(personas * 3 + sentiments, minlength=6)
+            log.append_summary(counts, ROWS_PER_STEP, agent_ids, personas, sentiments)
+        else:
+            log.append(agent_ids, personas, sentiments)
+    return log
+
+
+def test_reservoir_sample_holds_distinct_rows_and_exact_counts():
+    for append_summary in (False, True):
+        log = summary_log(seed=1, append_summary=append_summary)
+        sample = log.to_dataframe()
+        assert len(log) == STEPS * ROWS_PER_STEP
+        assert len(sample) == SAMPLE_SIZE
+        assert sample["agent_id"].is_unique
+        # Every sampled row keeps the persona and sentiment it was appended with
+        assert (sample["persona"].cat.codes == sample["agent_id"] % 2).all()
+        assert (sample["sentiment"].cat.codes == sample["agent_id"] % 3).all()
+        assert log.sentiment_totals().sum() == STEPS * ROWS_PER_STEP
+
+
+def test_reservoir_sample_is_uniform_over_all_rows():
+    total = STEPS * ROWS_PER_STEP
+    samples = np.stack([summary_log(seed).to_dataframe()["agent_id"].to_numpy() for seed in range(200)])
+    # Each row is kept with probability SAMPLE_SIZE / total, wherever it was appended
+    assert abs((samples < total // 2).mean() - 0.5) < 0.02
+    assert abs((samples < ROWS_PER_STEP).mean() - ROWS_PER_STEP / total) < 0.01
+    assert abs((samples >= total - ROWS_PER_STEP).mean() - ROWS_PER_STEP / total) < 0.01
@@ -0,0 +1,28 @@
+# tests/test_downsample.py
+
+import numpy as np
+import pytest
+from visualization.downsample import lttb_indices
+
+
+@pytest.mark.parametrize("threshold", [3, 10, 250])
+def test_lttb_keeps_the_endpoints_and_returns_sorted_unique_indices(threshold):
+    x = np.arange(5000)
+    y = np.random.default_rng(0).normal(size=5000).cumsum()
+    indices = lttb_indices(x, y, threshold)
+
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_keeps_a_spike_that_striding_drops():
+    y = np.zeros(1001)
+    y[537] = 100.0
+    assert 537 in lttb_indices(np.arange(1001), y, 50)
+    assert 537 not in np.linspace(0, 1000, 50).astype(int)
+
+
+@pytest.mark.parametrize("threshold", [2, 20, 100])
+def test_lttb_keeps_every_point_of_a_short_series_or_a_degenerate_threshold(threshold):
+    assert lttb_indices(np.arange(20), np.arange(20.0), threshold).tolist() == list(range(20))
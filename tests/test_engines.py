@@ -0,0 +1,39 @@
+# tests/test_engines.py
+
+import pytest
+from simulation.runner import Scenario, SimulationResult, run_scenario
+
+
+def result(engine, **kwargs):
+    scenario = Scenario(num_users=300, num_steps=8, csat_score=0.4, seed=7, engine=engine, **kwargs)
+    return SimulationResult.from_model(scenario, run_scenario(scenario))
+
+
+@pytest.mark.parametrize("comment_history", ["full", "summary"])
+def test_mesa_and_vectorized_engines_give_identical_results(comment_history):
+    mesa = result("mesa", comment_history=comment_history)
+    vectorized = result("vectorized", comment_history=comment_history)
+
+    assert mesa.model_data.equals(vectorized.model_data)
+    assert mesa.agent_data.equals(vectorized.agent_data)
+    assert mesa.get_comments_dataframe().equals(vectorized.get_comments_dataframe())
+    assert len(mesa.model_data) == 9
+    assert len(mesa.agent_data) == 300 * 9
+
+
+@pytest.mark.parametrize("engine", ["mesa", "vectorized"])
+def test_incremental_metrics_match_a_full_scan_of_the_ratings(engine):
+    run = result(engine)
+    ratings = run.agent_data["NPS Rating"]
+    promoters = (ratings >= 9).groupby(level="Step").mean() * 100
+    detractors = (ratings <= 6).groupby(level="Step").mean() * 100
+    keys = [run.agent_data.index.get_level_values("Step"), run.agent_data["Group"]]
+    group_promoters = (ratings >= 9).groupby(keys, observed=True).mean() * 100
+    group_detractors = (ratings <= 6).groupby(keys, observed=True).mean() * 100
+    group_nps = (group_promoters - group_detractors).unstack()
+
+    assert run.model_data["Promoters %"].to_numpy() == pytest.approx(promoters.to_numpy())
+    assert run.model_data["Detractors %"].to_numpy() == pytest.approx(detractors.to_numpy())
+    assert run.model_data["Overall NPS"].to_numpy() == pytest.approx((promoters - detractors).to_numpy())
+    for group in group_nps.columns:
+        assert run.model_data[f"{group} NPS"].to_numpy() == pytest.approx(group_nps[group].to_numpy())
@@ -0,0 +1,26 @@
+# tests/test_ensemble.py
+
+from simulation.ensemble import replicate_seeds, run_ensemble
+from simulation.runner import NPS_METRICS, Scenario, run_metrics
+
+SCENARIO = Scenario(num_users=200, num_steps=6, csat_score=0.5, seed=11, engine="vectorized")
+
+
+def test_ensemble_has_a_band_per_metric_and_step():
+    bands = run_ensemble(SCENARIO, replicates=4, max_workers=2)
+    metrics = list(run_metrics(SCENARIO).columns)
+    assert metrics[:len(NPS_METRICS)] == NPS_METRICS
+
+    assert bands.index.name == "Step"
+    assert list(bands.index) == list(range(SCENARIO.num_steps + 1))
+    assert list(bands.columns.get_level_values(0).unique()) == metrics
+    assert list(bands.columns) == [(metric, statistic) for metric in metrics for statistic in ("mean", "lower", "upper")]
+    for metric in metrics:
+        assert (bands[(metric, "lower")] <= bands[(metric, "mean")]).all()
+        assert (bands[(metric, "mean")] <= bands[(metric, "upper")]).all()
+    assert bands.attrs == {"replicates": 4, "percentiles": (5, 95)}
+
+
+def test_ensemble_is_reproducible_for_any_pool_size():
+    assert run_ensemble(SCENARIO, replicates=3, max_workers=1).equals(run_ensemble(SCENARIO, replicates=3, max_workers=2))
+    assert len(set(replicate_seeds(SCENARIO.seed, 3))) == 3
@@ -0,0 +1,117 @@
+# test_export.py
+
+import json
+import os
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from simulation.cli import run_to_files
+from simulation.export import EXPORT_TABLES, RunExporter, TableWriter, export_result, prune_exports
+from simulation.runner import Scenario, SimulationResult, build_model
+
+NUM_USERS = 300
+
+
+def scenario(engine="vectorized", **kwargs):
+    return Scenario(num_users=NUM_USERS, num_steps=12, csat_score=0.4, seed=3, engine=engine, **kwargs)
+
+
+def read(path):
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    with pa.memory_map(path) as file:
+        return pa.ipc.open_file(file).read_all()
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+@pytest.mark.parametrize("engine,comment_history", [("mesa", "full"), ("vectorized", "summary"), ("aggregate", "summary")])
+def test_streamed_export_matches_export_of_the_result(tmp_path, output_format, engine, comment_history):
+    base = scenario(engine, comment_history=comment_history, agent_history="spill")
+    model = build_model(base)
+    model.datacollector.agent_history._spill_dir = str(tmp_path / "spill")
+    exporter = RunExporter(str(tmp_path / "streamed"), output_format, chunk_rows=500)
+    exporter.attach(model)
+    for _ in range(5):
+        model.step()
+    # Flushing part way, as a stopped run does, leaves the files open for the next steps
+    exporter.flush()
+    assert not (tmp_path / "streamed" / ("model_data" + ("." + output_format))).exists()
+    for _ in range(7):
+        model.step()
+    streamed = exporter.close(base)
+    exported = export_result(SimulationResult.from_model(base, model), str(tmp_path / "exported"), output_format)
+
+    assert set(streamed) == set(exported) == set(EXPORT_TABLES)
+    for name in EXPORT_TABLES:
+        assert read(streamed[name]).equals(read(exported[name])), name
+    assert read(streamed["model_data"])["Step"].to_pylist() == list(range(13))
+
+
+def test_final_retention_still_exports_every_step(tmp_path):
+    model = build_model(scenario(agent_history="final", comment_history="full"))
+    exporter = RunExporter(str(tmp_path), chunk_rows=1000)
+    exporter.attach(model)
+    for _ in range(12):
+        model.step()
+    paths = exporter.close()
+
+    agent_data = pq.read_table(paths["agent_data"])
+    assert len(model.datacollector.agent_history) == 1
+    assert agent_data.num_rows == NUM_USERS * 13
+    metadata = pq.ParquetFile(paths["agent_data"]).metadata
+    assert max(metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)) <= 1000
+    comments = pq.read_table(paths["comments"])
+    assert comments["step"].to_pylist() == [step for step in range(1, 13) for _ in range(NUM_USERS)]
+
+
+def test_table_writer_only_publishes_finished_files(tmp_path):
+    path = str(tmp_path / "table.parquet")
+    writer = TableWriter(path, chunk_rows=2)
+    writer.write(pa.table({"x": [1, 2, 3]}))
+    assert not (tmp_path / "table.parquet").exists()
+    writer.write(pa.table({"x": [4]}))
+    writer.close()
+    assert pq.read_table(path)["x"].to_pylist() == [1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        writer.write(pa.table({"x": [5]}))
+    with pytest.raises(ValueError):
+        TableWriter(path, "csv")
+
+
+def test_closed_exporter_detaches_and_discard_removes_the_export(tmp_path):
+    model = build_model(scenario())
+    exporter = RunExporter(str(tmp_path / "closed"))
+    exporter.attach(model)
+    model.step()
+    exporter.close()
+    model.step()
+    assert model.datacollector.listeners == []
+    with pytest.raises(ValueError):
+        exporter.sync(model)
+
+    exporter = RunExporter(str(tmp_path / "discarded"))
+    exporter.attach(model)
+    model.step()
+    exporter.discard()
+    model.step()
+    assert model.datacollector.listeners == []
+    assert not (tmp_path / "discarded").exists()
+
+
+def test_prune_exports_removes_only_stale_exports(tmp_path):
+    for name in ("stale", "fresh"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "model_data.parquet").write_bytes(b"")
+    old = time.time() - 7200
+    for path in (tmp_path / "stale", tmp_path / "stale" / "model_data.parquet"):
+        os.utime(path, (old, old))
+    assert prune_exports(str(tmp_path), max_age=3600) == [str(tmp_path / "stale")]
+    assert sorted(os.listdir(tmp_path)) == ["fresh"]
+
+
+def test_cli_writes_every_table_and_the_scenario(tmp_path):
+    paths = run_to_files(scenario(agent_history="spill"), str(tmp_path), "arrow")
+    assert set(paths) == set(EXPORT_TABLES)
+    assert read(paths["agent_data"]).num_rows == NUM_USERS * 13
+    assert json.loads((tmp_path / "scenario.json").read_text())["num_users"] == NUM_USERS
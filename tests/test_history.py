@@ -0,0 +1,93 @@
+# tests/test_history.py
+
+import gc
+import pickle
+import numpy as np
+import pytest
+from simulation.collection import AgentHistory
+from simulation.runner import Scenario, SimulationResult, run_scenario
+
+NUM_USERS = 200
+NUM_STEPS = 12
+
+
+def agent_data(**kwargs):
+    scenario = Scenario(num_users=NUM_USERS, num_steps=NUM_STEPS, csat_score=0.5, seed=4, engine="vectorized", **kwargs)
+    return SimulationResult.from_model(scenario, run_scenario(scenario)).agent_data
+
+
+@pytest.fixture(scope="module")
+def full():
+    return agent_data(agent_history="full")
+
+
+def steps_of(data):
+    return sorted(set(data.index.get_level_values("Step")))
+
+
+def test_full_keeps_every_agent_at_every_step(full):
+    assert steps_of(full) == list(range(NUM_STEPS + 1))
+    assert len(full) == NUM_USERS * (NUM_STEPS + 1)
+
+
+def test_final_keeps_only_the_last_step(full):
+    data = agent_data(agent_history="final")
+    assert steps_of(data) == [NUM_STEPS]
+    assert data.equals(full.loc[[NUM_STEPS]])
+
+
+def test_every_keeps_the_multiples_of_its_interval(full):
+    data = agent_data(agent_history="every", agent_history_every=5)
+    assert steps_of(data) == [0, 5, 10]
+    assert data.equals(full.loc[[0, 5, 10]])
+
+
+def test_sample_keeps_every_step_of_a_fixed_set_of_agents(full):
+    data = agent_data(agent_history="sample", agent_history_sample=50)
+    agents = data.index.get_level_values("AgentID")
+    assert steps_of(data) == list(range(NUM_STEPS + 1))
+    assert len(data) == 50 * (NUM_STEPS + 1)
+    assert len(set(agents)) == 50
+    assert data.equals(full[full.index.get_level_values("AgentID").isin(set(agents))])
+
+
+def test_spill_keeps_every_step_with_one_chunk_in_memory(tmp_path):
+    rng = np.random.default_rng(0)
+    ratings = rng.integers(0, 11, size=(NUM_STEPS + 1, NUM_USERS), dtype=np.int8)
+    histories = {}
+    for retention in ("full", "spill"):
+        history = AgentHistory(
+            np.arange(NUM_USERS), np.zeros(NUM_USERS), np.arange(NUM_USERS) % 3, ["Group"], ["A", "B", "C"],
+            retention=retention, spill_dir=str(tmp_path), chunk_steps=4
+        )
+        for step, nps in enumerate(ratings):
+            history.record(step, nps)
+        histories[retention] = history
+
+    spill = histories["spill"]
+    assert spill.spilled()
+    assert len(spill) == NUM_STEPS + 1
+    assert len(spill.steps()) <= 4
+    assert spill.to_dataframe().equals(histories["full"].to_dataframe())
+    spill.delete_spill()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_frames_share_their_index_and_codes_until_released():
+    scenario = Scenario(num_users=NUM_USERS, num_steps=NUM_STEPS, csat_score=0.5, seed=4, engine="vectorized")
+    history = run_scenario(scenario).datacollector.agent_history
+    first, second = history.to_dataframe(), history.to_dataframe()
+
+    assert [codes.dtype for codes in first.index.codes] == [np.int8, np.int16]
+    for name in ("Group", "Persona"):
+        assert first[name].array.codes.dtype == np.int8
+        assert np.shares_memory(first[name].array.codes, second[name].array.codes)
+    for level in range(2):
+        assert np.shares_memory(first.index.codes[level], second.index.codes[level])
+    table = history.to_arrow()
+    assert np.shares_memory(table["AgentID"].to_numpy(), history.to_arrow()["AgentID"].to_numpy())
+    assert pickle.loads(pickle.dumps(history)).to_dataframe().equals(first)
+
+    del first, second, table
+    gc.collect()
+    assert len(history._per_row_arrays) == 0
@@ -0,0 +1,79 @@
+# test_markov.py
+
+import numpy as np
+import pytest
+from simulation.change import Change
+from simulation.markov import MarkovNPSModel, transition_matrix
+from simulation.mappings import SENTIMENTS
+from simulation.personas import CATALOG
+from simulation.vectorized import VectorizedUserModel
+
+NUM_USERS = 200_000
+NUM_STEPS = 20
+INITIAL_SATISFACTION = {"Data Engineer": 9, "Data Scientist": 2, "Analytics Engineer": 10}
+
+# Tolerances in NPS points; about six standard errors at NUM_USERS agents
+OVERALL_TOLERANCE = 1.5
+GROUP_TOLERANCE = 3.0
+PERSONA_TOLERANCE = 6.0
+
+
+@pytest.fixture(scope="module")
+def simulated():
+    model = VectorizedUserModel(NUM_USERS, Change(csat_score=0), INITIAL_SATISFACTION, seed=7, max_steps=NUM_STEPS,
+                                comment_history="summary")
+    for _ in range(NUM_STEPS):
+        model.step()
+    return model
+
+
+def test_transition_matrix_is_clamped_random_walk():
+    matrix = transition_matrix()
+    assert np.allclose(matrix.sum(axis=1), 1.0)
+    assert matrix[0, 0] == pytest.approx(2 / 3)
+    assert matrix[-1, -1] == pytest.approx(2 / 3)
+    assert matrix[5, 4] == matrix[5, 5] == matrix[5, 6] == pytest.approx(1 / 3)
+    assert np.count_nonzero(matrix[5]) == 3
+
+
+def test_expected_metrics_match_simulation(simulated):
+    simulated_data = simulated.datacollector.get_model_vars_dataframe()
+    expected = MarkovNPSModel(INITIAL_SATISFACTION).expected_metrics(NUM_STEPS)
+    assert list(expected.columns) == list(simulated_data.columns)
+    assert len(expected) == len(simulated_data)
+
+    overall = ["Overall NPS", "Promoters %", "Passives %", "Detractors %"]
+    groups = [column for column in expected.columns if column not in overall]
+    assert np.abs(expected[overall].to_numpy() - simulated_data[overall].to_numpy()).max() < OVERALL_TOLERANCE
+    assert np.abs(expected[groups].to_numpy() - simulated_data[groups].to_numpy()).max() < GROUP_TOLERANCE
+
+
+def test_persona_nps_matches_simulation(simulated):
+    simulated_nps = simulated.datacollector.persona_history.persona_nps_over_time()
+    expected = MarkovNPSModel(INITIAL_SATISFACTION).expected_persona_nps(NUM_STEPS)
+    expected = expected[simulated_nps.columns]
+    assert np.abs(expected.to_numpy() - simulated_nps.to_numpy()).max() < PERSONA_TOLERANCE
+
+
+def test_sentiment_shares_match_simulation(simulated):
+    expected = MarkovNPSModel(INITIAL_SATISFACTION).expected_sentiment_shares(NUM_STEPS)
+    final = np.bincount(simulated.sentiment, minlength=len(SENTIMENTS)) / NUM_USERS * 100
+    assert np.abs(expected.iloc[-1].to_numpy() - final).max() < OVERALL_TOLERANCE
+
+
+def test_persona_counts_give_exact_initial_step():
+    counts = {name: 0 for name in CATALOG.persona_names}
+    counts[CATALOG.persona_names[0]] = 300
+    counts[CATALOG.persona_names[-1]] = 100
+    mix = {"persona_counts": counts}
+    model = VectorizedUserModel(400, Change(csat_score=0), INITIAL_SATISFACTION, seed=1, population_mix=mix)
+    simulated_data = model.datacollector.get_model_vars_dataframe()
+    expected = MarkovNPSModel(INITIAL_SATISFACTION, population_mix=mix).expected_metrics(0)
+    assert np.allclose(expected.to_numpy(), simulated_data.to_numpy())
+
+
+def test_group_weights_are_respected():
+    group = CATALOG.group_names[0]
+    mix = {"group_weights": {name: float(name == group) for name in CATALOG.group_names}}
+    expected = MarkovNPSModel(INITIAL_SATISFACTION, population_mix=mix).expected_metrics(NUM_STEPS)
+    assert np.allclose(expected["Overall NPS"], expected[f"{group} NPS"])
@@ -0,0 +1,72 @@
+# tests/test_persona_counts.py
+
+import numpy as np
+import pytest
+from simulation.mappings import CATEGORY_BY_SATISFACTION, NPS_CATEGORIES, nps_categories
+from simulation.personas import CATALOG
+from simulation.runner import Scenario, SimulationResult, group_nps_columns, run_scenario
+
+NUM_USERS = 300
+NUM_STEPS = 6
+
+
+def run(engine):
+    scenario = Scenario(num_users=NUM_USERS, num_steps=NUM_STEPS, csat_score=0.4, seed=7, engine=engine)
+    model = run_scenario(scenario)
+    return model, SimulationResult.from_model(scenario, model)
+
+
+def cube_of_ratings(agent_data):
+    """
+    Counts the agent-level ratings by (step, persona, NPS category) with a group-by.
+    """
+    categories = nps_categories(agent_data["NPS Rating"].to_numpy())
+    sizes = agent_data.groupby(
+        [agent_data.index.get_level_values("Step"), agent_data["Persona"].cat.codes.to_numpy(), categories]
+    ).size()
+    cube = np.zeros((NUM_STEPS + 1, len(CATALOG.persona_names), len(NPS_CATEGORIES)), dtype=np.int64)
+    cube[tuple(np.array(sizes.index.tolist()).T)] = sizes.to_numpy()
+    return cube
+
+
+@pytest.mark.parametrize("engine", ["mesa", "vectorized", "sharded"])
+def test_counts_match_a_group_by_of_the_agent_ratings(engine):
+    model, result = run(engine)
+    model.close()
+    assert list(result.persona_counts.steps()) == list(range(NUM_STEPS + 1))
+    assert np.array_equal(result.persona_counts.counts(), cube_of_ratings(result.agent_data))
+
+
+def test_aggregate_counts_match_its_levels_and_metrics():
+    model, result = run("aggregate")
+    counts = result.persona_counts.counts()
+    assert (counts.sum(axis=2) == counts[0].sum(axis=1)).all()  # Nobody joins or leaves a persona
+    assert counts[0].sum() == NUM_USERS
+
+    final = np.zeros_like(counts[-1])
+    for level, category in enumerate(CATEGORY_BY_SATISFACTION):
+        final[:, category] += model.level_counts[:, level]
+    assert np.array_equal(counts[-1], final)
+
+    totals = counts.sum(axis=1)
+    shares = totals / NUM_USERS * 100
+    for category, name in enumerate(NPS_CATEGORIES):
+        assert result.model_data[f"{name} %"].to_numpy() == pytest.approx(shares[:, category])
+    groups = np.asarray(CATALOG.persona_groups)
+    for group, column in enumerate(group_nps_columns(result.model_data)):
+        group_counts = counts[:, groups == group].sum(axis=1)
+        nps = (group_counts[:, 0] - group_counts[:, 2]) / group_counts.sum(axis=1) * 100
+        assert result.model_data[column].to_numpy() == pytest.approx(nps)
+
+
+def test_every_engine_produces_the_same_cube():
+    cubes = {}
+    for engine in ("mesa", "vectorized", "sharded", "aggregate"):
+        model, result = run(engine)
+        model.close()
+        cubes[engine] = result.persona_counts.counts()
+    # The agent-level engines share one random path, so their cubes agree at every step
+    assert np.array_equal(cubes["mesa"], cubes["vectorized"])
+    assert np.array_equal(cubes["mesa"], cubes["sharded"])
+    # The aggregate engine draws the same population, then steps counts instead of agents
+    assert np.array_equal(cubes["aggregate"][0], cubes["mesa"][0])
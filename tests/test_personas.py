@@ -0,0 +1,65 @@
+# test_personas.py
+
+import json
+import pytest
+from simulation.personas import CATALOG, DEFAULT_PERSONAS_PATH, PersonaCatalog, load_personas, validate_personas
+
+
+def catalog_definition(num_groups=3, personas_per_group=4):
+    return {
+        f"Group {group}": {
+            "role": f"Role {group}",
+            "personas": [
+                {"name": f"Persona {group}-{index}", "age": 30, "experience": "1 year",
+                 "attributes": {"satisfaction": index % 11, "nps": 10 - index % 11}}
+                for index in range(personas_per_group)
+            ]
+        }
+        for group in range(num_groups)
+    }
+
+
+def test_default_catalog_is_loaded_from_file():
+    assert CATALOG == PersonaCatalog.from_file(DEFAULT_PERSONAS_PATH)
+    assert CATALOG.group_of("Data Engineer") == "Data Expert"
+
+
+def test_json_and_yaml_give_the_same_catalog(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    definition = catalog_definition()
+    (tmp_path / "personas.json").write_text(json.dumps(definition))
+    (tmp_path / "personas.yaml").write_text(yaml.safe_dump(definition, sort_keys=False))
+    from_json = PersonaCatalog.from_file(str(tmp_path / "personas.json"))
+    from_yaml = PersonaCatalog.from_file(str(tmp_path / "personas.yaml"))
+    assert from_json == from_yaml
+    assert from_json.persona_ids["Persona 2-3"] == 11
+    assert from_json.group_personas[1] == (4, 5, 6, 7)
+
+
+def test_invalid_catalogs_are_rejected(tmp_path):
+    definition = catalog_definition()
+    definition["Group 1"]["personas"][0]["name"] = "Persona 0-0"
+    definition["Group 2"]["personas"][0]["attributes"]["satisfaction"] = 11
+    with pytest.raises(ValueError, match="appears in both.*satisfaction 11"):
+        validate_personas(definition)
+    path = tmp_path / "empty.json"
+    path.write_text(json.dumps({"Group": {"role": "Role", "personas": []}}))
+    with pytest.raises(ValueError):
+        load_personas(str(path))
+
+
+def test_satisfaction_overrides():
+    catalog = PersonaCatalog.from_dict(catalog_definition())
+    # Defaults are 0, 1, 2 and 3 in every group
+    overrides = catalog.satisfaction_overrides(shift=-1, group_shifts={"Group 1": 2}, persona_levels={"Persona 2-3": 3})
+    assert overrides == {
+        "Persona 0-1": 0, "Persona 0-2": 1, "Persona 0-3": 2,
+        "Persona 1-0": 1, "Persona 1-1": 2, "Persona 1-2": 3, "Persona 1-3": 4,
+        "Persona 2-1": 0, "Persona 2-2": 1
+    }
+    assert catalog.satisfaction_overrides() == {}
+    with pytest.raises(ValueError):
+        catalog.satisfaction_overrides(group_shifts={"Unknown": 1})
+    for level in (11, -1, 2.5, True):
+        with pytest.raises(ValueError, match="integers from 0 to 10"):
+            catalog.satisfaction_overrides(persona_levels={"Persona 0-1": level})
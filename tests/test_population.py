@@ -0,0 +1,72 @@
+# tests/test_population.py
+
+import numpy as np
+import pytest
+from simulation.personas import CATALOG
+from simulation.population import assign_personas, persona_counts, persona_probabilities
+
+NUM_USERS = 200_000
+GROUPS = np.asarray(CATALOG.persona_groups)
+
+
+def shares(mix, num_users=NUM_USERS, seed=0):
+    persona_index = assign_personas(CATALOG, num_users, mix, np.random.default_rng(seed))
+    assert len(persona_index) == num_users
+    return np.bincount(persona_index, minlength=len(CATALOG.persona_names)) / num_users
+
+
+def test_no_mix_draws_groups_then_personas_uniformly():
+    persona_shares = shares(None)
+    group_shares = np.bincount(GROUPS, weights=persona_shares)
+    assert group_shares == pytest.approx(np.full(len(CATALOG.group_names), 1 / len(CATALOG.group_names)), abs=0.005)
+    # Within a group, personas are equally likely
+    expected = 1 / len(CATALOG.group_names) / np.bincount(GROUPS)[GROUPS]
+    assert persona_shares == pytest.approx(expected, abs=0.005)
+
+
+def test_group_weights_set_group_shares():
+    mix = {"group_weights": {"Business Specialist": 0, "Data Expert": 3}}
+    group_shares = np.bincount(GROUPS, weights=shares(mix))
+    assert group_shares == pytest.approx([0, 0.2, 0.6, 0.2], abs=0.005)
+
+
+def test_persona_weights_split_their_group():
+    mix = {"persona_weights": {"Operational Worker": 2, "Business Manager": 1, "Company Executive": 0}}
+    persona_shares = shares(mix)
+    names = CATALOG.persona_names
+    assert persona_shares[names.index("Operational Worker")] == pytest.approx(0.25 * 2 / 3, abs=0.005)
+    assert persona_shares[names.index("Business Manager")] == pytest.approx(0.25 / 3, abs=0.005)
+    assert persona_shares[names.index("Company Executive")] == 0
+    assert persona_probabilities(CATALOG, persona_weights=mix["persona_weights"]).sum() == pytest.approx(1)
+
+
+def test_persona_counts_are_exact():
+    counts = {"Data Engineer": 7, "DataOps": 2, "Business Analyst": 1}
+    persona_index = assign_personas(CATALOG, 10, {"persona_counts": counts}, np.random.default_rng(0))
+    assert {CATALOG.persona_names[i]: n for i, n in enumerate(np.bincount(persona_index)) if n} == counts
+
+    drawn = persona_counts(CATALOG, 1001, {"group_weights": {"System Expert": 2}}, np.random.default_rng(1))
+    assert drawn.sum() == 1001
+
+
+@pytest.mark.parametrize("mix, message", [
+    ({"weights": {}}, "Unknown population mix keys"),
+    ({"persona_counts": {"Data Engineer": 5}, "group_weights": {}}, "either persona counts or weights"),
+    ({"group_weights": {"Nobody": 1}}, "Unknown names in group_weights"),
+    ({"persona_weights": {"Data Engineer": -1}}, "must not be negative"),
+    ({"persona_counts": {"Data Engineer": -5}}, "must not be negative"),
+    ({"group_weights": {name: 0 for name in CATALOG.group_names}}, "At least one group needs a positive weight"),
+    ({"persona_weights": {"Operational Worker": 0, "Business Manager": 0, "Company Executive": 0}},
+     "needs a persona with a positive weight"),
+    ({"persona_counts": {"Data Engineer": 5}}, "add up to 5, not to the 10 users")
+])
+def test_invalid_mixes_are_rejected(mix, message):
+    with pytest.raises(ValueError, match=message):
+        assign_personas(CATALOG, 10, mix, np.random.default_rng(0))
+
+
+def test_same_seed_gives_same_personas():
+    mix = {"group_weights": {"Data Expert": 2}}
+    first = assign_personas(CATALOG, 1000, mix, np.random.default_rng(5))
+    assert np.array_equal(first, assign_personas(CATALOG, 1000, mix, np.random.default_rng(5)))
+    assert not np.array_equal(first, assign_personas(CATALOG, 1000, mix, np.random.default_rng(6)))
@@ -0,0 +1,74 @@
+# tests/test_profiling.py
+
+import json
+from types import SimpleNamespace
+import pytest
+from simulation import profiling
+from simulation.profiling import PhaseTimer
+from simulation.runner import Scenario, build_model
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces the timer's clock with one that only moves when advanced.
+    """
+    now = [0.0]
+    monkeypatch.setattr(profiling, "time", SimpleNamespace(perf_counter=lambda: now[0]))
+    return now
+
+
+def test_phases_nest_and_accumulate_calls_and_time(clock):
+    timer = PhaseTimer()
+    for _ in range(2):
+        with timer.phase("simulation"):
+            clock[0] += 1.0
+            with timer.phase("schedule"):
+                clock[0] += 2.0
+            with timer.phase("datacollector"):
+                clock[0] += 0.5
+    with timer.phase("render"):
+        clock[0] += 1.0
+
+    rows = {row["phase"]: row for row in timer.rows()}
+    assert list(rows) == ["simulation", "simulation/schedule", "simulation/datacollector", "render"]
+    assert [rows[path]["calls"] for path in rows] == [2, 2, 2, 1]
+    assert [rows[path]["seconds"] for path in rows] == [7.0, 4.0, 1.0, 1.0]
+    assert rows["simulation/schedule"]["mean_ms"] == 2000.0
+    shares = timer.to_dataframe().set_index("phase")["share %"]
+    assert shares.to_dict() == {
+        "simulation": 100.0, "simulation/schedule": 57.1, "simulation/datacollector": 14.3, "render": 100.0
+    }
+    assert json.loads(timer.to_json())["phases"] == timer.rows()
+
+
+def test_a_failing_phase_is_recorded_and_closed(clock):
+    timer = PhaseTimer()
+    with pytest.raises(RuntimeError):
+        with timer.phase("simulation"):
+            clock[0] += 1.0
+            raise RuntimeError
+    with timer.phase("render"):
+        pass
+    assert [(row["phase"], row["calls"], row["seconds"]) for row in timer.rows()] == [
+        ("simulation", 1, 1.0), ("render", 1, 0.0)
+    ]
+
+
+@pytest.mark.parametrize("engine", ["mesa", "vectorized"])
+def test_models_time_every_step_under_the_open_phase(engine):
+    timer = PhaseTimer()
+    model = build_model(Scenario(num_users=50, num_steps=3, csat_score=0.5, seed=1, engine=engine), profiler=timer)
+    with timer.phase("simulation"):
+        for _ in range(3):
+            model.step()
+    rows = {row["phase"]: row for row in timer.rows()}
+    nested = [path for path in rows if path.startswith("simulation/")]
+    assert "simulation/datacollector" in nested
+    assert all(rows[path]["calls"] == 3 for path in nested)
+    assert sum(rows[path]["seconds"] for path in nested) <= rows["simulation"]["seconds"]
+
+
+def test_unknown_capture_modes_are_rejected():
+    with pytest.raises(ValueError, match="Unknown capture mode"):
+        PhaseTimer(capture="perf")
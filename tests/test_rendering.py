@@ -0,0 +1,39 @@
+# tests/test_rendering.py
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pytest
+from simulation.runner import Scenario, SimulationResult, run_scenario
+from visualization.plots import plot_aggregated_nps_over_time
+from visualization.rendering import cached_figure, render_figure
+
+
+def result(seed):
+    scenario = Scenario(num_users=100, num_steps=4, csat_score=0.5, seed=seed, engine="vectorized")
+    return SimulationResult.from_model(scenario, run_scenario(scenario))
+
+
+def test_each_chart_is_drawn_once_per_result_and_key():
+    drawn = []
+
+    def plot(model_data):
+        drawn.append(len(model_data))
+        return plot_aggregated_nps_over_time(model_data)
+
+    first, second = result(1), result(2)
+    image = cached_figure(first.figures, "nps_over_time", plot, first.model_data)
+    assert cached_figure(first.figures, "nps_over_time", plot, first.model_data) is image
+    assert len(drawn) == 1
+    cached_figure(first.figures, "nps_over_time", plot, first.model_data, fmt="svg")
+    cached_figure(second.figures, "nps_over_time", plot, second.model_data)
+    assert len(drawn) == 3
+    assert sorted(first.figures) == ["nps_over_time.png", "nps_over_time.svg"]
+    assert image.startswith(b"\x89PNG")
+    assert plt.get_fignums() == []
+
+
+def test_figures_are_closed_even_if_encoding_fails():
+    with pytest.raises(ValueError, match="Unknown image format"):
+        render_figure(plt.figure(), fmt="gif")
+    assert plt.get_fignums() == []
@@ -0,0 +1,29 @@
+# tests/test_results.py
+
+import numpy as np
+import pytest
+from simulation.runner import Scenario, SimulationResult, build_model
+
+
+@pytest.mark.parametrize("engine", ["mesa", "vectorized", "aggregate"])
+@pytest.mark.parametrize("agent_history", ["full", "final"])
+def test_result_is_unchanged_when_its_model_is_extended(engine, agent_history):
+    scenario = Scenario(num_users=500, num_steps=10, csat_score=0.5, seed=2, engine=engine,
+                        comment_history="full", agent_history=agent_history)
+    model = build_model(scenario)
+    for _ in range(10):
+        model.step()
+    result = SimulationResult.from_model(scenario, model)
+    agent_data = result.agent_data.copy()
+    comments = result.get_comments_dataframe().copy()
+    persona_counts = result.persona_counts.counts().copy()
+
+    for _ in range(10):
+        model.step()
+
+    assert len(result.model_data) == 11
+    assert len(result.persona_counts) == 11
+    assert np.array_equal(result.persona_counts.counts(), persona_counts)
+    assert result.agent_data.equals(agent_data)
+    assert result.get_comments_dataframe().equals(comments)
+    assert result.comments.sentiment_totals().sum() == 500 * 10
@@ -0,0 +1,63 @@
+# tests/test_rng.py
+
+import numpy as np
+import pytest
+from simulation.change import Change
+from simulation.rng import SATISFACTION_STREAM, RandomStreams
+from simulation.runner import Scenario, build_model
+from simulation.sharded import SHARED_ARRAYS, shard_bounds, step_shard
+from simulation.vectorized import VectorizedUserModel
+
+NUM_USERS = 1003
+NUM_STEPS = 6
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 4, 17, 500])
+def test_draws_are_addressed_by_agent_not_by_chunking(chunk):
+    streams = RandomStreams(seed=42)
+    edges = list(range(0, NUM_USERS, chunk)) + [NUM_USERS]
+    for step in range(3):
+        whole = streams.raw(SATISFACTION_STREAM, step, 0, NUM_USERS)
+        chunked = np.concatenate([streams.raw(SATISFACTION_STREAM, step, a, b) for a, b in zip(edges[:-1], edges[1:])])
+        assert np.array_equal(whole, chunked)
+        assert np.array_equal(
+            streams.integers(SATISFACTION_STREAM, -1, 2, step, 0, NUM_USERS)[5:700],
+            streams.integers(SATISFACTION_STREAM, -1, 2, step, 5, 700)
+        )
+
+
+def test_steps_and_streams_never_share_draws():
+    streams = RandomStreams(seed=42)
+    first = streams.raw(SATISFACTION_STREAM, 0, 0, 8)
+    assert not np.array_equal(first, streams.raw(SATISFACTION_STREAM, 1, 0, 8))
+    assert not np.array_equal(first, streams.raw(SATISFACTION_STREAM + 1, 0, 0, 8))
+    assert np.array_equal(first, RandomStreams(seed=42).raw(SATISFACTION_STREAM, 0, 0, 8))
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 7, 64])
+def test_population_state_does_not_depend_on_the_shard_size(num_shards):
+    reference = VectorizedUserModel(NUM_USERS, Change(csat_score=0.3), {}, seed=8)
+    model = VectorizedUserModel(NUM_USERS, Change(csat_score=0.3), {}, seed=8)
+    arrays = {key: getattr(model, key) for key in SHARED_ARRAYS}
+    for step in range(NUM_STEPS):
+        counts = sum(
+            step_shard(arrays, model.streams, step, start, stop, len(model.persona_names), 0.0)[0]
+            for start, stop in shard_bounds(NUM_USERS, num_shards)
+        )
+        reference.step()
+        assert np.array_equal(counts, reference.nps_counts.persona_table())
+    for key in SHARED_ARRAYS:
+        assert np.array_equal(arrays[key], getattr(reference, key)), key
+
+
+def test_stopped_and_resumed_runs_match_uninterrupted_ones():
+    scenario = Scenario(num_users=NUM_USERS, num_steps=NUM_STEPS, csat_score=0.3, seed=8, engine="vectorized")
+    straight = build_model(scenario)
+    for _ in straight.iter_chunks(NUM_STEPS, chunk_size=NUM_STEPS):
+        pass
+    chunked = build_model(scenario)
+    for _ in chunked.iter_chunks(2, chunk_size=1):
+        pass
+    for _ in chunked.iter_chunks(NUM_STEPS - 2, chunk_size=3):
+        pass
+    assert straight.datacollector.get_model_vars_dataframe().equals(chunked.datacollector.get_model_vars_dataframe())
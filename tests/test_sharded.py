@@ -0,0 +1,76 @@
+# tests/test_sharded.py
+
+import gc
+import os
+import pytest
+from dataclasses import replace
+from simulation import cli, runner
+from simulation.change import Change
+from simulation.runner import SimulationResult, Scenario, build_model, engine_class, run_scenario
+
+SCENARIO = Scenario(num_users=500, num_steps=6, csat_score=0.4, seed=13, engine="vectorized", comment_history="full")
+
+
+def segment_paths(model):
+    return [os.path.join("/dev/shm", segment.name.lstrip("/")) for segment in model._segments]
+
+
+def sharded_model(workers):
+    model = engine_class("sharded")(
+        SCENARIO.num_users, Change(csat_score=SCENARIO.csat_score), SCENARIO.initial_satisfaction,
+        seed=SCENARIO.seed, comment_history=SCENARIO.comment_history, max_steps=SCENARIO.num_steps, workers=workers
+    )
+    for _ in range(SCENARIO.num_steps):
+        model.step()
+    return model
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_sharded_engine_matches_vectorized_and_frees_shared_memory(workers):
+    vectorized = SimulationResult.from_model(SCENARIO, run_scenario(SCENARIO))
+    model = sharded_model(workers)
+    paths = segment_paths(model)
+    assert len(model.shards) == workers
+    if os.path.isdir("/dev/shm"):
+        assert all(os.path.exists(path) for path in paths)
+
+    model.close()
+    assert not any(os.path.exists(path) for path in paths)
+    sharded = SimulationResult.from_model(SCENARIO, model)  # Readable from private copies after close
+    assert sharded.model_data.equals(vectorized.model_data)
+    assert sharded.agent_data.equals(vectorized.agent_data)
+    assert sharded.get_comments_dataframe().equals(vectorized.get_comments_dataframe())
+
+
+def test_unclosed_models_free_shared_memory_when_collected():
+    model = sharded_model(2)
+    paths = segment_paths(model)
+    if os.path.isdir("/dev/shm"):
+        assert all(os.path.exists(path) for path in paths)
+    del model
+    gc.collect()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def track_builds(monkeypatch, module, models):
+    def build(scenario, profiler=None):
+        models.append(build_model(scenario, profiler=profiler))
+        return models[-1]
+
+    monkeypatch.setattr(module, "build_model", build)
+
+
+def test_batch_runs_free_shared_memory_when_they_end(monkeypatch, tmp_path):
+    scenario = replace(SCENARIO, engine="sharded")
+    # The tracked models stay referenced, so only an explicit close can free their segments
+    models = []
+    track_builds(monkeypatch, cli, models)
+    track_builds(monkeypatch, runner, models)
+    cli.run_to_files(scenario, str(tmp_path), "arrow")
+    metrics = runner.run_metrics(scenario)
+
+    assert len(models) == 2
+    paths = [path for model in models for path in segment_paths(model)]
+    assert paths and not any(os.path.exists(path) for path in paths)
+    assert not any(model._finalizer.alive for model in models)
+    assert len(metrics) == scenario.num_steps + 1
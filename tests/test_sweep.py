@@ -0,0 +1,54 @@
+# tests/test_sweep.py
+
+from dataclasses import replace
+from simulation import sweep
+from simulation.cache import ResultCache
+from simulation.runner import NPS_METRICS, Scenario, run_metrics
+from simulation.sweep import run_sweep, sweep_scenarios
+
+BASE = Scenario(num_users=200, num_steps=5, csat_score=0.5, seed=3, engine="vectorized")
+
+
+def test_sweep_scenarios_cover_the_full_grid():
+    points = sweep_scenarios(BASE, csat_scores=[0.0, 1.0], persona_satisfaction={"Data Engineer": [2, 6, 10]})
+    assert [parameters for parameters, _ in points] == [
+        {"CSAT Score": csat, "Data Engineer": level} for csat in (0.0, 1.0) for level in (2, 6, 10)
+    ]
+    for parameters, scenario in points:
+        assert scenario.csat_score == parameters["CSAT Score"]
+        assert scenario.initial_satisfaction["Data Engineer"] == parameters["Data Engineer"]
+        assert scenario.seed == BASE.seed
+
+
+def test_sweep_has_one_row_per_point_with_final_metrics():
+    table = run_sweep(BASE, csat_scores=[0.0, 1.0], persona_satisfaction={"Data Engineer": [2, 10]}, max_workers=2)
+    metrics = run_metrics(BASE).columns
+    assert list(metrics[:len(NPS_METRICS)]) == NPS_METRICS
+
+    assert len(table) == 4
+    assert list(table.columns) == ["CSAT Score", "Data Engineer"] + list(metrics)
+    first = table.iloc[0]
+    expected = run_metrics(sweep_scenarios(BASE, [0.0], {"Data Engineer": [2]})[0][1]).iloc[-1]
+    assert first[list(metrics)].to_numpy().tolist() == expected.to_numpy().tolist()
+
+
+def test_cached_sweeps_only_run_new_points(monkeypatch, tmp_path):
+    runs = []
+
+    def counted(scenario):
+        runs.append(scenario)
+        return run_metrics(scenario)
+
+    monkeypatch.setattr(sweep, "run_metrics", counted)
+    cache = ResultCache(cache_dir=str(tmp_path))
+    first = run_sweep(BASE, csat_scores=[0.0, 1.0], max_workers=1, cache=cache)
+    second = run_sweep(BASE, csat_scores=[0.0, 0.5, 1.0], max_workers=1, cache=cache)
+    assert [scenario.csat_score for scenario in runs] == [0.0, 1.0, 0.5]
+    assert second.iloc[[0, 2]].reset_index(drop=True).equals(first)
+
+    # The metrics are on disk too, and unseeded grids always run
+    assert run_sweep(BASE, csat_scores=[0.5], max_workers=1, cache=ResultCache(cache_dir=str(tmp_path))).equals(
+        second.iloc[[1]].reset_index(drop=True)
+    )
+    run_sweep(replace(BASE, seed=None), csat_scores=[0.0], max_workers=1, cache=cache)
+    assert len(runs) == 4
@@ -1,32 +1,23 @@
 # ui/components.py
 
 import streamlit as st
-import pandas as pd
-import io  # Essential for handling in-memory byte streams
 from visualization.plots import (
     plot_comment_sentiment,
     plot_nps_by_persona,
     plot_aggregated_nps_over_time,
     plot_final_aggregated_nps,
-    plot_group_nps
+    plot_group_nps,
+    plot_sweep_heatmap,
+    plot_sweep_small_multiples
 )
-from simulation.personas import PERSONAS
-
-def get_group_for_persona(persona_name):
-    """
-    Returns the group name for a given persona.
-
-    Args:
-        persona_name (str): The name of the persona.
-
-    Returns:
-        str: The group name to which the persona belongs.
-    """
-    for group, details in PERSONAS.items():
-        for persona in details["personas"]:
-            if persona["name"] == persona_name:
-                return group
-    return "Unknown"
+from visualization.rendering import cached_figure, render_figure
+from simulation.export import EXPORT_FORMATS, MAX_DOWNLOAD_BYTES
+from simulation.personas import CATALOG
+from simulation.markov import MarkovNPSModel
+from simulation.population import persona_probabilities
+from simulation.profiling import CAPTURE_MODES, PhaseTimer
+from simulation.runner import group_nps_columns
+from simulation.sweep import run_sweep
 
 def render_sidebar():
     """
@@ -37,18 +28,34 @@ def render_sidebar():
     """
     st.sidebar.header("Simulation Parameters")
 
+    # The vectorized engine advances the population in batches and scales to far larger populations;
+    # the sharded engine splits it across worker processes for populations of several million;
+    # the aggregate engine steps persona x satisfaction counts, whatever the population size
+    engine_labels = {
+        "mesa": "Agent-based (Mesa)",
+        "vectorized": "Vectorized (NumPy)",
+        "sharded": "Sharded (multi-process NumPy)",
+        "aggregate": "Aggregate counts (no individual agents)"
+    }
+    engine = st.sidebar.selectbox(
+        "Simulation Engine",
+        list(engine_labels),
+        format_func=engine_labels.get
+    )
+    max_users = {"mesa": 10000, "vectorized": 1000000, "sharded": 10000000, "aggregate": 100000000}
+
     # Input controls
     num_users = st.sidebar.number_input(
         "Number of Users",
         min_value=100,
-        max_value=10000,
+        max_value=max_users[engine],
         value=1000,
         step=100
     )
     num_steps = st.sidebar.number_input(
         "Number of Simulation Steps",
         min_value=1,
-        max_value=100,
+        max_value=10000,
         value=50,
         step=1
     )
@@ -60,53 +67,380 @@ def render_sidebar():
         step=0.05
     )
 
-    # Persona-specific initial satisfaction controls
+    # Summary mode keeps per-step sentiment counts and a sample of comments instead of every comment
+    comment_history = st.sidebar.selectbox(
+        "Comment History",
+        ["full", "summary"],
+        format_func=lambda mode: "Full" if mode == "full" else "Summary only"
+    )
+
+    # Retention of per-agent states; anything but "full" bounds memory on large or long runs
+    agent_history_labels = {
+        "full": "Every step",
+        "final": "Final step only",
+        "every": "Every k-th step",
+        "sample": "Sample of agents",
+        "spill": "Every step, spilled to disk"
+    }
+    agent_history = st.sidebar.selectbox(
+        "Agent History",
+        list(agent_history_labels),
+        format_func=agent_history_labels.get
+    )
+    agent_history_every = 10
+    agent_history_sample = 1000
+    if agent_history == "every":
+        agent_history_every = st.sidebar.number_input("Keep Every k-th Step", min_value=1, max_value=1000, value=10, step=1)
+    elif agent_history == "sample":
+        agent_history_sample = st.sidebar.number_input("Tracked Agents", min_value=1, max_value=100000, value=1000, step=100)
+
+    # Persona-specific initial satisfaction: bulk shifts for every persona and per group, and one
+    # editable table for individual personas, so the number of widgets does not grow with the catalog
     st.sidebar.header("Persona Initial Satisfaction")
+    shift = st.sidebar.slider(
+        "Shift All Personas", -10, 10, 0,
+        help="Added to every persona's default initial satisfaction, which is then kept within 0-10."
+    )
+    group_shifts = {}
+    with st.sidebar.expander("Shift by Group"):
+        for group, personas in zip(CATALOG.group_names, CATALOG.group_personas):
+            group_shift = st.slider(f"{group} ({len(personas)} personas)", -10, 10, 0, key=f"{group}_shift")
+            if group_shift:
+                group_shifts[group] = group_shift
+    persona_levels = {}
+    with st.sidebar.expander("Individual Personas"):
+        # The table loads pandas, so it is only built once asked for
+        if st.toggle("Set Individual Levels", key="edit_persona_levels"):
+            st.caption("Enter a level to set a persona's initial satisfaction regardless of the shifts.")
+            levels = st.data_editor(
+                _persona_table(Level=None),
+                column_config={"Level": st.column_config.NumberColumn(min_value=0, max_value=10, step=1)},
+                disabled=["Group", "Persona", "Default"],
+                hide_index=True,
+                key="persona_levels"
+            )
+            persona_levels = {
+                persona: int(level) for persona, level in zip(levels["Persona"], levels["Level"].tolist()) if level == level
+            }
+    # Only personas away from their default are passed on, which keeps scenarios of large catalogs small
+    initial_satisfaction = CATALOG.satisfaction_overrides(shift, group_shifts, persona_levels)
 
-    # Iterate through groups and personas to create sliders or inputs
-    initial_satisfaction = {}
-    for group, details in PERSONAS.items():
-        st.sidebar.subheader(f"{group} Personas")
-        for persona in details["personas"]:
-            key = f"{group}_{persona['name']}_satisfaction"
-            initial_satisfaction[persona["name"]] = st.sidebar.slider(
-                f"{persona['name']} Initial Satisfaction",
-                0,
-                10,
-                persona["attributes"].get("satisfaction", 5)
+    # Relative weights of groups, and of personas within their group; all equal by default
+    group_weights = {}
+    with st.sidebar.expander("Population Mix"):
+        st.caption("Relative share of each group, and of each persona within its group.")
+        for group in CATALOG.group_names:
+            weight = st.number_input(f"{group} Weight", min_value=0.0, value=1.0, step=0.5, key=f"{group}_weight")
+            if weight != 1.0:
+                group_weights[group] = weight
+        persona_weights = {}
+        if st.toggle("Weight Individual Personas", key="edit_persona_weights"):
+            weights = st.data_editor(
+                _persona_table(Weight=1.0),
+                column_config={"Weight": st.column_config.NumberColumn(min_value=0.0, step=0.5)},
+                disabled=["Group", "Persona", "Default"],
+                hide_index=True,
+                key="persona_weights"
             )
+            persona_weights = {
+                persona: weight for persona, weight in zip(weights["Persona"], weights["Weight"].tolist()) if weight != 1.0
+            }
+    # Only weights that differ from the default are kept, so unchanged mixes share cached results
+    population_mix = {}
+    if group_weights:
+        population_mix["group_weights"] = group_weights
+    if persona_weights:
+        population_mix["persona_weights"] = persona_weights
+    mix_error = None
+    try:
+        persona_probabilities(CATALOG, group_weights, persona_weights)
+    except ValueError as error:
+        mix_error = str(error)
+        st.sidebar.error(f"Population Mix: {mix_error}")
 
     # Optional: Random Seed for reproducibility
     st.sidebar.header("Randomness Control")
     random_seed = st.sidebar.number_input(
         "Random Seed",
         value=42,
-        step=1
+        step=1,
+        help="Runs with the same seed and inputs give identical results on either engine, "
+             "however they are chunked, stopped or resumed."
+    )
+
+    # Independent replicates run in parallel and add confidence bands to the NPS charts
+    replicates = st.sidebar.number_input(
+        "Ensemble Replicates",
+        min_value=1,
+        max_value=200,
+        value=1,
+        step=1,
+        help="Runs with more than one replicate also show percentile bands across replicates."
+    )
+
+    # Optional profiler capture; per-phase timings are always shown in the Performance panel
+    st.sidebar.header("Diagnostics")
+    capture_labels = {"none": "Timers only", "cprofile": "cProfile", "tracemalloc": "tracemalloc"}
+    profile_capture = st.sidebar.selectbox(
+        "Profiler Capture",
+        list(CAPTURE_MODES),
+        format_func=capture_labels.get,
+        help="cProfile and tracemalloc add a detailed report to the Performance panel but slow the run down."
+    )
+
+    # Raw data export for downstream tools, streamed to disk while the run progresses
+    st.sidebar.header("Export")
+    export_labels = {"none": "Off", "parquet": "Parquet", "arrow": "Arrow IPC"}
+    export_format = st.sidebar.selectbox(
+        "Export Format",
+        ["none"] + list(EXPORT_FORMATS),
+        format_func=export_labels.get,
+        help="Writes model data, agent history, persona counts and comments as zstd-compressed files "
+             "while the run progresses. Agent history is exported at every step it records, "
+             "even when only the final step is kept in memory."
     )
 
     # Run Simulation Button
-    run_simulation = st.sidebar.button("Run Simulation")
+    run_simulation = st.sidebar.button("Run Simulation", disabled=mix_error is not None)
 
     return {
+        "engine": engine,
         "num_users": num_users,
         "num_steps": num_steps,
         "csat_score": csat_score,
+        "comment_history": comment_history,
+        "agent_history": agent_history,
+        "agent_history_every": agent_history_every,
+        "agent_history_sample": agent_history_sample,
         "initial_satisfaction": initial_satisfaction,
+        "population_mix": population_mix,
         "random_seed": random_seed,
+        "replicates": replicates,
+        "profile_capture": profile_capture,
+        "export_format": export_format,
         "run_simulation": run_simulation
     }
 
-def display_simulation_results(model, model_data, agent_data, comments_df):
+def _persona_table(**columns):
+    """
+    Returns one row per persona of the catalog, for the sidebar's editable tables.
+
+    Args:
+        **columns: Extra columns and the value every row starts with.
+
+    Returns:
+        pd.DataFrame: 'Group', 'Persona' and 'Default' (initial satisfaction) columns, then the extra columns.
+    """
+    import pandas as pd
+
+    table = pd.DataFrame({
+        "Group": [CATALOG.group_names[group] for group in CATALOG.persona_groups],
+        "Persona": list(CATALOG.persona_names),
+        "Default": list(CATALOG.persona_satisfaction)
+    })
+    for name, value in columns.items():
+        table[name] = pd.Series([value] * len(table), dtype="float64")
+    return table
+
+def render_sweep_panel(base_scenario, cache=None):
+    """
+    Renders the parameter sweep controls and, once run, its results table and charts.
+
+    Args:
+        base_scenario (Scenario): Scenario supplying every value that is not swept.
+        cache (ResultCache, optional): Cache of the metrics of grid points already run.
+    """
+    with st.expander("Parameter Sweep"):
+        st.write("Run a grid of scenarios over CSAT score and one persona's initial satisfaction. "
+                 "Every other parameter comes from the sidebar.")
+        col1, col2 = st.columns(2)
+        with col1:
+            csat_range = st.slider("CSAT Score Range", 0.0, 1.0, (0.0, 1.0), step=0.05)
+            csat_points = st.number_input("CSAT Points", min_value=1, max_value=21, value=5, step=1)
+        with col2:
+            swept_persona = st.selectbox("Persona to Sweep", ["(none)"] + list(CATALOG.persona_names))
+            satisfaction_range = st.slider("Initial Satisfaction Range", 0, 10, (0, 10))
+            satisfaction_step = st.number_input("Satisfaction Step", min_value=1, max_value=10, value=2, step=1)
+
+        if not st.button("Run Sweep"):
+            return
+
+        import numpy as np
+
+        csat_scores = np.round(np.linspace(csat_range[0], csat_range[1], int(csat_points)), 4)
+        persona_satisfaction = None
+        if swept_persona != "(none)":
+            persona_satisfaction = {
+                swept_persona: range(satisfaction_range[0], satisfaction_range[1] + 1, int(satisfaction_step))
+            }
+        with st.spinner("Running parameter sweep..."):
+            results = run_sweep(
+                base_scenario, csat_scores=csat_scores, persona_satisfaction=persona_satisfaction, cache=cache
+            )
+
+        st.dataframe(results)
+        group_columns = [f"{group} NPS" for group in CATALOG.group_names]
+        if persona_satisfaction is not None and len(csat_scores) > 1:
+            for value in ["Overall NPS"] + group_columns:
+                st.image(render_figure(plot_sweep_heatmap(results, "CSAT Score", swept_persona, value=value)))
+        else:
+            parameter = swept_persona if persona_satisfaction is not None else "CSAT Score"
+            st.image(render_figure(plot_sweep_small_multiples(results, parameter, ["Overall NPS"] + group_columns)))
+        st.download_button(
+            label="Download Sweep Results as CSV",
+            data=results.to_csv(index=False),
+            file_name="sweep_results.csv",
+            mime="text/csv",
+        )
+
+def _stop_run():
+    """
+    Stops the current run after its current chunk; the model is kept so it can be resumed.
+    """
+    st.session_state["run"]["status"] = "stopped"
+
+def _resume_run():
+    """
+    Resumes a stopped run from its last completed step.
+    """
+    st.session_state["run"]["status"] = "running"
+
+def _extend_run():
+    """
+    Extends the current run by the requested number of steps.
+    """
+    run = st.session_state["run"]
+    run["target_steps"] += int(st.session_state["extend_steps"])
+    run["status"] = "running"
+    if run["result"] is not None:
+        # The result is replaced; the cache keeps its own copy of any spilled agent history
+        run["result"].agent_history.delete_spill()
+    run["result"] = None
+    run["ensemble"] = None
+
+def render_run_controls(run):
+    """
+    Renders the status of the current run with controls to stop, resume or extend it.
+
+    The controls change the run through callbacks, so the change applies before
+    the script reruns.
+
+    Args:
+        run (dict): The run kept in st.session_state["run"].
+    """
+    if run["status"] == "running":
+        st.button("Stop Simulation", on_click=_stop_run)
+        return
+    if run["status"] == "completed":
+        st.success("Simulation completed!")
+    else:
+        steps_done = run["model"].steps if run["model"] is not None else 0
+        st.warning(f"Simulation stopped at step {steps_done} of {run['target_steps']}.")
+        st.button("Resume Simulation", on_click=_resume_run)
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input("Additional Steps", min_value=1, max_value=1000, value=10, step=1, key="extend_steps")
+    with col2:
+        st.button("Extend Simulation", on_click=_extend_run)
+
+# Metrics drawn live while a run streams
+STREAM_COLUMNS = ["Overall NPS", "Promoters %", "Passives %", "Detractors %"]
+
+
+def _stream_rows(model, start, max_points=None):
+    """
+    Returns the streamed metrics of every step from `start` on, indexed by step.
+
+    Args:
+        model (UserModel or VectorizedUserModel): The model.
+        start (int): First step to include.
+        max_points (int, optional): Downsamples the rows to this many with LTTB on 'Overall NPS'.
+
+    Returns:
+        pd.DataFrame: One STREAM_COLUMNS row per step.
+    """
+    import numpy as np
+    import pandas as pd
+    from visualization.downsample import lttb_indices
+
+    model_vars = model.datacollector.model_vars
+    rows = pd.DataFrame({column: model_vars[column][start:] for column in STREAM_COLUMNS})
+    rows.index = np.arange(start, start + len(rows))
+    if max_points is not None:
+        rows = rows.iloc[lttb_indices(rows.index, rows["Overall NPS"], max_points)]
+    return rows
+
+
+def stream_simulation(model, num_steps, total_steps, chunk_size=None, max_points=500):
+    """
+    Steps a model chunk by chunk, updating a progress bar, the headline NPS and
+    the NPS-over-time chart after every chunk.
+
+    The steps run before streaming starts, e.g. when a run is resumed or extended,
+    are drawn once, downsampled to `max_points` with LTTB; after that each chunk
+    only appends its own steps to the chart, so streaming costs O(steps) overall.
+
+    Streamlit interrupts the script between chunks when the user stops the run,
+    which leaves the model after a completed step.
+
+    Args:
+        model (UserModel or VectorizedUserModel): The model to advance.
+        num_steps (int): Number of steps to advance.
+        total_steps (int): Step count of the whole run, for the progress bar.
+        chunk_size (int, optional): Steps per chunk; defaults to about 20 chunks per run.
+        max_points (int): Maximum number of earlier steps drawn when streaming starts.
+    """
+    if chunk_size is None:
+        chunk_size = max(1, total_steps // 20)
+    progress = st.progress(model.steps / total_steps, text=f"Step {model.steps} of {total_steps}")
+    headline = st.empty()
+    chart = st.empty()
+    lines = chart.line_chart(_stream_rows(model, 0, max_points))
+    drawn = len(model.datacollector.model_vars["Overall NPS"])
+    for metrics in model.iter_chunks(num_steps, chunk_size):
+        with model.profiler.phase("stream_updates"):
+            progress.progress(metrics["Step"] / total_steps, text=f"Step {metrics['Step']} of {total_steps}")
+            headline.markdown(f"### Aggregated NPS at Step {metrics['Step']}: **{metrics['Overall NPS']:.2f}%**")
+            lines.add_rows(_stream_rows(model, drawn))
+            drawn = len(model.datacollector.model_vars["Overall NPS"])
+    progress.empty()
+    headline.empty()
+    chart.empty()
+
+def _timed_figure(profiler, figures, key, plot, *args, **kwargs):
+    """
+    Returns the cached image of a chart, timing the lookup or drawing as a phase.
+
+    Args:
+        profiler (PhaseTimer): Timer that receives the phase, named after the chart's key.
+        figures (dict): Encoded images by key, e.g. SimulationResult.figures.
+        key (str): Identifies the chart and every input that changes it.
+        plot (callable): Plot function from visualization.plots returning a figure.
+        *args: Positional arguments of the plot function.
+        **kwargs: Keyword arguments of the plot function.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    with profiler.phase(key):
+        return cached_figure(figures, key, plot, *args, **kwargs)
+
+def display_simulation_results(result, ensemble=None, profiler=None):
     """
     Displays the simulation results in a structured layout.
 
     Args:
-        model (UserModel): The simulation model instance.
-        model_data (pd.DataFrame): Data collected from the model.
-        agent_data (pd.DataFrame): Data collected from the agents.
-        comments_df (pd.DataFrame): DataFrame of comments.
+        result (SimulationResult): Model data, persona counts and comments of the run.
+        ensemble (pd.DataFrame, optional): Ensemble bands from simulation.ensemble.run_ensemble.
+        profiler (PhaseTimer, optional): Timer that receives the data preparation and chart phases.
     """
-    st.success("Simulation completed!")
+    import pandas as pd
+
+    if profiler is None:
+        profiler = PhaseTimer()
+    model_data = result.model_data
+    with profiler.phase("comments_dataframe"):
+        comments_df = result.get_comments_dataframe()  # A sample of the comments in summary mode
 
     # Layout for the visualizations
     st.header("Simulation Results")
@@ -127,49 +461,27 @@ def display_simulation_results(model, model_data, agent_data, comments_df):
             final_promoters = model_data['Promoters %'].iloc[-1]
             final_passives = model_data['Passives %'].iloc[-1]
             final_detractors = model_data['Detractors %'].iloc[-1]
-            fig_final_nps = plot_final_aggregated_nps(final_promoters, final_passives, final_detractors)
-            st.pyplot(fig_final_nps)
+            final_nps_png = _timed_figure(
+                profiler, result.figures, "final_nps", plot_final_aggregated_nps,
+                final_promoters, final_passives, final_detractors
+            )
+            st.image(final_nps_png, use_container_width=True)
         else:
             st.write("No NPS data available to plot the final aggregated NPS.")
 
     with col2:
-        # Plot NPS Scores by Persona
-        if not agent_data.empty:
-            # Extract the final step data
-            if 'Step' in agent_data.index.names:
-                final_step = agent_data.index.get_level_values('Step').max()
-                final_agent_data = agent_data.xs(final_step, level='Step')
-            else:
-                final_agent_data = agent_data[agent_data['Step'] == agent_data['Step'].max()]
-
-            # Calculate NPS per Persona
-            nps_per_persona = []
-            if not final_agent_data.empty and 'Persona' in final_agent_data.columns and 'NPS Rating' in final_agent_data.columns:
-                for persona in final_agent_data['Persona'].unique():
-                    persona_data = final_agent_data[final_agent_data['Persona'] == persona]
-                    total = len(persona_data)
-                    promoters = len(persona_data[persona_data['NPS Rating'] >= 9])
-                    detractors = len(persona_data[persona_data['NPS Rating'] <= 6])
-                    passives = total - promoters - detractors
-                    nps_score = ((promoters - detractors) / total) * 100 if total > 0 else 0
-                    group = get_group_for_persona(persona)
-                    nps_per_persona.append({
-                        'Group': group,
-                        'Persona': persona,
-                        'Promoters %': (promoters / total) * 100 if total > 0 else 0,
-                        'Passives %': (passives / total) * 100 if total > 0 else 0,
-                        'Detractors %': (detractors / total) * 100 if total > 0 else 0,
-                        'NPS Score': nps_score
-                    })
-                nps_df = pd.DataFrame(nps_per_persona)
-
-                if not nps_df.empty:
-                    fig_nps_persona = plot_nps_by_persona(nps_df)
-                    st.pyplot(fig_nps_persona)
+        # Plot NPS Scores by Persona, read from the per-step count cube kept by the engine
+        with profiler.phase("persona_nps"):
+            nps_df = result.persona_counts.persona_nps()
+        if not nps_df.empty:
+            st.image(_timed_figure(profiler, result.figures, "nps_by_persona", plot_nps_by_persona, nps_df),
+                     use_container_width=True)
 
-                    # Display NPS per Persona Data
-                    st.header("NPS Scores by Persona")
-                    st.dataframe(nps_df[['Group', 'Persona', 'NPS Score']])
+            # Display NPS per Persona Data
+            st.header("NPS Scores by Persona")
+            st.dataframe(nps_df[['Group', 'Persona', 'NPS Score']])
+            with st.expander("NPS by Persona Over Time"):
+                st.line_chart(result.persona_counts.persona_nps_over_time())
         else:
             st.write("No agent data available to plot NPS Scores by Persona.")
 
@@ -179,10 +491,13 @@ def display_simulation_results(model, model_data, agent_data, comments_df):
     with col3:
         # Plot Comment Sentiment Counts
         st.header("Comment Sentiment Counts")
-        if not comments_df.empty:
-            sentiment_counts = comments_df['sentiment'].value_counts()
-            fig_sentiment = plot_comment_sentiment(sentiment_counts)
-            st.pyplot(fig_sentiment)
+        # Counts are kept for every comment, even when only a sample of comments is stored
+        sentiment_counts = result.comments.sentiment_totals()
+        if sentiment_counts.sum() > 0:
+            st.image(_timed_figure(profiler, result.figures, "comment_sentiment", plot_comment_sentiment, sentiment_counts),
+                     use_container_width=True)
+            with st.expander("Example Comments"):
+                st.dataframe(comments_df.head(100))
         else:
             st.write("No comments to display.")
 
@@ -190,25 +505,52 @@ def display_simulation_results(model, model_data, agent_data, comments_df):
         # Plot Aggregated NPS Over Time
         st.header("Aggregated NPS Over Time")
         if not model_data.empty:
-            fig_nps_time = plot_aggregated_nps_over_time(model_data)
-            st.pyplot(fig_nps_time)
+            # The bands depend on the ensemble, which is not part of the result
+            key = "nps_over_time"
+            if ensemble is not None:
+                key += f"_bands_{ensemble.attrs['replicates']}_{'_'.join(map(str, ensemble.attrs['percentiles']))}"
+            st.image(_timed_figure(profiler, result.figures, key, plot_aggregated_nps_over_time, model_data, bands=ensemble),
+                     use_container_width=True)
+            with st.expander("Expected NPS Trajectory"):
+                # Exact expectations from the satisfaction Markov chain, next to the simulated run
+                with profiler.phase("markov_expectation"):
+                    expected = MarkovNPSModel(
+                        result.scenario.initial_satisfaction,
+                        population_mix=result.scenario.population_mix
+                    )
+                    num_steps = len(model_data) - 1
+                    trajectory = pd.DataFrame({
+                        "Expected": expected.expected_metrics(num_steps)["Overall NPS"],
+                        "Simulated": model_data["Overall NPS"].to_numpy()
+                    })
+                st.line_chart(trajectory)
+                st.dataframe(expected.expected_sentiment_shares(num_steps).tail(1))
         else:
             st.write("No data available to plot the aggregated NPS.")
 
+    # **Ensemble Summary: Final-step mean and percentile range across replicates**
+    if ensemble is not None:
+        low, high = ensemble.attrs["percentiles"]
+        st.header(f"Ensemble Summary ({ensemble.attrs['replicates']} replicates)")
+        final_bands = ensemble.iloc[-1].unstack()
+        final_bands.columns = ["Mean", f"P{low}", f"P{high}"]
+        st.dataframe(final_bands)
+
     # **4. Additional Visualization: Group-Level NPS**
-    if 'Group NPS' in model_data.columns:
-        group_nps = model_data['Group NPS'].iloc[-1]  # Assuming it's a dict
+    group_columns = group_nps_columns(model_data)
+    if group_columns and not model_data.empty:
+        final_row = model_data[group_columns].iloc[-1]
+        group_nps = {column.removesuffix(' NPS'): score for column, score in final_row.items()}
         st.header("NPS Scores by Group")
         df_group_nps = pd.DataFrame(list(group_nps.items()), columns=['Group', 'NPS Score'])
         st.dataframe(df_group_nps)
-        fig_group_nps = plot_group_nps(group_nps)
-        st.pyplot(fig_group_nps)
+        st.image(_timed_figure(profiler, result.figures, "group_nps", plot_group_nps, group_nps), use_container_width=True)
 
     # **5. Download Buttons**
     st.header("Download Simulation Results")
 
     # Download NPS by Persona as CSV
-    if 'nps_df' in locals() and not nps_df.empty:
+    if not nps_df.empty:
         csv_nps = nps_df[['Group', 'Persona', 'Promoters %', 'Passives %', 'Detractors %', 'NPS Score']].to_csv(index=False)
         st.download_button(
             label="Download NPS by Persona as CSV",
@@ -228,15 +570,83 @@ def display_simulation_results(model, model_data, agent_data, comments_df):
             mime='text/csv',
         )
 
-    # Download Final NPS Plot as PNG
-    if 'final_nps' in locals() and not model_data.empty:
-        fig_final_nps_png = plot_final_aggregated_nps(final_promoters, final_passives, final_detractors)
-        buf = io.BytesIO()
-        fig_final_nps_png.savefig(buf, format='png')
-        buf.seek(0)
+    # Download Final NPS Plot as PNG, reusing the image drawn for display
+    if 'final_nps_png' in locals():
         st.download_button(
             label="Download Final NPS Plot",
-            data=buf,
+            data=final_nps_png,
             file_name="final_nps_plot.png",
             mime="image/png",
+        )
+
+def _finish_export():
+    """
+    Finishes the files of the current run's streamed export so they can be downloaded.
+    """
+    from dataclasses import replace
+
+    run = st.session_state["run"]
+    run["export_paths"] = run["exporter"].close(replace(run["scenario"], num_steps=run["target_steps"]))
+
+def render_export_panel(run):
+    """
+    Renders the state of a run's export: a control to finish the files while they
+    are still being streamed, then download buttons for the files, read from disk.
+
+    The streamed files stay open while the run can still be extended, so extending
+    appends to them; finishing closes them, and a later extension starts a new export.
+    Files larger than MAX_DOWNLOAD_BYTES are not served through the browser, since
+    a download button holds its whole file in memory; their paths are shown instead.
+
+    Args:
+        run (dict): The run kept in st.session_state["run"].
+    """
+    import os
+
+    st.header("Export")
+    exporter = run["exporter"]
+    if exporter is not None and not exporter.closed:
+        rows = exporter.rows_written().get("agent_data", 0)
+        st.caption(f"Writing to {exporter.directory}: {rows:,} agent history rows so far. "
+                   "Extending the run appends to these files; finish them to download.")
+        st.button("Finish Export", on_click=_finish_export)
+        return
+    paths = run["export_paths"]
+    st.caption(f"Written to {os.path.dirname(next(iter(paths.values())))}")
+    for name, path in paths.items():
+        size = os.path.getsize(path)
+        label = f"{name} ({size / 2 ** 20:.1f} MB)"
+        if size > MAX_DOWNLOAD_BYTES:
+            st.write(f"{label}: too large to download here, read it from {path}")
+            continue
+        with open(path, "rb") as file:
+            st.download_button(
+                label=f"Download {label}",
+                data=file,
+                file_name=os.path.basename(path),
+                mime="application/octet-stream",
+                key=f"export_{name}"
+            )
+
+def render_performance_panel(profiler):
+    """
+    Renders an expandable per-phase breakdown of the current run with a JSON export.
+
+    Args:
+        profiler (PhaseTimer): The run's timer.
+    """
+    with st.expander("Performance"):
+        phases = profiler.to_dataframe()
+        if phases.empty:
+            st.write("No phases recorded yet.")
+            return
+        st.dataframe(phases, hide_index=True)
+        if profiler.capture_report:
+            st.subheader(f"{profiler.capture_mode} report")
+            st.code(profiler.capture_report)
+        st.download_button(
+            label="Download Performance Profile as JSON",
+            data=profiler.to_json(),
+            file_name="performance_profile.json",
+            mime="application/json",
         )
\ No newline at end of file
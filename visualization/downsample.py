@@ -0,0 +1,44 @@
+# visualization/downsample.py
+
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Selects the points of a series to keep with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are split
+    into threshold - 2 buckets. From each bucket, the point kept is the one that
+    forms the largest triangle with the previously kept point and the mean of
+    the next bucket. This keeps peaks and troughs that plain striding drops.
+
+    Args:
+        x (array-like): Monotonic x values, e.g. simulation steps.
+        y (array-like): Values of the series.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points; every index if the series
+            has no more than `threshold` points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[bucket + 1] = a
+    return indices
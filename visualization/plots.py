@@ -1,8 +1,7 @@
 # visualization/plots.py
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+# matplotlib and seaborn are imported by the functions that draw, so importing this
+# module stays cheap until a chart is actually drawn
 
 def plot_comment_sentiment(sentiment_counts):
     """
@@ -14,6 +13,9 @@ def plot_comment_sentiment(sentiment_counts):
     Returns:
     - fig (matplotlib.figure.Figure): The generated matplotlib figure.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     fig, ax = plt.subplots(figsize=(8, 6))
     sns.barplot(x=sentiment_counts.index, y=sentiment_counts.values, palette='coolwarm', ax=ax)
     ax.set_title("Comment Sentiment Counts")
@@ -32,6 +34,9 @@ def plot_nps_by_persona(nps_df):
     Returns:
     - fig (matplotlib.figure.Figure): The generated matplotlib figure.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     fig, ax = plt.subplots(figsize=(12, 8))
     sns.barplot(data=nps_df, x='Persona', y='NPS Score', hue='Group', palette='Set2', ax=ax)
     ax.axhline(0, color='gray', linestyle='--')
@@ -53,6 +58,10 @@ def plot_group_nps(group_nps):
     Returns:
     - fig (matplotlib.figure.Figure): The generated matplotlib figure.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import pandas as pd
+
     df = pd.DataFrame(list(group_nps.items()), columns=['Group', 'NPS Score'])
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(data=df, x='Group', y='NPS Score', palette='Set3', ax=ax)
@@ -64,26 +73,45 @@ def plot_group_nps(group_nps):
     plt.tight_layout()
     return fig
 
-def plot_aggregated_nps_over_time(model_data):
+def plot_aggregated_nps_over_time(model_data, bands=None, max_points=1000):
     """
     Generates a line chart for aggregated NPS over simulation steps.
 
+    Series longer than `max_points` are downsampled with LTTB, which keeps their
+    shape, and markers are only drawn for short runs.
+
     Parameters:
-    - model_data (pd.DataFrame): DataFrame with 'Overall NPS', 'Promoters %', 'Passives %', 'Detractors %', and 'Group NPS' columns over steps.
+    - model_data (pd.DataFrame): DataFrame with 'Overall NPS' and one '<group> NPS' column per group over steps.
+    - bands (pd.DataFrame, optional): Ensemble bands from simulation.ensemble.run_ensemble, drawn as shaded ranges.
+    - max_points (int): Maximum number of points drawn per series.
 
     Returns:
     - fig (matplotlib.figure.Figure): The generated matplotlib figure.
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(model_data.index, model_data['Overall NPS'], label='Overall NPS', marker='o')
+    import matplotlib.pyplot as plt
+    from .downsample import lttb_indices
 
-    # Plot Group NPS
-    for group in model_data['Group NPS'].iloc[-1].keys():
-        ax.plot(model_data.index, model_data['Group NPS'].apply(lambda x: x[group]), label=f'{group} NPS', marker='x')
+    few_points = len(model_data) <= 100
+    fig, ax = plt.subplots(figsize=(10, 6))
+    nps_columns = [column for column in model_data.columns if column.endswith(' NPS')]
+    for column in nps_columns:
+        overall = column == 'Overall NPS'
+        keep = lttb_indices(model_data.index, model_data[column], max_points)
+        line, = ax.plot(model_data.index[keep], model_data[column].iloc[keep], label=column,
+                        marker=('o' if overall else 'x') if few_points else None)
+        if bands is not None and column in bands.columns.get_level_values(0):
+            keep = lttb_indices(bands.index, bands[(column, 'mean')], max_points)
+            ax.fill_between(bands.index[keep], bands[(column, 'lower')].iloc[keep], bands[(column, 'upper')].iloc[keep],
+                            color=line.get_color(), alpha=0.2 if overall else 0.15)
 
     ax.axhline(0, color='gray', linestyle='--')
     ax.set_ylim(-100, 100)
-    ax.set_title("Aggregated NPS Over Time")
+    if bands is not None:
+        low, high = bands.attrs.get('percentiles', (5, 95))
+        ax.set_title(f"Aggregated NPS Over Time ({low}th-{high}th percentile bands, "
+                     f"{bands.attrs.get('replicates', '?')} replicates)")
+    else:
+        ax.set_title("Aggregated NPS Over Time")
     ax.set_xlabel("Simulation Step")
     ax.set_ylabel("NPS Score (%)")
     ax.legend()
@@ -102,6 +130,8 @@ def plot_final_aggregated_nps(promoters, passives, detractors):
     Returns:
     - fig (matplotlib.figure.Figure): The generated matplotlib figure.
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(6, 6))
     labels = ['Promoters', 'Passives', 'Detractors']
     sizes = [promoters, passives, detractors]
@@ -117,4 +147,61 @@ def plot_final_aggregated_nps(promoters, passives, detractors):
     ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=140)
     ax.set_title("Final Aggregated NPS")
     ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    return fig
\ No newline at end of file
+    return fig
+
+def plot_sweep_heatmap(sweep_results, x, y, value='Overall NPS'):
+    """
+    Generates a heatmap of a final metric over two swept parameters.
+
+    Parameters:
+    - sweep_results (pd.DataFrame): Tidy table from simulation.sweep.run_sweep.
+    - x (str): Swept parameter shown on the x axis.
+    - y (str): Swept parameter shown on the y axis.
+    - value (str): Metric column to show, e.g. 'Overall NPS' or '<group> NPS'.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): The generated matplotlib figure.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    grid = sweep_results.pivot_table(index=y, columns=x, values=value, aggfunc='mean')
+    grid = grid.sort_index(ascending=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.heatmap(grid, annot=True, fmt='.1f', cmap='RdYlGn', vmin=-100, vmax=100, center=0,
+                cbar_kws={'label': f'Final {value} (%)'}, ax=ax)
+    ax.set_title(f"Final {value} by {x} and {y}")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    plt.tight_layout()
+    return fig
+
+def plot_sweep_small_multiples(sweep_results, parameter, values):
+    """
+    Generates one line chart per metric showing its final value against a swept parameter.
+
+    Parameters:
+    - sweep_results (pd.DataFrame): Tidy table from simulation.sweep.run_sweep.
+    - parameter (str): Swept parameter shown on the x axis.
+    - values (list): Metric columns to show, one panel each.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): The generated matplotlib figure.
+    """
+    import matplotlib.pyplot as plt
+
+    columns = min(len(values), 3)
+    rows = -(-len(values) // columns)
+    fig, axes = plt.subplots(rows, columns, figsize=(4 * columns, 3 * rows), sharex=True, sharey=True, squeeze=False)
+    summary = sweep_results.groupby(parameter)[values].mean()
+    for ax, value in zip(axes.flat, values):
+        ax.plot(summary.index, summary[value], marker='o')
+        ax.axhline(0, color='gray', linestyle='--')
+        ax.set_ylim(-100, 100)
+        ax.set_title(value)
+        ax.set_xlabel(parameter)
+    for ax in list(axes.flat)[len(values):]:
+        ax.set_visible(False)
+    axes[0][0].set_ylabel("Final NPS Score (%)")
+    plt.tight_layout()
+    return fig
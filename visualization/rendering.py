@@ -0,0 +1,57 @@
+# visualization/rendering.py
+
+import io
+
+# Image formats render_figure can encode, with their MIME types
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+
+def render_figure(fig, fmt="png", dpi=100):
+    """
+    Encodes a matplotlib figure and closes it.
+
+    The figure is closed even if encoding fails, so pyplot's figure registry does
+    not grow with every rerun of the app.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure to encode.
+        fmt (str): "png" or "svg".
+        dpi (int): Resolution of PNG output.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    import matplotlib.pyplot as plt
+
+    try:
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {fmt!r}")
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def cached_figure(figures, key, plot, *args, fmt="png", **kwargs):
+    """
+    Returns the encoded image of a chart, drawing it only if it is not cached yet.
+
+    Args:
+        figures (dict): Encoded images by key, e.g. SimulationResult.figures.
+        key (str): Identifies the chart and every input that changes it.
+        plot (callable): Plot function from visualization.plots returning a figure.
+        *args: Positional arguments of the plot function.
+        fmt (str): "png" or "svg".
+        **kwargs: Keyword arguments of the plot function.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    cache_key = f"{key}.{fmt}"
+    if cache_key not in figures:
+        figures[cache_key] = render_figure(plot(*args, **kwargs), fmt=fmt)
+    return figures[cache_key]